@@ -1,12 +1,16 @@
 from flask import Blueprint, request, jsonify
 from extensions import db
-from models import Order, MenuItem
-from werkzeug.security import check_password_hash, generate_password_hash
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+from models import Order, MenuItem, Customer, BulkMailJob, AdminSettings
+from ratelimit import rate_limit
+from passwords import check_password_hash, generate_password_hash
+from flask_jwt_extended import create_access_token
 from config import Config
 from datetime import datetime, timedelta
 from sqlalchemy import func
 from brevo_mail import send_admin_otp_email
+import auth
+import bulk_mail
+import serializers
 import random
 import string
 import os
@@ -38,6 +42,7 @@ def register():
 
 
 @admin_bp.route("/login", methods=["POST"])
+@rate_limit("login")
 def login():
     data = request.json or {}
     username = data.get("username")
@@ -49,7 +54,13 @@ def login():
     if username != Config.ADMIN_USERNAME:
         return jsonify({"error": "Invalid credentials"}), 401
 
-    if password != Config.ADMIN_PASSWORD:
+    # Password set through the reset flow, else the configured default (hashed once)
+    admin_settings = AdminSettings.query.filter_by(admin_id=1).first()
+    verified = bool(
+        admin_settings and admin_settings.password_hash
+        and check_password_hash(admin_settings.password_hash, password)
+    )
+    if not verified and not check_password_hash(get_admin_password_hash(), password):
         return jsonify({"error": "Invalid credentials"}), 401
 
     # Create access token for admin
@@ -76,70 +87,66 @@ def login():
 
 
 @admin_bp.route("/verify", methods=["GET"])
-@jwt_required()
 def verify():
-    claims = get_jwt()
-    if not claims or claims.get("role") != "Admin":
-        return jsonify({"error": "Forbidden"}), 403
+    principal, error = auth.require_admin()
+    if error:
+        return error
     return jsonify({
         "message": "Token valid",
         "admin": {
-            "admin_id": claims.get("admin_id"),
-            "username": claims.get("username"),
-            "email": claims.get("email"),
-            "role": claims.get("role"),
+            "admin_id": principal.claims.get("admin_id"),
+            "username": principal.claims.get("username"),
+            "email": principal.claims.get("email"),
+            "role": principal.claims.get("role"),
         },
     })
 
 
 @admin_bp.route("/refresh", methods=["POST"])
-@jwt_required()
 def refresh_token():
     """Refresh admin access token"""
-    claims = get_jwt()
-    if not claims or claims.get("role") != "Admin":
-        return jsonify({"error": "Forbidden"}), 403
+    principal, error = auth.require_admin()
+    if error:
+        return error
     
     # Create new access token with same claims
     new_token = create_access_token(
         identity="admin_1",
         additional_claims={
-            "admin_id": claims.get("admin_id"),
-            "username": claims.get("username"),
-            "email": claims.get("email"),
-            "role": claims.get("role")
+            "admin_id": principal.claims.get("admin_id"),
+            "username": principal.claims.get("username"),
+            "email": principal.claims.get("email"),
+            "role": principal.claims.get("role")
         }
     )
     
     return jsonify({
         "access_token": new_token,
         "admin": {
-            "admin_id": claims.get("admin_id"),
-            "username": claims.get("username"),
-            "email": claims.get("email"),
-            "role": claims.get("role"),
+            "admin_id": principal.claims.get("admin_id"),
+            "username": principal.claims.get("username"),
+            "email": principal.claims.get("email"),
+            "role": principal.claims.get("role"),
         },
     })
 
 
 @admin_bp.route("/change_password", methods=["POST"])
-@jwt_required()
 def change_password():
     """Password change disabled - admin password is configured by the website owner"""
-    claims = get_jwt()
-    if not claims or claims.get("role") != "Admin":
-        return jsonify({"error": "Forbidden"}), 403
+    principal, error = auth.require_admin()
+    if error:
+        return error
     
     return jsonify({"error": "Password change is disabled. Admin credentials are configured by the website owner through environment variables or config."}), 403
 
 
 @admin_bp.route("/list", methods=["GET"])
-@jwt_required()
 def list_admins():
     """List admins - returns only the hardcoded admin"""
-    claims = get_jwt()
-    if not claims or claims.get("role") != "Admin":
-        return jsonify({"error": "Forbidden"}), 403
+    principal, error = auth.require_admin()
+    if error:
+        return error
 
     return jsonify([{
         "admin_id": 1,
@@ -151,15 +158,14 @@ def list_admins():
 
 
 @admin_bp.route("/stats", methods=["GET"])
-@jwt_required()
 def admin_stats():
     """Admin-only stats endpoint mirroring /api/stats/summary."""
-    claims = get_jwt()
-    if not claims or claims.get("role") != "Admin":
-        return jsonify({"error": "Forbidden"}), 403
+    principal, error = auth.require_admin()
+    if error:
+        return error
 
     try:
-        from sqlalchemy import case, func
+        from sqlalchemy import case
         stats = db.session.query(
             func.count(Order.order_id).label('total_orders'),
             func.sum(Order.total_amount).label('revenue'),
@@ -199,6 +205,72 @@ def admin_stats():
         return jsonify({"error": f"Failed to fetch stats: {str(e)}"}), 500
 
 
+# Customers a broadcast can target
+BROADCAST_AUDIENCES = {
+    "all": lambda q: q,
+    "registered": lambda q: q.filter(Customer.password_hash.isnot(None)),
+}
+
+
+@admin_bp.route("/broadcast", methods=["POST"])
+def broadcast():
+    """Email an announcement to customers through the bulk mail pipeline."""
+    principal, error = auth.require_admin()
+    if error:
+        return error
+
+    data = request.json or {}
+    title = (data.get("title") or "").strip()
+    message = (data.get("message") or "").strip()
+    audience = data.get("audience", "all")
+    if not title or not message:
+        return jsonify({"error": "title and message required"}), 400
+    if audience not in BROADCAST_AUDIENCES:
+        return jsonify({"error": f"audience must be one of {sorted(BROADCAST_AUDIENCES)}"}), 400
+
+    try:
+        query = db.session.query(Customer.email, Customer.full_name).filter(
+            Customer.email.isnot(None), Customer.email != ""
+        )
+        seen = set()
+        recipients = []
+        for email, name in BROADCAST_AUDIENCES[audience](query).yield_per(1000):
+            key = email.strip().lower()
+            if key not in seen:
+                seen.add(key)
+                recipients.append({"email": email.strip(), "name": name})
+
+        job = bulk_mail.start("announcement", recipients, {"title": title, "message": message}, audience=audience)
+        return jsonify(serializers.bulk_mail_job(job)), 202
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Failed to start broadcast: {str(e)}"}), 500
+
+
+@admin_bp.route("/bulk-mail", methods=["GET"])
+def list_bulk_mail_jobs():
+    """Recent broadcast jobs, newest first."""
+    principal, error = auth.require_admin()
+    if error:
+        return error
+
+    jobs = BulkMailJob.query.order_by(BulkMailJob.job_id.desc()).limit(50).all()
+    return jsonify([serializers.bulk_mail_job(j) for j in jobs])
+
+
+@admin_bp.route("/bulk-mail/<int:job_id>", methods=["GET"])
+def get_bulk_mail_job(job_id):
+    """Progress of one broadcast job, including failed addresses."""
+    principal, error = auth.require_admin()
+    if error:
+        return error
+
+    job = BulkMailJob.query.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(serializers.bulk_mail_job(job, include_failed=True))
+
+
 @admin_bp.route("/forgot-password", methods=["POST"])
 def admin_forgot_password():
     """DEPRECATED - use /api/users/admin/forgot-password"""
@@ -1,50 +1,186 @@
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from extensions import db, socketio, emit_with_namespace
 from models import Customer, Order
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+from ratelimit import rate_limit
+from passwords import generate_password_hash, check_password_hash, needs_rehash
+from flask_jwt_extended import create_access_token
 from config import Config
+from datetime import datetime
+from decimal import Decimal
+import base64
+import csv
+import io
+import json
+import auth
+import customer_stats
+import serializers
 
 customers_bp = Blueprint("customers", __name__)
 
+# Rows fetched per round trip (and flushed per chunk) by the CSV export
+EXPORT_BATCH_SIZE = 500
+
+# ?sort= values for the paginated customer list
+CUSTOMER_SORTS = {
+    "created_at": Customer.created_at,
+    "total_spent": Customer.total_spent,
+    "total_orders_count": Customer.total_orders_count,
+}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _search_filter(query, q):
+    """Case-insensitive substring match on name, email and phone (trigram-indexed on PostgreSQL)."""
+    q = (q or "").strip()
+    if not q:
+        return query
+    pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    return query.filter(db.or_(
+        Customer.full_name.ilike(pattern, escape="\\"),
+        Customer.email.ilike(pattern, escape="\\"),
+        Customer.phone_number.ilike(pattern, escape="\\"),
+    ))
+
+
+def _encode_cursor(sort, value, customer_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif value is not None and not isinstance(value, int):
+        value = str(value)
+    raw = json.dumps([sort, value, customer_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor, sort):
+    try:
+        cursor_sort, value, customer_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort:
+        raise ValueError("Cursor does not match sort")
+    try:
+        if sort == "created_at":
+            value = datetime.fromisoformat(value)
+        elif sort == "total_spent":
+            value = Decimal(value)
+        return value, int(customer_id)
+    except (ValueError, TypeError, KeyError, ArithmeticError):
+        # null or non-string values decoded from a tampered cursor
+        raise ValueError("Invalid cursor")
+
+
+def _list_customers_page(args):
+    """Keyset page: ?q=&sort=created_at|total_spent|total_orders_count&order=asc|desc&limit=&cursor="""
+    sort = args.get("sort", "created_at")
+    if sort not in CUSTOMER_SORTS:
+        raise ValueError(f"sort must be one of {', '.join(CUSTOMER_SORTS)}")
+    descending = args.get("order", "desc").lower() != "asc"
+    try:
+        limit = min(max(int(args.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+
+    column = CUSTOMER_SORTS[sort]
+    query = _search_filter(Customer.query, args.get("q"))
+
+    cursor = args.get("cursor")
+    if cursor:
+        value, last_id = _decode_cursor(cursor, sort)
+        if descending:
+            query = query.filter(db.tuple_(column, Customer.customer_id) < db.tuple_(value, last_id))
+        else:
+            query = query.filter(db.tuple_(column, Customer.customer_id) > db.tuple_(value, last_id))
+
+    if descending:
+        query = query.order_by(column.desc(), Customer.customer_id.desc())
+    else:
+        query = query.order_by(column.asc(), Customer.customer_id.asc())
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = _encode_cursor(sort, getattr(last, sort), last.customer_id)
+    return {
+        "customers": [serializers.customer(c) for c in rows],
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }
+
+
 @customers_bp.route("/", methods=["GET"])
-@jwt_required()
 def get_customers():
-    claims = get_jwt()
-    if not claims or claims.get("role") != "Admin":
-        return jsonify({"error": "Forbidden"}), 403
-    
-    from sqlalchemy import func
-    
-    # Single O(1) query to get all customers + aggregated order counts + total spent
-    # Uses a LEFT OUTER JOIN to ensure customers with 0 orders are still included
-    results = db.session.query(
-        Customer,
-        func.count(Order.order_id).label('orders_count'),
-        func.coalesce(func.sum(Order.total_amount), 0).label('total_spent')
-    ).outerjoin(
-        Order, Customer.customer_id == Order.customer_id
-    ).group_by(
-        Customer.customer_id
-    ).all()
-    
-    customer_list = []
-    
-    for c, orders_count, total_spent in results:
-        customer_data = {
-            "customer_id": c.customer_id,
-            "full_name": c.full_name,
-            "phone_number": c.phone_number,
-            "email": c.email,
-            "total_orders_count": orders_count,
-            "total_spent": float(total_spent),
-            "created_at": c.created_at.isoformat() if c.created_at else None,
-            "is_registered": bool(c.password_hash)
-        }
-        customer_list.append(customer_data)
-    
-    return jsonify(customer_list)
+    """Admin customer list.
+
+    With any of q, sort, order, limit or cursor this returns one keyset
+    page ({customers, next_cursor, has_more}); without them it returns the
+    full list as a plain array for older dashboard builds.
+    """
+    principal, error = auth.require_admin()
+    if error:
+        return error
+
+    if any(k in request.args for k in ("q", "sort", "order", "limit", "cursor")):
+        try:
+            return jsonify(_list_customers_page(request.args))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    # Aggregates are stored on the customer row (see customer_stats), so this
+    # is a plain table read with no join over orders
+    customers = Customer.query.order_by(Customer.customer_id).all()
+    return jsonify([serializers.customer(c) for c in customers])
+
+
+@customers_bp.route("/export.csv", methods=["GET"])
+def export_customers_csv():
+    """Stream every customer (optionally filtered by ?q=) as CSV without loading the list into memory."""
+    principal, error = auth.require_admin()
+    if error:
+        return error
+
+    columns = ["customer_id", "full_name", "phone_number", "email",
+               "total_orders_count", "total_spent", "created_at", "is_registered"]
+    query = _search_filter(db.session.query(
+        Customer.customer_id,
+        Customer.full_name,
+        Customer.phone_number,
+        Customer.email,
+        Customer.total_orders_count,
+        Customer.total_spent,
+        Customer.created_at,
+        Customer.password_hash.isnot(None),
+    ), request.args.get("q")).order_by(Customer.customer_id)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        rows = query.execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE)
+        for count, row in enumerate(rows, start=1):
+            customer_id, full_name, phone, email, orders_count, spent, created_at, registered = row
+            writer.writerow([
+                customer_id, full_name, phone, email or "",
+                orders_count or 0, spent if spent is not None else "0.00",
+                created_at.isoformat() if created_at else "", "yes" if registered else "no",
+            ])
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+
+    filename = f"customers-{datetime.utcnow():%Y%m%d}.csv"
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
 
 @customers_bp.route("/register", methods=["POST"])
@@ -75,24 +211,19 @@ def register_customer():
 
     # Emit real-time customer creation to admin room
     try:
-        payload = {
-            "customer_id": new_customer.customer_id,
-            "full_name": new_customer.full_name,
-            "phone_number": new_customer.phone_number,
-            "email": new_customer.email,
-            "total_orders_count": 0,
-            "total_spent": 0,
-            "created_at": new_customer.created_at.isoformat() if new_customer.created_at else None,
-            "is_registered": True,
-        }
+        payload = serializers.customer(new_customer)
         socketio.start_background_task(emit_with_namespace, 'customer_created', payload, room='admins')
     except Exception:
         pass
 
     # Associate previous orders (placed before signup) by matching email
     try:
+        previous_owners = {
+            cid for (cid,) in db.session.query(Order.customer_id).filter(Order.email == email).distinct()
+        }
         Order.query.filter_by(email=email).update({"customer_id": new_customer.customer_id})
         db.session.commit()
+        customer_stats.refresh(previous_owners | {new_customer.customer_id})
     except Exception:
         db.session.rollback()
 
@@ -102,6 +233,7 @@ def register_customer():
 
 
 @customers_bp.route("/login", methods=["POST"])
+@rate_limit("login")
 def login_customer():
     data = request.json or {}
     email = data.get("email")
@@ -117,16 +249,21 @@ def login_customer():
     if not check_password_hash(customer.password_hash, password):
         return jsonify({"error": "Invalid credentials"}), 401
 
+    # Upgrade hashes made with older parameters
+    if needs_rehash(customer.password_hash):
+        customer.password_hash = generate_password_hash(password)
+        db.session.commit()
+
     access_token = create_access_token(identity={"customer_id": customer.customer_id, "email": customer.email})
 
     return jsonify({"access_token": access_token, "customer": {"customer_id": customer.customer_id, "full_name": customer.full_name, "email": customer.email, "phone_number": customer.phone_number}})
 
 
 @customers_bp.route("/refresh", methods=["POST"])
-@jwt_required()
 def refresh_token():
     """Refresh customer access token"""
-    identity = get_jwt_identity()
+    principal = auth.current_principal()
+    identity = principal.claims.get("sub") if principal else None
     if not identity or not isinstance(identity, dict) or not identity.get("customer_id"):
         return jsonify({"error": "Unauthorized"}), 401
     
@@ -150,15 +287,13 @@ def refresh_token():
 
 
 @customers_bp.route("/<int:customer_id>/orders", methods=["GET"])
-@jwt_required()
 def get_customer_orders(customer_id):
     # ensure the token identity matches the requested customer id
-    identity = get_jwt_identity()
-    if not identity:
-        return jsonify({"error": "Unauthorized"}), 401
+    principal, error = auth.require_customer()
+    if error:
+        return error
 
-    token_customer_id = identity.get("customer_id")
-    if token_customer_id != customer_id:
+    if principal.customer_id != customer_id:
         return jsonify({"error": "Forbidden"}), 403
 
     orders = Order.query.filter_by(customer_id=customer_id).all()
@@ -173,7 +308,7 @@ def get_customer_orders(customer_id):
         "time": o.event_time,
         "venue": o.venue_address,
         "status": o.status,
-        "total_amount": o.total_amount
+        "total_amount": float(o.total_amount) if o.total_amount is not None else 0
     } for o in orders])
 
 @customers_bp.route("/", methods=["POST"])
@@ -187,16 +322,7 @@ def add_customer():
     db.session.add(new_customer)
     db.session.commit()
     try:
-        payload = {
-            "customer_id": new_customer.customer_id,
-            "full_name": new_customer.full_name,
-            "phone_number": new_customer.phone_number,
-            "email": new_customer.email,
-            "total_orders_count": 0,
-            "total_spent": 0,
-            "created_at": new_customer.created_at.isoformat() if new_customer.created_at else None,
-            "is_registered": bool(new_customer.password_hash)
-        }
+        payload = serializers.customer(new_customer)
         socketio.start_background_task(emit_with_namespace, 'customer_created', payload, room='admins')
     except Exception:
         pass
@@ -1,9 +1,11 @@
 from flask import Blueprint, jsonify
 from models import EventType
+import compression
 
 events_bp = Blueprint("events", __name__)
 
 @events_bp.route("/", methods=["GET"])
+@compression.cache_compressed
 def get_events():
     events = EventType.query.all()
     return jsonify([{
@@ -1,60 +1,25 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import IntegrityError
 import os
-import re
 import threading
+import asset_gc
+import auth
+import compression
+import menu_import
+import menu_publisher
+import serializers
+from menu_search import search_index
+from pricing import price_table
 from extensions import db, socketio, emit_with_namespace
-from models import MenuItem
-
-# S3 client lazy loading
-_s3_client = None
-
-def get_s3_client():
-    """Get or create S3 client with real lazy load logic."""
-    global _s3_client
-    if _s3_client is None:
-        try:
-            import boto3
-            from config import Config
-            if Config.AWS_S3_ENABLED:
-                _s3_client = boto3.client(
-                    's3',
-                    aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
-                    aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
-                    region_name=Config.AWS_S3_REGION
-                )
-        except ImportError:
-            pass
-    return _s3_client
-
-
+from models import MenuItem, MenuCategory, UploadedImage, menu_item_categories
 
 def _delete_image_asset(image_url: str):
     """Remove stored image from S3 or database based on URL."""
     if not image_url:
         return
 
-    # S3 URL deletion
-    if 's3' in image_url and '.amazonaws.com' in image_url:
-        try:
-            from config import Config
-            from urllib.parse import unquote_plus
-            # Extract bucket name and key from S3 URL
-            # Virtual-hosted: https://bucket.name.s3.region.amazonaws.com/key
-            # Path-style:     https://s3.region.amazonaws.com/bucket.name/key
-            match = re.search(r'https://(.+)\.s3\.[^.]+\.amazonaws\.com/(.+)', image_url)
-            if not match:
-                # Try path-style URL format
-                match = re.search(r'https://s3\.[^.]+\.amazonaws\.com/([^/]+)/(.+)', image_url)
-            if match:
-                bucket_name = match.group(1)
-                key = unquote_plus(match.group(2))  # Decode URL-encoded key (+ -> space)
-                
-                s3_client = get_s3_client()
-                if s3_client:
-                    s3_client.delete_object(Bucket=bucket_name, Key=key)
-                    print(f"✓ Deleted S3 object: {key}")
-        except Exception as e:
-            print(f"Error deleting S3 image {image_url}: {e}")
+    # S3 objects are queued and removed in batches by the asset GC worker
+    if asset_gc.enqueue(image_url):
         return
 
     # Legacy disk-based uploads
@@ -85,10 +50,16 @@ def _delete_image_asset(image_url: str):
 
 
 def _delete_image_asset_background(image_url: str):
-    """Run `_delete_image_asset` in a background thread with app context."""
+    """Delete an image without blocking the request.
+
+    S3 objects go straight onto the asset GC queue; local and database-backed
+    images are removed in a background thread with app context.
+    """
     if not image_url:
         return
-        
+    if asset_gc.enqueue(image_url):
+        return
+
     from flask import current_app
     app = current_app._get_current_object()
     
@@ -109,109 +80,212 @@ def _delete_image_asset_background(image_url: str):
 
 menu_bp = Blueprint("menu", __name__)
 
+
+MENU_NAME_UNIQUE_INDEX = "uq_menu_items_lower_item_name"
+
+
+def _is_duplicate_name_error(error):
+    """True if an IntegrityError came from the case-insensitive menu item name index."""
+    orig = getattr(error, "orig", error)
+    diag = getattr(orig, "diag", None)
+    constraint = getattr(diag, "constraint_name", None)
+    if constraint:
+        return constraint == MENU_NAME_UNIQUE_INDEX
+    return MENU_NAME_UNIQUE_INDEX in str(orig)
+
+
+def _get_search_index():
+    """Return the search index, rebuilding it from the database when stale."""
+    if search_index.is_stale:
+        search_index.rebuild([serializers.menu_item(m) for m in MenuItem.query.all()])
+    return search_index
+
+
+def _parse_bool_arg(name):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    return value.strip().lower() in ("1", "true", "yes")
+
+
+def _parse_float_arg(name):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def _items_in_category(query, category):
+    """Restrict a MenuItem query to one category via the indexed association table."""
+    slug = MenuCategory.slugify(category)
+    return query.join(menu_item_categories, menu_item_categories.c.item_id == MenuItem.item_id) \
+        .join(MenuCategory, MenuCategory.category_id == menu_item_categories.c.category_id) \
+        .filter(MenuCategory.slug == slug)
+
+
 @menu_bp.route("/", methods=["GET"])
+@compression.cache_compressed
 def get_menu():
-    items = MenuItem.query.all()
-    return jsonify([{
-        "item_id": m.item_id,
-        "item_name": m.item_name,
-        "price_per_plate": m.price_per_plate,
-        "category": m.category,
-        "is_vegetarian": m.is_vegetarian,
-        "image_url": m.image_url,
-        "description": m.description,
-        "is_available": m.is_available,
-        "stock_quantity": m.stock_quantity if m.stock_quantity is not None else 100
-    } for m in items])
+    query = MenuItem.query
+    category = request.args.get("category")
+    if category:
+        query = _items_in_category(query, category)
+    items = query.all()
+    return jsonify([serializers.menu_item(m) for m in items])
+
+
+@menu_bp.route("/categories", methods=["GET"])
+@compression.cache_compressed
+def get_categories():
+    """List categories with their item counts."""
+    rows = db.session.query(
+        MenuCategory.name,
+        MenuCategory.slug,
+        db.func.count(menu_item_categories.c.item_id)
+    ).outerjoin(
+        menu_item_categories, menu_item_categories.c.category_id == MenuCategory.category_id
+    ).group_by(
+        MenuCategory.category_id
+    ).order_by(MenuCategory.name).all()
+    return jsonify([{"name": name, "slug": slug, "item_count": count} for name, slug, count in rows])
+
+
+@menu_bp.route("/search", methods=["GET"])
+def search_menu():
+    """Search menu items by name, description and category.
+
+    Query params: q, veg, available, min_price, max_price, limit.
+    Matching is prefix- and typo-tolerant and served from memory.
+    """
+    try:
+        vegetarian = _parse_bool_arg("veg")
+        available = _parse_bool_arg("available")
+        min_price = _parse_float_arg("min_price")
+        max_price = _parse_float_arg("max_price")
+        limit = min(max(int(request.args.get("limit", 20)), 1), 200)
+    except ValueError:
+        return jsonify({"error": "Invalid filter value"}), 400
+
+    query = request.args.get("q", "")
+    results = _get_search_index().search(
+        query,
+        vegetarian=vegetarian,
+        available=available,
+        min_price=min_price,
+        max_price=max_price,
+        limit=limit,
+    )
+    return jsonify({"query": query, "count": len(results), "results": results})
 
 @menu_bp.route("/", methods=["POST"])
 def add_menu_item():
     data = request.json
     
-    # Check for duplicate item name (case-insensitive)
     item_name = data.get("item_name", "").strip()
     if not item_name:
         return jsonify({"message": "Item name is required"}), 400
     
-    existing = MenuItem.query.filter(
-        db.func.lower(MenuItem.item_name) == item_name.lower()
-    ).first()
-    if existing:
-        return jsonify({"message": f'"{item_name}" is already available in the menu'}), 409
-    
     categories = data.get("categories", [data.get("category")])
     if isinstance(categories, str):
         categories = [categories]
     
     item = MenuItem(
         item_name=item_name,
-        category=categories,
         price_per_plate=data["price"],
         is_vegetarian=data.get("veg", True),
         image_url=data.get("image", ""),
         description=data.get("description")
     )
+    item.set_categories(categories)
     db.session.add(item)
     try:
+        # Duplicate names (case-insensitive) are rejected by the unique index
+        # on lower(item_name): one indexed INSERT, no pre-check round-trip
         db.session.commit()
-    except Exception as e:
+    except IntegrityError as e:
         db.session.rollback()
-        # Catch DB-level unique constraint violation (race condition safety net)
-        if 'unique' in str(e).lower() or 'duplicate' in str(e).lower():
+        if _is_duplicate_name_error(e):
             return jsonify({"message": f'"{item_name}" is already available in the menu'}), 409
         raise
     
+    item_data = serializers.menu_item(item)
+    search_index.upsert(item_data)
+
+    price_table.invalidate()
+    compression.invalidate()
+    menu_publisher.schedule_publish()
+
     # Broadcast new menu item to all clients
-    socketio.start_background_task(emit_with_namespace, 'menu_item_added', {
-        'item_id': item.item_id,
-        'item_name': item.item_name,
-        'price_per_plate': float(item.price_per_plate),
-        'category': item.category,
-        'is_vegetarian': item.is_vegetarian,
-        'image_url': item.image_url,
-        'description': item.description,
-        'is_available': item.is_available,
-        'stock_quantity': item.stock_quantity if item.stock_quantity is not None else 100
-    })
+    socketio.start_background_task(emit_with_namespace, 'menu_item_added', item_data)
     
     return jsonify({"message": "Item Added", "item_id": item.item_id})
 
+@menu_bp.route("/bulk", methods=["POST"])
+def bulk_import_menu_items():
+    """Create or update many menu items in one transaction (admin only).
+
+    Accepts a JSON array (or {"items": [...]}), a text/csv body, or a CSV
+    file upload in the `file` field. Items are matched on lower(item_name).
+    """
+    principal, error = auth.require_admin()
+    if error:
+        return error
+
+    try:
+        if "file" in request.files:
+            rows = menu_import.parse_csv(request.files["file"].read().decode("utf-8-sig"))
+        elif request.mimetype == "text/csv":
+            rows = menu_import.parse_csv(request.get_data(as_text=True))
+        else:
+            data = request.get_json(silent=True)
+            rows = data.get("items") if isinstance(data, dict) else data
+        created, updated = menu_import.upsert_menu_items(rows)
+    except menu_import.MenuImportError as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 400
+    except UnicodeDecodeError:
+        return jsonify({"error": "CSV file must be UTF-8 encoded"}), 400
+    except IntegrityError as e:
+        if _is_duplicate_name_error(e):
+            return jsonify({"error": "Import conflicts with existing menu items", "details": str(e.orig)}), 409
+        raise
+
+    # Invalidate derived caches once for the whole batch
+    items = [serializers.menu_item(m) for m in created + updated]
+    for item_data in items:
+        search_index.upsert(item_data)
+    price_table.invalidate()
+    compression.invalidate()
+    menu_publisher.schedule_publish()
+
+    socketio.start_background_task(emit_with_namespace, 'menu_bulk_updated', {
+        'created': len(created),
+        'updated': len(updated),
+        'items': items
+    })
+
+    return jsonify({
+        "message": "Menu import complete",
+        "created": len(created),
+        "updated": len(updated),
+        "item_ids": [item["item_id"] for item in items]
+    })
+
 @menu_bp.route("/<int:id>", methods=["PUT"])
 def update_menu_item(id):
     item = MenuItem.query.get_or_404(id)
     data = request.json
     
-    # Check for duplicate name if renaming (case-insensitive)
     new_name = data.get("item_name", item.item_name).strip()
-    if new_name.lower() != item.item_name.strip().lower():
-        existing = MenuItem.query.filter(
-            db.func.lower(MenuItem.item_name) == new_name.lower(),
-            MenuItem.item_id != id
-        ).first()
-        if existing:
-            return jsonify({"message": f'"{new_name}" is already available in the menu'}), 409
-    
     new_image_url = data.get("image", "")
     old_image_url = item.image_url
     
-    # If new image provided and different from old, delete old in background
-    if new_image_url and new_image_url != old_image_url:
-        _delete_image_asset_background(old_image_url)
-    
     item.item_name = new_name
     
     # Handle categories - support both single and multiple
     if "categories" in data:
-        categories = data["categories"]
-        if isinstance(categories, str):
-            categories = [categories]
-        item.category = categories
+        item.set_categories(data["categories"])
     elif "category" in data:
-        category = data["category"]
-        if isinstance(category, str):
-            item.category = [category]
-        else:
-            item.category = category
+        item.set_categories(data["category"])
     
     item.price_per_plate = data.get("price", item.price_per_plate)
     item.is_vegetarian = data.get("veg", item.is_vegetarian)
@@ -221,25 +295,24 @@ def update_menu_item(id):
     item.is_available = data.get("is_available", item.is_available)
     
     try:
+        # Renames onto an existing name (any case) violate the lower(item_name) index
         db.session.commit()
-    except Exception as e:
+    except IntegrityError as e:
         db.session.rollback()
-        if 'unique' in str(e).lower() or 'duplicate' in str(e).lower():
+        if _is_duplicate_name_error(e):
             return jsonify({"message": f'"{new_name}" is already available in the menu'}), 409
         raise
     
+    # If new image provided and different from old, delete old in background
+    if new_image_url and new_image_url != old_image_url:
+        _delete_image_asset_background(old_image_url)
+    
     # Snapshot for socket broadcast
-    item_data = {
-        'item_id': item.item_id,
-        'item_name': item.item_name,
-        'price_per_plate': float(item.price_per_plate),
-        'category': item.category,
-        'is_vegetarian': item.is_vegetarian,
-        'image_url': item.image_url,
-        'description': item.description,
-        'is_available': item.is_available,
-        'stock_quantity': item.stock_quantity if item.stock_quantity is not None else 100
-    }
+    item_data = serializers.menu_item(item)
+    search_index.upsert(item_data)
+    price_table.invalidate()
+    compression.invalidate()
+    menu_publisher.schedule_publish()
     
     socketio.start_background_task(emit_with_namespace, 'menu_item_updated', item_data)
     
@@ -255,6 +328,10 @@ def delete_menu_item(id):
     _delete_image_asset_background(old_image_url)
     db.session.delete(item)
     db.session.commit()
+    search_index.remove(item_id)
+    price_table.invalidate()
+    compression.invalidate()
+    menu_publisher.schedule_publish()
     
     # Broadcast item deletion to all clients in background thread
     socketio.start_background_task(emit_with_namespace, 'menu_item_deleted', {
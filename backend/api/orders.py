@@ -1,21 +1,28 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from extensions import db, socketio, emit_with_namespace
 from models import Order, OrderMenuItem, Customer, MenuItem
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, jwt_required, get_jwt
 from sqlalchemy.orm import joinedload
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
+from db_types import parse_date, parse_time
 from brevo_mail import send_order_confirmation_email, send_order_cancellation_email
-import hashlib
-import os
+from menu_search import search_index
+import compression
+import menu_publisher
+import production_plan
+import customer_stats
+import auth
+import serializers
+from pricing import price_table, PricingError
+from idempotency import idempotent
+from ratelimit import rate_limit
+import csv
+import io
 import threading
 
 orders_bp = Blueprint("orders", __name__)
 
-# Track recent order requests to prevent duplicates during network issues
-# Key: hash(email + timestamp), Value: order_id
-_order_request_cache = {}
-
 def emit_stats_update():
     """Emit updated stats to all admin clients"""
     try:
@@ -84,47 +91,241 @@ def trigger_order_confirmation_email(order_id):
     thread.start()
 
 @orders_bp.route("/", methods=["GET"])
-@jwt_required()
 def get_orders():
     try:
-        claims = get_jwt()
-        if not claims or claims.get("role") != "Admin":
-            return jsonify({"error": "Forbidden"}), 403
+        principal, error = auth.require_admin()
+        if error:
+            return error
         
         # Use joinedload to eagerly load relationships
         orders = Order.query.options(
             joinedload(Order.menu_items).joinedload(OrderMenuItem.menu_item)
         ).all()
         
-        return jsonify([{
-            "order_id": o.order_id,
-            "customer_name": o.customer_name,
-            "phone_number": o.phone_number,
-            "email": o.email,
-            "event_type": o.event_type,
-            "number_of_guests": o.number_of_guests,
-            "event_date": o.event_date,
-            "event_time": o.event_time,
-            "venue_address": o.venue_address,
-            "special_requirements": o.special_requirements,
-            "status": o.status,
-            "total_amount": float(o.total_amount) if o.total_amount else 0,
-            "payment_method": o.payment_method,
-            "created_at": o.created_at.isoformat() if o.created_at else None,
-            "items": [{
-                "menu_item_id": item.menu_item_id,
-                "quantity": item.quantity,
-                "price_at_order_time": float(item.price_at_order_time) if item.price_at_order_time else 0,
-                "item_name": item.menu_item.item_name if item.menu_item else "Unknown"
-            } for item in o.menu_items]
-        } for o in orders])
+        return jsonify([serializers.order(o, items=True) for o in orders])
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({"error": "Failed to fetch orders", "details": str(e)}), 500
 
 
+def _parse_date_range(default_days=30, max_days=366):
+    """Read ?from=&to= (defaults: today .. today + default_days). Raises ValueError."""
+    start = parse_date(request.args.get("from"))
+    end = parse_date(request.args.get("to"))
+    if start is None:
+        start = datetime.utcnow().date()
+    if end is None:
+        end = start + timedelta(days=default_days)
+    if end < start:
+        raise ValueError("'to' must not be before 'from'")
+    if (end - start).days > max_days:
+        raise ValueError(f"Date range is limited to {max_days} days")
+    return start, end
+
+
+@orders_bp.route("/calendar", methods=["GET"])
+def get_calendar():
+    """Per-day capacity totals: GET /api/orders/calendar?from=YYYY-MM-DD&to=YYYY-MM-DD
+
+    Returns the number of orders, guests and plates (sum of item quantities)
+    for each event day in the range, excluding cancelled orders.
+    """
+    try:
+        principal, error = auth.require_admin()
+        if error:
+            return error
+
+        try:
+            start, end = _parse_date_range()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        plates = db.session.query(
+            OrderMenuItem.order_id.label("order_id"),
+            func.sum(OrderMenuItem.quantity).label("plates")
+        ).group_by(OrderMenuItem.order_id).subquery()
+
+        rows = db.session.query(
+            Order.event_date,
+            func.count(Order.order_id),
+            func.coalesce(func.sum(Order.number_of_guests), 0),
+            func.coalesce(func.sum(plates.c.plates), 0)
+        ).outerjoin(
+            plates, plates.c.order_id == Order.order_id
+        ).filter(
+            Order.event_date >= start,
+            Order.event_date <= end,
+            Order.status != "Cancelled"
+        ).group_by(Order.event_date).order_by(Order.event_date).all()
+
+        return jsonify({
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "days": [{
+                "date": event_date,
+                "orders": order_count,
+                "guests": int(guests),
+                "plates": int(plate_count)
+            } for event_date, order_count, guests, plate_count in rows]
+        })
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": "Failed to fetch calendar", "details": str(e)}), 500
+
+
+@orders_bp.route("/production-plan", methods=["GET"])
+def get_production_plan():
+    """Kitchen plan: GET /api/orders/production-plan?from=YYYY-MM-DD&to=YYYY-MM-DD
+
+    Total quantity per dish for each event date, excluding cancelled orders.
+    quantity is the billed line quantity summed across orders (bulk orders
+    already carry one plate per guest).
+    Served from the in-memory materialization; pass ?fresh=1 to aggregate
+    directly in the database instead.
+    """
+    try:
+        principal, error = auth.require_admin()
+        if error:
+            return error
+
+        try:
+            start, end = _parse_date_range(default_days=7, max_days=92)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        dates = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+        if request.args.get("fresh", "").lower() in ("1", "true", "yes"):
+            days = production_plan.get_plan_uncached(dates)
+        else:
+            days = production_plan.get_plan(dates)
+
+        return jsonify({"from": start.isoformat(), "to": end.isoformat(), "days": days})
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": "Failed to build production plan", "details": str(e)}), 500
+
+
+EXPORT_ORDER_COLUMNS = [
+    "order_id", "created_at", "status", "payment_method", "customer_id", "customer_name",
+    "phone_number", "email", "event_type", "number_of_guests", "event_date", "event_time",
+    "venue_address", "total_amount", "razorpay_order_id",
+]
+EXPORT_ITEM_COLUMNS = ["menu_item_id", "item_name", "quantity", "price_at_order_time"]
+
+# Rows fetched per round trip by the order export
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_rows(query):
+    """Group the flat (order columns + item columns) rows into (order dict, [item dicts])."""
+    current, items = None, []
+    n_order = len(EXPORT_ORDER_COLUMNS)
+    for row in query.execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE):
+        if current is None or current["order_id"] != row[0]:
+            if current is not None:
+                yield current, items
+            current = dict(zip(EXPORT_ORDER_COLUMNS, row[:n_order]))
+            current["created_at"] = current["created_at"].isoformat() if current["created_at"] else None
+            current["total_amount"] = float(current["total_amount"]) if current["total_amount"] is not None else 0
+            items = []
+        if row[n_order] is not None:
+            item = dict(zip(EXPORT_ITEM_COLUMNS, row[n_order:]))
+            item["price_at_order_time"] = float(item["price_at_order_time"]) if item["price_at_order_time"] is not None else 0
+            items.append(item)
+    if current is not None:
+        yield current, items
+
+
+@orders_bp.route("/export", methods=["GET"])
+def export_orders():
+    """Stream orders with their line items for accounting.
+
+    GET /api/orders/export?format=csv|ndjson&from=&to=&date_field=created_at|event_date&status=Paid,Delivered
+
+    CSV has one row per line item (order columns repeated); NDJSON has one
+    order per line with an items array. Rows are read through a server-side
+    cursor and written as they arrive, so memory stays flat for any range.
+    """
+    principal, error = auth.require_admin()
+    if error:
+        return error
+
+    export_format = request.args.get("format", "csv").lower()
+    if export_format not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    date_field = request.args.get("date_field", "created_at")
+    if date_field not in ("created_at", "event_date"):
+        return jsonify({"error": "date_field must be created_at or event_date"}), 400
+    try:
+        start = parse_date(request.args.get("from"))
+        end = parse_date(request.args.get("to"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = db.session.query(
+        *[getattr(Order, c) for c in EXPORT_ORDER_COLUMNS],
+        OrderMenuItem.menu_item_id,
+        MenuItem.item_name,
+        OrderMenuItem.quantity,
+        OrderMenuItem.price_at_order_time,
+    ).outerjoin(
+        OrderMenuItem, OrderMenuItem.order_id == Order.order_id
+    ).outerjoin(
+        MenuItem, MenuItem.item_id == OrderMenuItem.menu_item_id
+    )
+
+    if date_field == "created_at":
+        if start:
+            query = query.filter(Order.created_at >= datetime.combine(start, datetime.min.time()))
+        if end:
+            query = query.filter(Order.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    else:
+        if start:
+            query = query.filter(Order.event_date >= start)
+        if end:
+            query = query.filter(Order.event_date <= end)
+
+    statuses = [x.strip() for x in request.args.get("status", "").split(",") if x.strip()]
+    if statuses:
+        query = query.filter(Order.status.in_(statuses))
+
+    query = query.order_by(Order.order_id, OrderMenuItem.order_menu_id)
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_ORDER_COLUMNS + EXPORT_ITEM_COLUMNS)
+        yield buffer.getvalue()
+        for order, items in _export_rows(query):
+            buffer.seek(0)
+            buffer.truncate(0)
+            base = [order[c] if order[c] is not None else "" for c in EXPORT_ORDER_COLUMNS]
+            for item in items or [dict.fromkeys(EXPORT_ITEM_COLUMNS, "")]:
+                writer.writerow(base + [item[c] for c in EXPORT_ITEM_COLUMNS])
+            yield buffer.getvalue()
+
+    def generate_ndjson():
+        for order, items in _export_rows(query):
+            yield serializers.dumps({**order, "items": items}) + b"\n"
+
+    stamp = datetime.utcnow().strftime("%Y%m%d")
+    if export_format == "csv":
+        body, mimetype, filename = generate_csv(), "text/csv", f"orders-{stamp}.csv"
+    else:
+        body, mimetype, filename = generate_ndjson(), "application/x-ndjson", f"orders-{stamp}.ndjson"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
 @orders_bp.route("/", methods=["POST"])
+@rate_limit("create_order")
+@idempotent("create_order")
 def create_order():
     try:
         print("\n[CREATE_ORDER] Request received")
@@ -139,70 +340,25 @@ def create_order():
 
         print(f"[CREATE_ORDER] Menu items to add: {len(menu_items)} items - {menu_items}")
 
-        # Duplicate detection: Check if same email created order in last 5 seconds
-        email = data.get("email", "").lower().strip()
-        if email:
-            current_time = datetime.utcnow()
-            request_hash = hashlib.md5(email.encode()).hexdigest()
-            
-            # Check cache for recent requests from same email
-            if request_hash in _order_request_cache:
-                cached_time, cached_order_id = _order_request_cache[request_hash]
-                time_diff = (current_time - cached_time).total_seconds()
-                
-                # If within 5 seconds, return cached order (likely duplicate submission)
-                if time_diff < 5:
-                    print("[CREATE_ORDER] Duplicate order detected in cache")
-                    return jsonify({
-                        "message": "Order already exists",
-                        "order_id": cached_order_id,
-                        "duplicate": True
-                    }), 201
-            
-            # Clean old entries (older than 10 seconds)
-            _order_request_cache.clear() if len(_order_request_cache) > 100 else None
-
+        # event_date/event_time are stored as DATE/TIME; reject values that cannot be parsed
+        try:
+            parse_date(data.get("event_date"))
+            parse_time(data.get("event_time"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        # If a JWT is provided, verify it (optional)
-        identity = None
+        # Price the order from the server's menu prices; client prices are only checked
         try:
-            verify_jwt_in_request(optional=True)
-            identity = get_jwt_identity()
-        except:
-            pass
-        
-        # Also check for user token from our new auth system
-        user_token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        user_customer_id = None
-        if user_token and not identity:
-            try:
-                import jwt
-                SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "your-secret-key-change-in-production")
-                decoded = jwt.decode(user_token, SECRET_KEY, algorithms=["HS256"])
-                user_customer_id = decoded.get('user_id')
-                print(f"[CREATE_ORDER] JWT verified, user_customer_id: {user_customer_id}")
-            except Exception as jwt_err:
-                print(f"[CREATE_ORDER] JWT decode error: {jwt_err}")
-                pass
+            server_total, priced_lines = price_table.quote(menu_items, data.get("total_amount"))
+        except PricingError as e:
+            print(f"[CREATE_ORDER] Pricing rejected: {e}")
+            return jsonify({"error": str(e), **e.details}), e.status
 
-        # Handle customer_id from JWT - FIX: handle both string and dict
+        # If a token is provided, verify it (optional)
+        principal = auth.current_principal()
         payload_customer_id = data.get("customer_id")
-        identity_customer_id = None
-        
-        # Extract customer_id based on identity type
-        if identity:
-            if isinstance(identity, dict):
-                identity_customer_id = identity.get("customer_id")
-            elif isinstance(identity, (str, int)):
-                try:
-                    identity_customer_id = int(identity)
-                except (ValueError, TypeError):
-                    identity_customer_id = None
-        
-        # Use user_customer_id if available
-        if user_customer_id and not identity_customer_id:
-            identity_customer_id = user_customer_id
-        
+        identity_customer_id = principal.customer_id if principal and not principal.is_admin else None
+
         # Check authorization if both are present
         if payload_customer_id and identity_customer_id:
             if payload_customer_id != identity_customer_id:
@@ -233,10 +389,16 @@ def create_order():
                     phone_number=phone_number or "",
                     password_hash=None
                 )
-                db.session.add(new_customer)
-                db.session.flush()
-                customer_id = new_customer.customer_id
-                print(f"[CREATE_ORDER] Created new customer: {customer_id}")
+                try:
+                    # Savepoint: a concurrent checkout may create the same
+                    # customer first (customers.email is unique)
+                    with db.session.begin_nested():
+                        db.session.add(new_customer)
+                    customer_id = new_customer.customer_id
+                    print(f"[CREATE_ORDER] Created new customer: {customer_id}")
+                except IntegrityError:
+                    customer_id = Customer.query.filter_by(email=email).first().customer_id
+                    print(f"[CREATE_ORDER] Customer created concurrently: {customer_id}")
 
         # Create order
         print(f"[CREATE_ORDER] Creating order for customer_id: {customer_id}")
@@ -251,21 +413,17 @@ def create_order():
             event_time=data.get("event_time"),
             venue_address=data.get("venue") or data.get("address"),
             special_requirements=data.get("special"),
-            total_amount=data.get("total_amount"),
+            total_amount=server_total,
             payment_method=data.get("payment_method", "online")
         )
 
         db.session.add(order)
         db.session.flush()  # Get order_id without full commit
+        customer_stats.record_order_created(customer_id, server_total)
         print(f"[CREATE_ORDER] Order created with order_id: {order.order_id}")
         
-        # Cache this order to prevent duplicates from rapid submissions
-        if email:
-            request_hash = hashlib.md5(email.encode()).hexdigest()
-            _order_request_cache[request_hash] = (datetime.utcnow(), order.order_id)
-
         # Bulk load all menu items to avoid N+1 queries
-        menu_item_ids = [item.get("id") for item in menu_items]
+        menu_item_ids = [item_id for item_id, _, _ in priced_lines]
         print(f"[CREATE_ORDER] Looking up menu_item_ids: {menu_item_ids}")
         
         menu_items_map = {mi.item_id: mi for mi in MenuItem.query.filter(MenuItem.item_id.in_(menu_item_ids)).all()}
@@ -274,13 +432,10 @@ def create_order():
         # Prepare batch operations
         order_menu_items = []
         inventory_updates = []
+        availability_changed = False
         
         # Save menu items and prepare stock updates
-        for item in menu_items:
-            item_id = item.get("id")
-            qty = item.get("qty", 1)
-            price = item.get("price", 0)
-            
+        for item_id, qty, price in priced_lines:
             print(f"[CREATE_ORDER] Adding item: id={item_id}, qty={qty}, price={price}")
             
             om = OrderMenuItem(
@@ -299,8 +454,9 @@ def create_order():
                 menu_item.stock_quantity = max(0, menu_item.stock_quantity - qty)
                 
                 # Mark as unavailable if stock reaches 0
-                if menu_item.stock_quantity == 0:
+                if menu_item.stock_quantity == 0 and menu_item.is_available:
                     menu_item.is_available = False
+                    availability_changed = True
                 
                 print(f"[CREATE_ORDER] Updated stock for {menu_item.item_name}: {old_stock} -> {menu_item.stock_quantity}")
                 
@@ -318,22 +474,23 @@ def create_order():
         # Single commit for all database operations
         db.session.commit()
         print(f"[CREATE_ORDER] Order and items committed successfully")
+
+        # Keep the in-memory menu search index in sync with stock changes
+        for inv_update in inventory_updates:
+            search_index.update_fields(
+                inv_update['item_id'],
+                stock_quantity=inv_update['new_stock'],
+                is_available=inv_update['is_available']
+            )
+        if inventory_updates:
+            compression.invalidate()
+        # Snapshots carry availability, not stock counts
+        if availability_changed:
+            menu_publisher.schedule_publish()
+        production_plan.record_order(order)
         
         # Prepare data for background tasks
-        order_data = {
-            'order_id': order.order_id,
-            'customer_name': order.customer_name,
-            'phone_number': order.phone_number,
-            'email': order.email,
-            'event_type': order.event_type,
-            'number_of_guests': order.number_of_guests,
-            'event_date': order.event_date,
-            'event_time': order.event_time,
-            'status': order.status,
-            'total_amount': float(order.total_amount) if order.total_amount else 0,
-            'venue_address': order.venue_address,
-            'created_at': order.created_at.isoformat() if order.created_at else None,
-        }
+        order_data = serializers.order(order)
         
         # Prepare menu items details for email
         menu_items_details = []
@@ -376,9 +533,8 @@ def create_order():
         
         # Capture the real app object for background thread
         app = current_app._get_current_object()
-        _customer_id = customer_id
 
-        # Background tasks: inventory updates, customer stats (non-critical)
+        # Background tasks: inventory updates (non-critical)
         def background_tasks():
             with app.app_context():
                 try:
@@ -388,16 +544,6 @@ def create_order():
                             socketio.start_background_task(emit_with_namespace, 'inventory_changed', inv_update)
                         except Exception as e:
                             pass
-                    
-                    # Update customer order count
-                    if _customer_id:
-                        try:
-                            customer = Customer.query.get(_customer_id)
-                            if customer:
-                                customer.total_orders_count = Order.query.filter_by(customer_id=_customer_id).count()
-                                db.session.commit()
-                        except Exception as e:
-                            print(f"Customer stats update error: {str(e)}")
                 except Exception as e:
                     print(f"[ERROR] Background tasks error: {str(e)}")
         
@@ -430,52 +576,13 @@ def get_order(id):
         # Optional JWT verification for logged-in customers
         # Non-logged-in customers can still view by order ID (simple security model)
         # For enhanced security in production, require JWT with customer_id match
-        try:
-            verify_jwt_in_request(optional=True)
-            identity = get_jwt_identity()
-            if identity:
-                # If JWT is provided, verify customer owns this order
-                claims = get_jwt()
-                if claims and claims.get("role") != "Admin":
-                    customer_id = None
-                    if isinstance(identity, dict):
-                        customer_id = identity.get("customer_id")
-                    elif isinstance(identity, (str, int)):
-                        try:
-                            customer_id = int(identity)
-                        except (ValueError, TypeError):
-                            pass
-                    
-                    if customer_id and order.customer_id != customer_id:
-                        return jsonify({"error": "Unauthorized"}), 403
-        except:
-            # No JWT provided - allow public access (simple model)
-            pass
+        principal = auth.current_principal()
+        if principal and not principal.is_admin:
+            # If a customer token is provided, verify the customer owns this order
+            if principal.customer_id and order.customer_id != principal.customer_id:
+                return jsonify({"error": "Unauthorized"}), 403
 
-        return jsonify({
-            "order_id": order.order_id,
-            "customer_name": order.customer_name,
-            "phone_number": order.phone_number,
-            "email": order.email,
-            "event_type": order.event_type,
-            "number_of_guests": order.number_of_guests,
-            "event_date": order.event_date,
-            "event_time": order.event_time,
-            "venue_address": order.venue_address,
-            "special_requirements": order.special_requirements,
-            "status": order.status,
-            "total_amount": float(order.total_amount) if order.total_amount else 0,
-            "payment_method": order.payment_method,
-            "razorpay_order_id": order.razorpay_order_id,
-            "created_at": order.created_at.isoformat() if order.created_at else None,
-            "updated_at": order.updated_at.isoformat() if order.updated_at else None,
-            "items": [{
-                "menu_item_id": item.menu_item_id,
-                "quantity": item.quantity,
-                "price_at_order_time": float(item.price_at_order_time) if item.price_at_order_time else 0,
-                "item_name": item.menu_item.item_name if item.menu_item else "Unknown"
-            } for item in order.menu_items]
-        })
+        return jsonify(serializers.order(order, items=True, detail=True))
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -495,17 +602,9 @@ def request_cancel_order(id):
             return jsonify({"error": f"Cannot cancel order that is already {order.status.lower()}"}), 400
         
         # Verify customer ownership (check token if available)
-        user_token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        if user_token:
-            try:
-                import jwt as pyjwt
-                SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "your-secret-key-change-in-production")
-                decoded = pyjwt.decode(user_token, SECRET_KEY, algorithms=["HS256"])
-                user_customer_id = decoded.get('user_id')
-                if order.customer_id and user_customer_id != order.customer_id:
-                    return jsonify({"error": "Unauthorized"}), 403
-            except:
-                pass
+        principal = auth.current_principal()
+        if principal and not principal.is_admin and order.customer_id and principal.customer_id != order.customer_id:
+            return jsonify({"error": "Unauthorized"}), 403
         
         # Mark as cancellation requested
         order.special_requirements = (order.special_requirements or '') + f"\n[CANCELLATION REQUESTED at {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}]"
@@ -541,13 +640,12 @@ def request_cancel_order(id):
 
 
 @orders_bp.route("/<int:id>/approve-cancel", methods=["POST"])
-@jwt_required()
 def approve_cancel_order(id):
     """Admin approves order cancellation"""
     try:
-        claims = get_jwt()
-        if not claims or claims.get("role") != "Admin":
-            return jsonify({"error": "Forbidden - Admin only"}), 403
+        principal, error = auth.require_admin()
+        if error:
+            return error
         
         order = Order.query.get(id)
         if not order:
@@ -563,17 +661,29 @@ def approve_cancel_order(id):
         if approved:
             old_status = order.status
             order.status = "Cancelled"
+            customer_stats.record_status_change(order.customer_id, order.total_amount, old_status, "Cancelled")
             db.session.commit()
             
             # Restore stock for cancelled order
+            availability_changed = False
             for item in order.menu_items:
                 menu_item = MenuItem.query.get(item.menu_item_id)
                 if menu_item and menu_item.stock_quantity is not None:
                     menu_item.stock_quantity += item.quantity
-                    if menu_item.stock_quantity > 0:
+                    if menu_item.stock_quantity > 0 and not menu_item.is_available:
                         menu_item.is_available = True
+                        availability_changed = True
+                    search_index.update_fields(
+                        menu_item.item_id,
+                        stock_quantity=menu_item.stock_quantity,
+                        is_available=menu_item.is_available
+                    )
             
             db.session.commit()
+            compression.invalidate()
+            if availability_changed:
+                menu_publisher.schedule_publish()
+            production_plan.record_order(order)
             
             # Emit real-time update to all clients
             try:
@@ -646,12 +756,11 @@ def approve_cancel_order(id):
 
 
 @orders_bp.route("/status/<int:id>", methods=["PUT"])
-@jwt_required()
 def update_status(id):
     try:
-        claims = get_jwt()
-        if not claims or claims.get("role") != "Admin":
-            return jsonify({"error": "Forbidden"}), 403
+        principal, error = auth.require_admin()
+        if error:
+            return error
             
         order = Order.query.get(id)
         if not order:
@@ -663,7 +772,10 @@ def update_status(id):
             
         old_status = order.status
         order.status = new_status
+        customer_stats.record_status_change(order.customer_id, order.total_amount, old_status, new_status)
         db.session.commit()
+        if "Cancelled" in (old_status, new_status):
+            production_plan.record_order(order)
 
         # Trigger confirmation email only if status changed to Confirmed
         # AND it wasn't already Paid (because Paid orders already got the email via Razorpay verify)
@@ -675,23 +787,7 @@ def update_status(id):
             try:
                 customer = Customer.query.get(order.customer_id)
                 if customer:
-                    orders_for_customer = Order.query.filter_by(customer_id=order.customer_id).all()
-                    total_spent = sum((o.total_amount or 0) for o in orders_for_customer)
-                    orders_count = len(orders_for_customer)
-
-                    customer.total_orders_count = orders_count
-                    db.session.commit()
-
-                    payload = {
-                        "customer_id": customer.customer_id,
-                        "full_name": customer.full_name,
-                        "phone_number": customer.phone_number,
-                        "email": customer.email,
-                        "total_orders_count": orders_count,
-                        "total_spent": float(total_spent),
-                        "created_at": customer.created_at.isoformat() if customer.created_at else None,
-                        "is_registered": bool(customer.password_hash),
-                    }
+                    payload = serializers.customer(customer)
                     socketio.start_background_task(emit_with_namespace, 'customer_created', payload, room='admins')
             except Exception:
                 pass
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify, current_app
 import razorpay
 from extensions import db, socketio, emit_with_namespace
 from models import Order, Customer
+from db_types import to_paisa
+import serializers
 import os
 import requests
 from requests.adapters import HTTPAdapter
@@ -103,8 +105,8 @@ def verify_payment_signature_direct(razorpay_order_id, payment_id, razorpay_sign
         hashlib.sha256
     ).hexdigest()
     
-    if generated_signature != razorpay_signature:
-        raise ValueError("Invalid payment signature")
+    if not razorpay_signature or not hmac.compare_digest(generated_signature, razorpay_signature):
+        raise razorpay.errors.SignatureVerificationError("Invalid payment signature")
     
     return True
 
@@ -180,7 +182,10 @@ def create_razorpay_order():
 
         # Create Razorpay order using DIRECT requests (bypasses Eventlet DNS)
         try:
-            amount_paisa = int(amount * 100)  # in paisa
+            # Charge the server-computed order total; the client amount is only cross-checked
+            amount_paisa = to_paisa(order.total_amount) or to_paisa(amount)  # exact: 0.29 -> 29, not 28
+            if to_paisa(amount) != amount_paisa:
+                print(f"[RAZORPAY] WARNING: client amount {amount} differs from order total {order.total_amount}")
             receipt = f"order_{order_id}"
             
             print(f"[RAZORPAY] Creating order with amount={amount_paisa} paisa, receipt={receipt}")
@@ -217,6 +222,71 @@ def create_razorpay_order():
             "details": str(e)
         }), 500
 
+def mark_order_paid(razorpay_order_id, source):
+    """Move the order for razorpay_order_id from Pending to Paid exactly once.
+
+    Uses a conditional UPDATE ... WHERE status = 'Pending', so concurrent or
+    repeated callbacks (client verify, webhook retries) cannot both win, and
+    a late delivery never moves an order the admin has since confirmed,
+    delivered or cancelled. Only the caller that performed the transition
+    runs the side effects. Returns (order, transitioned); order is None when
+    no order matches.
+    """
+    order = Order.query.filter_by(razorpay_order_id=razorpay_order_id).first()
+    if not order:
+        return None, False
+    previous_status = order.status or "Pending"
+
+    updated = Order.query.filter(
+        Order.order_id == order.order_id,
+        db.or_(Order.status == "Pending", Order.status.is_(None))
+    ).update({Order.status: "Paid"}, synchronize_session=False)
+    db.session.commit()
+    if not updated:
+        print(f"[RAZORPAY_{source}] Order {order.order_id} is {order.status}, not Pending; nothing to do")
+        return order, False
+
+    db.session.refresh(order)
+    print(f"[RAZORPAY_{source}] Order {order.order_id} status {previous_status} -> Paid")
+    current_app.logger.info(f"Payment confirmed for order {order.order_id} via {source.lower()}")
+    _on_order_paid(order, previous_status)
+    return order, True
+
+
+def _on_order_paid(order, previous_status):
+    """Side effects of the Pending -> Paid transition (runs once per order)."""
+    # Trigger confirmation email
+    from api.orders import trigger_order_confirmation_email
+    trigger_order_confirmation_email(order.order_id)
+
+    # Emit real-time status change so admin dashboard updates immediately
+    try:
+        payload = {
+            'order_id': order.order_id,
+            'customer_id': order.customer_id,
+            'old_status': previous_status,
+            'new_status': 'Paid',
+            'customer_name': order.customer_name,
+            'timestamp': order.updated_at.isoformat() if order.updated_at else None
+        }
+        socketio.start_background_task(emit_with_namespace, 'order_status_changed', payload, room='admins')
+        socketio.start_background_task(emit_with_namespace, 'order_status_changed', payload)
+    except Exception:
+        pass
+
+    # If this is a guest's first paid order, broadcast customer_created
+    # (aggregates are maintained on the customer row by customer_stats)
+    if order.customer_id:
+        try:
+            customer = Customer.query.get(order.customer_id)
+            orders_count = (customer.total_orders_count or 0) if customer else 0
+            if customer and not customer.password_hash and orders_count == 1:
+                payload = serializers.customer(customer)
+                socketio.start_background_task(emit_with_namespace, 'customer_created', payload, room='admins')
+        except Exception:
+            current_app.logger.warning("Failed to emit customer_created after payment", exc_info=True)
+
+
 @payments_bp.route("/verify", methods=["POST"])
 def verify_payment():
     data = request.json
@@ -237,67 +307,9 @@ def verify_payment():
         verify_payment_signature_direct(razorpay_order_id, payment_id, razorpay_signature)
         print(f"[RAZORPAY_VERIFY] ✅ Signature verified successfully")
 
-        # Update order status to paid
-        order = Order.query.filter_by(razorpay_order_id=razorpay_order_id).first()
-        if order:
-            previous_status = order.status or "Pending"
-            print(f"[RAZORPAY_VERIFY] Order found: {order.order_id}, current status: {previous_status}")
-            
-            if previous_status == "Paid":
-                print(f"[RAZORPAY_VERIFY] Order already paid")
-                return jsonify({"message": "Payment already verified"}), 200
-
-            order.status = "Paid"
-            db.session.commit()
-            print(f"[RAZORPAY_VERIFY] Order status updated to Paid")
-            current_app.logger.info(f"Payment verified for order {order.order_id}")
-
-            # Trigger confirmation email
-            from api.orders import trigger_order_confirmation_email
-            trigger_order_confirmation_email(order.order_id)
-
-            # Emit real-time status change so admin dashboard updates immediately
-            try:
-                payload = {
-                    'order_id': order.order_id,
-                    'customer_id': order.customer_id,
-                    'old_status': previous_status,
-                    'new_status': 'Paid',
-                    'customer_name': order.customer_name,
-                    'timestamp': order.updated_at.isoformat() if order.updated_at else None
-                }
-                socketio.start_background_task(emit_with_namespace, 'order_status_changed', payload, room='admins')
-                socketio.start_background_task(emit_with_namespace, 'order_status_changed', payload)
-            except Exception:
-                pass
-
-            # If this is the customer's first successful (paid) order, broadcast customer_created
-            if order.customer_id:
-                customer = Customer.query.get(order.customer_id)
-                if customer:
-                    try:
-                        orders_for_customer = Order.query.filter_by(customer_id=order.customer_id).all()
-                        total_spent = sum((o.total_amount or 0) for o in orders_for_customer)
-                        orders_count = len(orders_for_customer)
-
-                        customer.total_orders_count = orders_count
-                        db.session.commit()
-
-                        is_guest = not bool(customer.password_hash)
-                        if is_guest and orders_count == 1:
-                            payload = {
-                                "customer_id": customer.customer_id,
-                                "full_name": customer.full_name,
-                                "phone_number": customer.phone_number,
-                                "email": customer.email,
-                                "total_orders_count": orders_count,
-                                "total_spent": float(total_spent),
-                                "created_at": customer.created_at.isoformat() if customer.created_at else None,
-                                "is_registered": False,
-                            }
-                            socketio.start_background_task(emit_with_namespace, 'customer_created', payload, room='admins')
-                    except Exception:
-                        current_app.logger.warning("Failed to emit customer_created after payment", exc_info=True)
+        order, transitioned = mark_order_paid(razorpay_order_id, "VERIFY")
+        if order and not transitioned:
+            return jsonify({"message": "Payment already verified"}), 200
 
         return jsonify({"message": "Payment verified successfully"})
     except razorpay.errors.SignatureVerificationError as e:
@@ -305,6 +317,7 @@ def verify_payment():
         current_app.logger.warning(f"Payment signature verification failed for {razorpay_order_id}: {str(e)}")
         return jsonify({"error": "Payment verification failed"}), 400
     except Exception as e:
+        db.session.rollback()
         print(f"[RAZORPAY_VERIFY] ERROR: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -312,4 +325,68 @@ def verify_payment():
         return jsonify({
             "error": "Payment verification error",
             "details": str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+def verify_webhook_signature(body, signature):
+    """Check the X-Razorpay-Signature header: HMAC-SHA256 of the raw body with the webhook secret."""
+    secret = os.environ.get("RAZORPAY_WEBHOOK_SECRET")
+    if not secret:
+        raise ValueError("Razorpay webhook secret not configured")
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    if not signature or not hmac.compare_digest(expected, signature):
+        raise ValueError("Invalid webhook signature")
+    return True
+
+
+@payments_bp.route("/webhook", methods=["POST"])
+def razorpay_webhook():
+    """Razorpay server-to-server events (payment.captured, order.paid).
+
+    Confirms payments even when the customer closes the browser before
+    /verify runs. Razorpay retries deliveries, and /verify may already have
+    run, so the Paid transition is idempotent.
+    """
+    body = request.get_data()
+    try:
+        verify_webhook_signature(body, request.headers.get("X-Razorpay-Signature"))
+    except ValueError as e:
+        print(f"[RAZORPAY_WEBHOOK] Rejected: {e}")
+        return jsonify({"error": "Invalid signature"}), 400
+
+    event = request.get_json(silent=True) or {}
+    event_type = event.get("event")
+    event_id = request.headers.get("X-Razorpay-Event-Id")
+    print(f"\n[RAZORPAY_WEBHOOK] Event {event_type} ({event_id})")
+
+    if event_type not in ("payment.captured", "order.paid"):
+        return jsonify({"status": "ignored"}), 200
+
+    payload = event.get("payload") or {}
+    payment = (payload.get("payment") or {}).get("entity") or {}
+    razorpay_order_id = payment.get("order_id") or ((payload.get("order") or {}).get("entity") or {}).get("id")
+    if not razorpay_order_id:
+        return jsonify({"status": "ignored"}), 200
+
+    try:
+        order = Order.query.filter_by(razorpay_order_id=razorpay_order_id).first()
+        if not order:
+            print(f"[RAZORPAY_WEBHOOK] No order for {razorpay_order_id}")
+            return jsonify({"status": "ignored"}), 200
+
+        paid_amount = payment.get("amount")
+        if paid_amount is not None and int(paid_amount) != to_paisa(order.total_amount):
+            print(f"[RAZORPAY_WEBHOOK] Amount mismatch for order {order.order_id}: "
+                  f"paid {paid_amount} paisa, expected {to_paisa(order.total_amount)}")
+            current_app.logger.warning(f"Razorpay amount mismatch for order {order.order_id}")
+            return jsonify({"status": "amount_mismatch"}), 200
+
+        _, transitioned = mark_order_paid(razorpay_order_id, "WEBHOOK")
+        return jsonify({"status": "processed" if transitioned else "duplicate"}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"[RAZORPAY_WEBHOOK] ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        # Non-2xx makes Razorpay retry later
+        return jsonify({"error": "Webhook processing failed"}), 500
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import joinedload
+from passwords import generate_password_hash, check_password_hash, needs_rehash
 from extensions import db
 from models import Customer, Order, OrderMenuItem, AdminSettings
 from datetime import datetime, timedelta
@@ -9,6 +10,11 @@ import os
 import random
 import string
 import redis
+import auth
+import serializers
+from ratelimit import rate_limit
+from mail_queue import mail_queue, PRIORITY_OTP, FAILED
+from extensions import socketio, emit_with_namespace
 
 users_bp = Blueprint("users", __name__)
 
@@ -45,6 +51,44 @@ def validate_otp_format(otp):
     return isinstance(otp, str) and len(otp) == 6 and otp.isdigit()
 
 
+def _otp_delivery_failed(ticket, error):
+    """Tell clients listening on the ticket's room that the OTP email bounced."""
+    try:
+        socketio.start_background_task(emit_with_namespace,
+            'otp_delivery_failed',
+            {'ticket': ticket, 'error': 'Failed to send verification email. Please try again.'},
+            room=f"otp_{ticket}"
+        )
+    except Exception as e:
+        print(f"[OTP] Socket emit error: {e}")
+
+def _queue_otp_email(send_fn, email, otp, label):
+    """Queue an OTP email on the fast lane and return its ticket.
+
+    Returns None when the send is bound to fail (no Brevo API key), so the
+    caller can report it synchronously instead of handing out a ticket.
+    """
+    if not os.environ.get("BREVO_API_KEY"):
+        print(f"[OTP] Cannot send {label} email to {email}: BREVO_API_KEY not set")
+        return None
+    print(f"[OTP] Queueing {label} email to {email}...")
+    return mail_queue.submit(
+        send_fn, email, otp,
+        priority=PRIORITY_OTP,
+        label=f"{label} to {email}",
+        on_failure=_otp_delivery_failed
+    )
+
+def _otp_queued_response(ticket, message):
+    """202 with the ticket to poll, or 502 when the email could not be queued."""
+    if not ticket:
+        return jsonify({"error": "Failed to send OTP email. Please try again."}), 502
+    return jsonify({
+        "message": message,
+        "ticket": ticket,
+        "status_url": f"/api/users/otp-status/{ticket}"
+    }), 202
+
 @users_bp.route("/test-brevo", methods=["GET"])
 def test_brevo():
     """Diagnostic: Test Brevo API connectivity."""
@@ -99,6 +143,7 @@ def test_brevo():
 
 
 @users_bp.route("/send-registration-otp", methods=["POST"])
+@rate_limit("otp_send")
 def send_registration_otp():
     """Send OTP for new account registration"""
     try:
@@ -132,34 +177,27 @@ def send_registration_otp():
                 "expires": datetime.utcnow() + timedelta(minutes=10)
             }
             
-        # Send OTP email SYNCHRONOUSLY (same pattern as order confirmation which works)
+        # Send OTP email in the background; the client polls the ticket
         from brevo_mail import send_registration_otp_email
-        print(f"[OTP] Sending registration OTP email to {email}...")
-        try:
-            email_sent = send_registration_otp_email(email, otp)
-        except Exception as mail_err:
-            print(f"[OTP] Registration OTP email EXCEPTION for {email}: {mail_err}")
-            import traceback
-            traceback.print_exc()
-            email_sent = False
-        
-        if email_sent:
-            print(f"[OTP] Registration OTP email SENT to {email}")
-            return jsonify({
-                "message": "OTP sent successfully",
-                "email_sent": True
-            }), 200
-        else:
-            print(f"[OTP] Registration OTP email FAILED for {email}, OTP={otp}")
-            return jsonify({
-                "error": "Failed to send verification email. Please try again.",
-                "email_sent": False
-            }), 502
+        ticket = _queue_otp_email(send_registration_otp_email, email, otp, "Registration OTP")
+        return _otp_queued_response(ticket, "OTP is being sent to your email")
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@users_bp.route("/otp-status/<ticket>", methods=["GET"])
+def otp_status(ticket):
+    """Delivery status of a queued OTP email"""
+    record = mail_queue.status(ticket)
+    if not record:
+        return jsonify({"error": "Unknown or expired ticket"}), 404
+    result = {"ticket": ticket, "status": record["status"]}
+    if record["status"] == FAILED:
+        result["error"] = "Failed to send verification email. Please try again."
+    return jsonify(result), 200
+
 @users_bp.route("/register", methods=["POST"])
+@rate_limit("otp_verify")
 def register():
     """Register a new user with OTP verification"""
     try:
@@ -226,6 +264,7 @@ def register():
         return jsonify({"error": str(e)}), 500
 
 @users_bp.route("/login", methods=["POST"])
+@rate_limit("login")
 def login():
     """User login - also handles admin login from the same page"""
     try:
@@ -240,19 +279,23 @@ def login():
         from config import Config
         from flask_jwt_extended import create_access_token
         from models import AdminSettings
+        from api.admin import get_admin_password_hash
         
         # Check if email matches admin username
         if email == Config.ADMIN_USERNAME or email == Config.ADMIN_EMAIL:
             admin_verified = False
             
-            # Try to authenticate: either database hash OR the env-default password
+            # Try to authenticate: either database hash OR the env-default password (hashed once)
             admin_settings = AdminSettings.query.filter_by(admin_id=1).first()
             if admin_settings and admin_settings.password_hash:
                 if check_password_hash(admin_settings.password_hash, password):
                     admin_verified = True
+                    if needs_rehash(admin_settings.password_hash):
+                        admin_settings.password_hash = generate_password_hash(password)
+                        db.session.commit()
             
             # Always allow fallback to env password (acts as a master password)
-            if not admin_verified and password == Config.ADMIN_PASSWORD:
+            if not admin_verified and check_password_hash(get_admin_password_hash(), password):
                 admin_verified = True
             
             if admin_verified:
@@ -288,6 +331,11 @@ def login():
         # Check password
         if not check_password_hash(user.password_hash, password):
             return jsonify({"error": "Invalid email or password"}), 401
+
+        # Upgrade hashes made with older parameters
+        if needs_rehash(user.password_hash):
+            user.password_hash = generate_password_hash(password)
+            db.session.commit()
         
         # Generate JWT token
         token = jwt.encode({
@@ -312,6 +360,7 @@ def login():
         return jsonify({"error": str(e)}), 500
 
 @users_bp.route("/google-login", methods=["POST"])
+@rate_limit("login")
 def google_login():
     """Google OAuth login - Create or login user with Google credentials"""
     try:
@@ -378,6 +427,7 @@ def google_login():
         }), 500
 
 @users_bp.route("/forgot-password", methods=["POST"])
+@rate_limit("otp_send")
 def forgot_password():
     """Send OTP for password reset"""
     try:
@@ -410,28 +460,16 @@ def forgot_password():
                 "expires": datetime.utcnow() + timedelta(minutes=10)
             }
         
-        # Send OTP email SYNCHRONOUSLY (same pattern as order confirmation which works)
+        # Send OTP email in the background; the client polls the ticket
         from brevo_mail import send_otp_email
-        print(f"[OTP] Sending password reset OTP email to {email}...")
-        try:
-            email_sent = send_otp_email(email, otp)
-        except Exception as mail_err:
-            print(f"[OTP] Password reset OTP email EXCEPTION for {email}: {mail_err}")
-            import traceback
-            traceback.print_exc()
-            email_sent = False
-        
-        if email_sent:
-            print(f"[OTP] Password reset OTP email SENT to {email}")
-            return jsonify({"message": "OTP sent to your email"}), 200
-        else:
-            print(f"[OTP] Password reset OTP email FAILED for {email}, OTP={otp}")
-            return jsonify({"error": "Failed to send OTP email. Please try again."}), 502
+        ticket = _queue_otp_email(send_otp_email, email, otp, "Password reset OTP")
+        return _otp_queued_response(ticket, "OTP is being sent to your email")
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @users_bp.route("/verify-otp", methods=["POST"])
+@rate_limit("otp_verify")
 def verify_otp():
     """Verify OTP for password reset"""
     try:
@@ -481,6 +519,7 @@ def verify_otp():
         return jsonify({"error": str(e)}), 500
 
 @users_bp.route("/reset-password", methods=["POST"])
+@rate_limit("otp_verify")
 def reset_password():
     """Reset password after OTP verification"""
     try:
@@ -553,21 +592,10 @@ def reset_password():
 def change_password():
     """Change password with OTP verification"""
     try:
-        # Get token from header
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            return jsonify({"error": "Authorization token required"}), 401
-        
-        token = auth_header.split(" ")[1] if " " in auth_header else auth_header
-        
-        # Verify token
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            user_id = payload["user_id"]
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token expired"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"error": "Invalid token"}), 401
+        principal, error = auth.require_customer()
+        if error:
+            return error
+        user_id = principal.customer_id
         
         data = request.get_json()
         otp = data.get("otp")
@@ -639,22 +667,9 @@ def admin_change_password():
         from config import Config
         from models import AdminSettings
         
-        # Get token from header
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            return jsonify({"error": "Authorization token required"}), 401
-        
-        token = auth_header.split(" ")[1] if " " in auth_header else auth_header
-        
-        # Verify admin token
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            if payload.get("role") != "Admin":
-                return jsonify({"error": "Admin access required"}), 403
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token expired"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"error": "Invalid token"}), 401
+        principal, error = auth.require_admin()
+        if error:
+            return error
         
         data = request.get_json(force=True, silent=True)
         if not data:
@@ -674,8 +689,8 @@ def admin_change_password():
             password_is_valid = check_password_hash(admin_settings.password_hash, current_password)
         else:
             # Check default password from env
-            from config import Config
-            password_is_valid = current_password == Config.ADMIN_PASSWORD
+            from api.admin import get_admin_password_hash
+            password_is_valid = check_password_hash(get_admin_password_hash(), current_password)
         
         if not password_is_valid:
             return jsonify({"error": "Current password is incorrect"}), 401
@@ -695,6 +710,7 @@ def admin_change_password():
         return jsonify({"error": str(e)}), 500
 
 @users_bp.route("/admin/forgot-password", methods=["POST"])
+@rate_limit("otp_send")
 def admin_forgot_password():
     """Admin forgot password - send OTP to admin email"""
     try:
@@ -726,26 +742,10 @@ def admin_forgot_password():
             except Exception as e:
                 pass
         
-        # Send OTP via email SYNCHRONOUSLY (same pattern as order confirmation which works)
+        # Send OTP via email in the background; the client polls the ticket
         from brevo_mail import send_admin_otp_email
-        print(f"[OTP] Sending admin OTP email to {Config.ADMIN_EMAIL}...")
-        try:
-            email_sent = send_admin_otp_email(Config.ADMIN_EMAIL, otp)
-        except Exception as mail_err:
-            print(f"[OTP] Admin OTP email EXCEPTION: {mail_err}")
-            import traceback
-            traceback.print_exc()
-            email_sent = False
-        
-        if email_sent:
-            print(f"[OTP] Admin OTP email SENT to {Config.ADMIN_EMAIL}")
-        else:
-            print(f"[OTP] Admin OTP email FAILED for {Config.ADMIN_EMAIL}")
-
-        return jsonify({
-            "message": "OTP sent to admin email",
-            "email_sent": True
-        }), 200
+        ticket = _queue_otp_email(send_admin_otp_email, Config.ADMIN_EMAIL, otp, "Admin OTP")
+        return _otp_queued_response(ticket, "OTP is being sent to admin email")
         
     except Exception as e:
         return jsonify({"error": f"Internal error: {str(e)}"}), 500
@@ -753,6 +753,7 @@ def admin_forgot_password():
 
 
 @users_bp.route("/admin/verify-otp", methods=["POST"])
+@rate_limit("otp_verify")
 def admin_verify_otp():
     """Verify admin OTP"""
     try:
@@ -798,6 +799,7 @@ def admin_verify_otp():
         return jsonify({"error": f"Internal error: {str(e)}"}), 500
 
 @users_bp.route("/admin/reset-password", methods=["POST"])
+@rate_limit("otp_verify")
 def admin_reset_password():
     """Admin reset password after OTP verification"""
     try:
@@ -864,51 +866,18 @@ def admin_reset_password():
 def order_history():
     """Get user's order history"""
     try:
-        # Get token from header
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            return jsonify({"error": "Authorization token required"}), 401
-        
-        token = auth_header.split(" ")[1] if " " in auth_header else auth_header
-        
-        # Verify token
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            user_id = payload["user_id"]
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token expired"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"error": "Invalid token"}), 401
-        
-        # Get user's orders
-        orders = Order.query.filter_by(customer_id=user_id).order_by(Order.created_at.desc()).all()
-        
-        orders_data = []
-        for order in orders:
-            order_items = OrderMenuItem.query.filter_by(order_id=order.order_id).all()
-            items_data = [{
-                "item_name": item.menu_item.item_name if item.menu_item else "Unknown",
-                "quantity": item.quantity,
-                "price": item.price_at_order_time
-            } for item in order_items]
-            
-            orders_data.append({
-                "order_id": order.order_id,
-                "customer_name": order.customer_name,
-                "phone_number": order.phone_number,
-                "email": order.email,
-                "event_type": order.event_type,
-                "number_of_guests": order.number_of_guests,
-                "event_date": order.event_date,
-                "event_time": order.event_time,
-                "venue_address": order.venue_address,
-                "status": order.status,
-                "total_amount": order.total_amount,
-                "payment_method": order.payment_method,
-                "created_at": order.created_at.isoformat(),
-                "items": items_data
-            })
-        
+        principal, error = auth.require_customer()
+        if error:
+            return error
+        user_id = principal.customer_id
+        
+        # Get user's orders with their lines and menu items in one query
+        orders = Order.query.options(
+            joinedload(Order.menu_items).joinedload(OrderMenuItem.menu_item)
+        ).filter_by(customer_id=user_id).order_by(Order.created_at.desc()).all()
+
+        orders_data = [serializers.order(order, items=True) for order in orders]
+
         return jsonify({"orders": orders_data}), 200
         
     except Exception as e:
@@ -918,21 +887,10 @@ def order_history():
 def get_profile():
     """Get user profile"""
     try:
-        # Get token from header
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            return jsonify({"error": "Authorization token required"}), 401
-        
-        token = auth_header.split(" ")[1] if " " in auth_header else auth_header
-        
-        # Verify token
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            user_id = payload["user_id"]
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token expired"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"error": "Invalid token"}), 401
+        principal, error = auth.require_customer()
+        if error:
+            return error
+        user_id = principal.customer_id
         
         user = Customer.query.get(user_id)
         if not user:
@@ -955,21 +913,10 @@ def get_profile():
 def update_profile():
     """Update user profile"""
     try:
-        # Get token from header
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            return jsonify({"error": "Authorization token required"}), 401
-        
-        token = auth_header.split(" ")[1] if " " in auth_header else auth_header
-        
-        # Verify token
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            user_id = payload["user_id"]
-        except jwt.ExpiredSignatureError:
-            return jsonify({"error": "Token expired"}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({"error": "Invalid token"}), 401
+        principal, error = auth.require_customer()
+        if error:
+            return error
+        user_id = principal.customer_id
         
         user = Customer.query.get(user_id)
         if not user:
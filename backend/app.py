@@ -22,9 +22,13 @@ from extensions import db, migrate, socketio
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, verify_jwt_in_request, get_jwt_identity
 from logging_config import setup_logging
+import serializers
+import compression
 
 def create_app():
     app = Flask(__name__)
+    # orjson-backed JSON for jsonify/request.json (stdlib fallback)
+    app.json = serializers.FastJSONProvider(app)
     app.config.from_object(Config)
     
     # Setup structured logging
@@ -60,7 +64,9 @@ def create_app():
                     "Content-Type",
                     "Authorization",
                     "X-Requested-With",
+                    "Idempotency-Key",
                 ],
+                "expose_headers": ["Retry-After"],
                 "supports_credentials": True,
             },
             r"/static/*": {
@@ -71,6 +77,9 @@ def create_app():
         },
     )
 
+    # gzip/brotli for JSON and text responses above the size threshold
+    compression.init_app(app)
+
     # Initialize SocketIO with explicit CORS settings and production-ready config
     socketio.init_app(
         app,
@@ -84,7 +93,8 @@ def create_app():
         logger=True, 
         manage_session=False, # Don't manage sessions to avoid affinity issues 
         cookie=None,          # Disable cookies to avoid sticky session issues if polling is used
-        always_connect=True   # Force connection attempt even if handshake is slow
+        always_connect=True,  # Force connection attempt even if handshake is slow
+        json=serializers.SocketJSON  # same encoder as HTTP responses (datetime/Decimal aware)
     )
 
     # Import models
@@ -135,13 +145,21 @@ def create_app():
     def serve_static(filename):
         from flask import send_from_directory
         static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
-        return send_from_directory(static_dir, filename)
+        if filename.startswith('menu/'):
+            # Snapshots have .gz/.br siblings written at publish time
+            response = compression.send_precompressed(static_dir, filename)
+        else:
+            response = send_from_directory(static_dir, filename)
+        # Versioned menu snapshots are immutable; only menu/index.json is short-lived
+        cache_control = menu_publisher.cache_control_for(filename)
+        if cache_control:
+            response.headers['Cache-Control'] = cache_control
+        return response
 
     @app.route("/health", methods=["GET"]) 
     def health():
         try:
             # simple DB check
-            from models import Customer
             Customer.query.limit(1).all()
             app.logger.info("Health check passed")
             return jsonify({"status": "ok"}), 200
@@ -198,36 +216,27 @@ def create_app():
                 response.headers['Access-Control-Allow-Origin'] = origin
                 response.headers['Access-Control-Allow-Credentials'] = 'true'
                 response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, PATCH, DELETE, OPTIONS'
-                response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With'
+                response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With, Idempotency-Key'
         return response
 
     # Compatibility endpoints expected by the React frontend
     @app.route('/api/event_types', methods=['GET'])
+    @compression.cache_compressed
     def event_types_alias():
         events = EventType.query.all()
-        return jsonify([{
-            'event_type_id': e.event_type_id,
-            'event_name': e.event_name,
-            'minimum_guests': e.minimum_guests,
-            'description': e.description,
-            'image_url': e.image_url
-        } for e in events])
+        return jsonify([serializers.event_type(e) for e in events])
 
     @app.route('/api/menu_items', methods=['GET'])
+    @compression.cache_compressed
     def menu_items_alias():
         # Expose only available items for customer-facing menus
-        items = MenuItem.query.filter_by(is_available=True).all()
-        return jsonify([{
-            'item_id': m.item_id,
-            'item_name': m.item_name,
-            'category': m.category,
-            'price_per_plate': m.price_per_plate,
-            'is_vegetarian': m.is_vegetarian,
-            'image_url': m.image_url,
-            'description': m.description,
-            'is_available': m.is_available,
-            'stock_quantity': m.stock_quantity if m.stock_quantity is not None else 100
-        } for m in items])
+        query = MenuItem.query.filter_by(is_available=True)
+        category = request.args.get('category')
+        if category:
+            from api.menu import _items_in_category
+            query = _items_in_category(query, category)
+        items = query.all()
+        return jsonify([serializers.menu_item(m) for m in items])
 
     # WebSocket event handlers
     @socketio.on('connect')
@@ -236,48 +245,37 @@ def create_app():
         try:
             from flask_socketio import disconnect
             from flask import request
-            import jwt as pyjwt
+            import auth as token_auth
             
             # Get token from auth dict or connection args
             token = auth.get('token') if auth else None
             
             if token:
                 try:
-                    # Verify the JWT token
-                    secret_key = app.config.get('JWT_SECRET_KEY')
-                    decoded = pyjwt.decode(token, secret_key, algorithms=['HS256'])
-                    
-                    # Get user identity from token
-                    identity = decoded.get('sub')  # 'sub' is the standard JWT claim for identity
-                    
-                    # Store user info in the session for this socket
-                    request.sid_data = {
-                        'identity': identity,
-                        'authenticated': True,
-                        'role': decoded.get('role')
-                    }
-                    
-                    # Join user-specific room for targeted messaging
-                    from flask_socketio import join_room
-                    if isinstance(identity, dict):
-                        user_id = identity.get('customer_id') or identity.get('admin_id')
-                        if user_id:
-                            room = f"user_{user_id}"
-                            join_room(room)
-
-                    # Admins also join the shared admin room for dashboards
-                    if decoded.get('role') == 'Admin':
-                        join_room('admins')
-                    
-                    return {'status': 'connected', 'authenticated': True}
-                    
-                except pyjwt.ExpiredSignatureError:
+                    # Verify the token (cached until it expires, so reconnects are cheap)
+                    principal = token_auth.Principal(token_auth.verify_token(token))
+                except token_auth.AuthError as e:
                     disconnect()
-                    return {'status': 'error', 'message': 'Token expired'}
-                    
-                except pyjwt.InvalidTokenError as e:
-                    disconnect()
-                    return {'status': 'error', 'message': 'Invalid token'}
+                    return {'status': 'error', 'message': e.message}
+
+                # Store user info in the session for this socket
+                request.sid_data = {
+                    'identity': principal.claims.get('sub'),
+                    'authenticated': True,
+                    'role': principal.role
+                }
+
+                # Join user-specific room for targeted messaging
+                from flask_socketio import join_room
+                user_id = principal.customer_id or principal.admin_id
+                if user_id and (isinstance(principal.claims.get('sub'), dict) or principal.claims.get('user_id')):
+                    join_room(f"user_{user_id}")
+
+                # Admins also join the shared admin room for dashboards
+                if principal.is_admin:
+                    join_room('admins')
+
+                return {'status': 'connected', 'authenticated': True}
             else:
                 # Allow unauthenticated connections but mark them as such
                 request.sid_data = {'authenticated': False}
@@ -309,9 +307,28 @@ def create_app():
 
     return app
 
+def start_background_services(app):
+    """Start the periodic background threads; called only by the serving process.
+
+    Scripts and CLI commands that call create_app() must not run these.
+    """
+    # Periodically delete S3 images that no image URL column references
+    import asset_gc
+    asset_gc.start_reconciler(app)
+
+    # Remind customers and admins of upcoming events (one leader-elected worker scans)
+    import reminders
+    reminders.start_scheduler(app)
+
+    # Materialize static menu snapshots for the current catalog
+    import menu_publisher
+    menu_publisher.schedule_publish(app)
+
+
 app = create_app()
 
 if __name__ == "__main__":
+    start_background_services(app)
     print("\n" + "="*70)
     print("Starting Razorpay Catering Backend Server...")
     print("="*70)
@@ -0,0 +1,322 @@
+"""
+Asset garbage collection for menu images stored in S3.
+
+Orphaned image URLs are queued and deleted in batches with S3 DeleteObjects
+(up to 1000 keys per call) by a single background worker, instead of one
+delete_object call per request. A periodic reconciliation scan also finds
+objects under the `menu items/` prefix that no image URL column references
+(every `*_url` column on every model: MenuItem.image_url, EventType.image_url,
+EventType.icon_url, ...). UploadedImage rows hold the image bytes themselves
+rather than an S3 URL, so they never keep an S3 object alive.
+"""
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse, unquote_plus
+
+# S3 DeleteObjects accepts at most 1000 keys per request
+S3_DELETE_BATCH_SIZE = 1000
+
+# Prefix used by uploads.upload_to_s3 and uploads.presign_upload
+MENU_IMAGE_PREFIX = "menu items/"
+
+# How long the worker waits for more URLs before flushing a partial batch
+FLUSH_INTERVAL_SECONDS = float(os.environ.get("ASSET_GC_FLUSH_INTERVAL", "2"))
+
+# Interval between reconciliation scans (0 disables the periodic scan)
+RECONCILE_INTERVAL_SECONDS = int(os.environ.get("ASSET_GC_RECONCILE_INTERVAL", str(6 * 3600)))
+
+# Objects younger than this are never reconciled away: a presigned upload
+# lands in the bucket before the menu item that references it is saved.
+RECONCILE_GRACE_PERIOD = timedelta(hours=int(os.environ.get("ASSET_GC_GRACE_HOURS", "24")))
+
+# Failed keys are retried this many times before being dropped
+MAX_DELETE_ATTEMPTS = 3
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+_reconciler = None
+
+# Simple counters exposed for diagnostics
+stats = {
+    "queued": 0,
+    "deleted": 0,
+    "failed": 0,
+    "batches": 0,
+    "last_reconcile_at": None,
+    "last_reconcile_orphans": 0,
+}
+
+
+def _get_s3_client():
+    from api.uploads import get_s3_client
+    return get_s3_client()
+
+
+def parse_s3_url(image_url):
+    """Return (bucket, key) for an S3 image URL, or None if it is not one.
+
+    Handles both URL styles produced by this app:
+      Path-style:     https://s3.<region>.amazonaws.com/<bucket>/<key>
+      Virtual-hosted: https://<bucket>.s3.<region>.amazonaws.com/<key>
+    Keys are stored with spaces encoded as '+', so they are decoded here.
+    """
+    if not image_url:
+        return None
+    parsed = urlparse(image_url)
+    host = (parsed.hostname or "").lower()
+    if not host.endswith(".amazonaws.com"):
+        return None
+
+    path = parsed.path.lstrip("/")
+    if host.startswith("s3.") or host.startswith("s3-"):
+        bucket, _, key = path.partition("/")
+    elif ".s3." in host or ".s3-" in host:
+        bucket = host.split(".s3", 1)[0]
+        key = path
+    else:
+        return None
+
+    if not bucket or not key:
+        return None
+    return bucket, unquote_plus(key)
+
+
+def object_url(bucket, key, region):
+    """Build the canonical path-style URL for a key (matches uploads.py)."""
+    return f"https://s3.{region}.amazonaws.com/{bucket}/{key.replace(' ', '+')}"
+
+
+def enqueue(image_url):
+    """Queue an S3 image URL for batched deletion.
+
+    Returns True if the URL was an S3 object and was queued, False otherwise
+    (callers handle local/database-backed images themselves).
+    """
+    target = parse_s3_url(image_url)
+    if not target:
+        return False
+    _ensure_worker()
+    _queue.put((target[0], target[1], 0))
+    stats["queued"] += 1
+    return True
+
+
+def enqueue_many(image_urls):
+    """Queue several image URLs; returns the number of S3 objects queued."""
+    return sum(1 for url in image_urls if enqueue(url))
+
+
+def delete_keys(bucket, keys):
+    """Delete keys from a bucket synchronously in DeleteObjects batches.
+
+    Returns the list of keys that could not be deleted.
+    """
+    s3_client = _get_s3_client()
+    if not s3_client:
+        print("[ASSET_GC] S3 client not available, skipping delete")
+        return list(keys)
+
+    failed = []
+    keys = list(dict.fromkeys(keys))
+    for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+        chunk = keys[start:start + S3_DELETE_BATCH_SIZE]
+        try:
+            response = s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": k} for k in chunk], "Quiet": True},
+            )
+            errors = response.get("Errors", [])
+            for err in errors:
+                print(f"[ASSET_GC] Failed to delete {err.get('Key')}: {err.get('Code')} {err.get('Message')}")
+            failed.extend(err.get("Key") for err in errors)
+            stats["deleted"] += len(chunk) - len(errors)
+            stats["batches"] += 1
+            print(f"[ASSET_GC] Deleted {len(chunk) - len(errors)}/{len(chunk)} objects from {bucket}")
+        except Exception as e:
+            print(f"[ASSET_GC] DeleteObjects call failed for {len(chunk)} keys: {e}")
+            failed.extend(chunk)
+    return failed
+
+
+def delete_urls_now(image_urls):
+    """Synchronously delete the S3 objects behind the given URLs.
+
+    Intended for scripts (e.g. bulk menu resets) that exit before the
+    background worker would flush. Returns the number of keys deleted.
+    """
+    by_bucket = {}
+    for url in image_urls:
+        target = parse_s3_url(url)
+        if target:
+            by_bucket.setdefault(target[0], []).append(target[1])
+
+    deleted = 0
+    for bucket, keys in by_bucket.items():
+        failed = delete_keys(bucket, keys)
+        deleted += len(set(keys)) - len(failed)
+    return deleted
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_worker_loop, name="asset-gc", daemon=True)
+            _worker.start()
+
+
+def _drain(first_item):
+    """Collect queued items (up to one full batch) after the first one arrives."""
+    items = [first_item]
+    deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+    while len(items) < S3_DELETE_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            items.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return items
+
+
+def _worker_loop():
+    while True:
+        items = _drain(_queue.get())
+
+        by_bucket = {}
+        attempts = {}
+        for bucket, key, attempt in items:
+            by_bucket.setdefault(bucket, []).append(key)
+            attempts[(bucket, key)] = max(attempt, attempts.get((bucket, key), 0))
+
+        for bucket, keys in by_bucket.items():
+            for key in delete_keys(bucket, keys):
+                attempt = attempts.get((bucket, key), 0) + 1
+                if attempt < MAX_DELETE_ATTEMPTS:
+                    _queue.put((bucket, key, attempt))
+                else:
+                    stats["failed"] += 1
+                    print(f"[ASSET_GC] Giving up on s3://{bucket}/{key} after {attempt} attempts")
+
+        for _ in items:
+            _queue.task_done()
+
+
+def flush(timeout=None):
+    """Block until every queued URL has been processed (used by scripts/tests)."""
+    if timeout is None:
+        _queue.join()
+        return True
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def image_url_columns():
+    """Every mapped column that stores an image URL (named `*_url`)."""
+    from extensions import db
+
+    columns = []
+    for mapper in db.Model.registry.mappers:
+        for attr in mapper.column_attrs:
+            if attr.key.endswith("_url"):
+                columns.append(getattr(mapper.class_, attr.key))
+    return columns
+
+
+def referenced_keys(bucket):
+    """S3 keys in `bucket` referenced by any image URL column."""
+    from extensions import db
+
+    referenced = set()
+    for column in image_url_columns():
+        rows = db.session.query(column).filter(column.isnot(None)).distinct().all()
+        for (image_url,) in rows:
+            target = parse_s3_url(image_url)
+            if target and target[0] == bucket:
+                referenced.add(target[1])
+    return referenced
+
+
+def find_orphaned_keys(bucket=None, prefix=MENU_IMAGE_PREFIX, grace_period=RECONCILE_GRACE_PERIOD):
+    """List bucket objects under `prefix` that no image URL column references.
+
+    Must be called inside an app context. Objects newer than `grace_period`
+    are skipped so in-flight uploads are never collected.
+    """
+    from config import Config
+
+    bucket = bucket or Config.AWS_S3_BUCKET_NAME
+    s3_client = _get_s3_client()
+    if not s3_client or not bucket:
+        print("[ASSET_GC] S3 not configured, skipping reconciliation")
+        return []
+
+    referenced = referenced_keys(bucket)
+
+    cutoff = datetime.now(timezone.utc) - grace_period
+    orphans = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key in referenced or key.endswith("/"):
+                continue
+            last_modified = obj.get("LastModified")
+            if last_modified is not None and last_modified > cutoff:
+                continue
+            orphans.append(key)
+    return orphans
+
+
+def reconcile(dry_run=False):
+    """Find orphaned images and delete them in batches.
+
+    Must be called inside an app context. Returns the orphaned keys found.
+    """
+    from config import Config
+
+    bucket = Config.AWS_S3_BUCKET_NAME
+    orphans = find_orphaned_keys(bucket)
+    stats["last_reconcile_at"] = datetime.utcnow().isoformat()
+    stats["last_reconcile_orphans"] = len(orphans)
+    print(f"[ASSET_GC] Reconciliation found {len(orphans)} orphaned objects in {bucket}")
+
+    if orphans and not dry_run:
+        delete_keys(bucket, orphans)
+    return orphans
+
+
+def start_reconciler(app, interval=RECONCILE_INTERVAL_SECONDS):
+    """Start the periodic reconciliation scan in a daemon thread (idempotent).
+
+    Only the serving process should call this (see app.start_background_services).
+    """
+    global _reconciler
+    if interval <= 0 or not app.config.get("AWS_S3_ENABLED"):
+        return None
+    if _reconciler is not None and _reconciler.is_alive():
+        return _reconciler
+
+    def _loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    reconcile()
+                except Exception as e:
+                    print(f"[ASSET_GC] Reconciliation error: {e}")
+
+    _reconciler = threading.Thread(target=_loop, name="asset-gc-reconcile", daemon=True)
+    _reconciler.start()
+    return _reconciler
@@ -0,0 +1,184 @@
+"""
+Unified bearer-token verification.
+
+Customer tokens (PyJWT, issued by api/users.py) and admin/customer tokens
+issued by flask_jwt_extended are both HS256 JWTs. verify_token() checks a
+token against the configured secrets once and keeps the verified claims in
+a small LRU keyed by the token's SHA-256 until the token expires, so
+repeated requests and socket reconnects with the same token skip the HMAC
+and JSON decode. current_principal() resolves the request's Authorization
+header once per request and caches the result on flask.g.
+
+Routes protected with @jwt_required keep using flask_jwt_extended for
+admin checks; everything else should go through this module.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from flask import g, request, current_app, jsonify
+
+# Verified tokens kept in memory
+CACHE_SIZE = 1024
+
+ALGORITHMS = ["HS256"]
+
+_cache = OrderedDict()   # sha256(token) -> (claims, expires_at)
+_cache_lock = threading.Lock()
+_MISSING = object()
+
+
+class AuthError(Exception):
+    """Token missing, expired or invalid; `status` is the HTTP status to return."""
+
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class Principal:
+    """The authenticated caller behind a verified token."""
+
+    __slots__ = ("claims", "customer_id", "admin_id", "email", "role")
+
+    def __init__(self, claims):
+        self.claims = claims
+        identity = claims.get("sub")
+        self.role = claims.get("role")
+        self.email = claims.get("email")
+        self.customer_id = claims.get("user_id")
+        self.admin_id = claims.get("admin_id")
+        if isinstance(identity, dict):
+            self.customer_id = self.customer_id or identity.get("customer_id")
+            self.admin_id = self.admin_id or identity.get("admin_id")
+            self.email = self.email or identity.get("email")
+        elif identity is not None and self.role != "Admin" and self.customer_id is None:
+            try:
+                self.customer_id = int(identity)
+            except (TypeError, ValueError):
+                pass
+
+    @property
+    def is_admin(self):
+        return self.role == "Admin"
+
+    def __repr__(self):
+        return f"<Principal customer_id={self.customer_id} admin_id={self.admin_id} role={self.role}>"
+
+
+def _secrets():
+    """Signing keys in use: the customer-token key and the flask_jwt_extended key."""
+    keys = [os.environ.get("JWT_SECRET_KEY", "your-secret-key-change-in-production")]
+    try:
+        app_key = current_app.config.get("JWT_SECRET_KEY")
+    except RuntimeError:
+        app_key = None
+    if app_key and app_key not in keys:
+        keys.append(app_key)
+    return keys
+
+
+def _cache_get(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return _MISSING
+        claims, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del _cache[key]
+            return _MISSING
+        _cache.move_to_end(key)
+        return claims
+
+
+def _cache_put(key, claims):
+    exp = claims.get("exp")
+    with _cache_lock:
+        _cache[key] = (claims, float(exp) if exp is not None else None)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def verify_token(token):
+    """Return the verified claims for a token; raises AuthError."""
+    if not token:
+        raise AuthError("Authorization token required")
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = _cache_get(key)
+    if claims is not _MISSING:
+        return claims
+
+    expired = False
+    for secret in _secrets():
+        try:
+            claims = jwt.decode(token, secret, algorithms=ALGORITHMS)
+        except jwt.ExpiredSignatureError:
+            expired = True
+            continue
+        except jwt.InvalidTokenError:
+            continue
+        if claims.get("type") == "refresh":
+            raise AuthError("Invalid token")
+        _cache_put(key, claims)
+        return claims
+    raise AuthError("Token expired" if expired else "Invalid token")
+
+
+def bearer_token():
+    """Token from the Authorization header ("Bearer <token>" or the bare token), or None."""
+    header = request.headers.get("Authorization", "")
+    if not header:
+        return None
+    return header.split(" ", 1)[1].strip() if " " in header else header.strip()
+
+
+def current_principal(required=False):
+    """The caller for this request, or None when no valid token was sent.
+
+    With required=True a missing or invalid token raises AuthError instead.
+    The lookup happens once per request.
+    """
+    cached = g.get("_auth_principal", _MISSING)
+    if cached is _MISSING:
+        try:
+            cached = Principal(verify_token(bearer_token()))
+            g._auth_error = None
+        except AuthError as e:
+            cached = None
+            g._auth_error = e
+        g._auth_principal = cached
+    if cached is None and required:
+        raise g._auth_error
+    return cached
+
+
+def require_customer():
+    """(principal, None) for a customer token, else (None, error response tuple)."""
+    try:
+        principal = current_principal(required=True)
+    except AuthError as e:
+        return None, (jsonify({"error": e.message}), e.status)
+    if principal.customer_id is None:
+        return None, (jsonify({"error": "Invalid token"}), 401)
+    return principal, None
+
+
+def require_admin():
+    """(principal, None) for an admin token, else (None, error response tuple)."""
+    try:
+        principal = current_principal(required=True)
+    except AuthError as e:
+        return None, (jsonify({"error": e.message}), e.status)
+    if not principal.is_admin:
+        return None, (jsonify({"error": "Admin access required"}), 403)
+    return principal, None
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,226 @@
+"""
+Bulk email pipeline.
+
+Broadcasts such as menu announcements go out as Brevo batch sends: each
+request carries up to BATCH_SIZE recipients as `messageVersions`, each
+version with its own rendered subject and body. A 10k-customer send is
+therefore ~200 API calls instead of 10k.
+
+start() records a BulkMailJob row and queues one job per batch on the bulk
+lane of mail_queue. That lane's worker count (MAIL_BULK_WORKERS) is the
+concurrency limit, and its separate workers keep OTP mail on the fast lane
+unaffected. Each batch is retried on 429/5xx/network errors with
+exponential backoff. When Brevo rejects a batch outright (e.g. one bad
+address) it is split in half and retried, down to single recipients, so
+one bad recipient only fails itself. Progress counters are updated
+atomically on the job row after every batch.
+
+Batches are queued in memory, so a restart mid-send leaves the job
+"running" with the remaining batches unsent.
+
+Set BREVO_API_URL to a local stub (scripts/brevo_stub.py) to exercise the
+pipeline without sending real mail.
+"""
+import json
+import os
+import subprocess
+import time
+import traceback
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+from flask import current_app
+
+from extensions import db
+from models import BulkMailJob
+from mail_queue import mail_queue, PRIORITY_BULK
+import email_templates
+
+API_URL = os.environ.get("BREVO_API_URL", "https://api.brevo.com/v3/smtp/email")
+
+# Recipients per Brevo request (Brevo allows up to 1000 message versions)
+BATCH_SIZE = int(os.environ.get("BULK_MAIL_BATCH_SIZE", "50"))
+
+# Attempts per request on rate limits, server errors and timeouts
+MAX_ATTEMPTS = 4
+BACKOFF_SECONDS = 2
+
+REQUEST_TIMEOUT = 60
+
+CURL_PATH = "/usr/bin/curl"
+
+
+def _post(payload):
+    """POST a JSON payload to Brevo; returns (http_status, body). Status 0 means no response."""
+    api_key = os.environ.get("BREVO_API_KEY", "")
+    data = json.dumps(payload).encode("utf-8")
+    if os.path.isfile(CURL_PATH):
+        # Same transport as brevo_mail (avoids eventlet's DNS); body goes via stdin
+        try:
+            result = subprocess.run(
+                [
+                    CURL_PATH, "-4", "-s",
+                    "-w", "\n%{http_code}",
+                    "-X", "POST", API_URL,
+                    "-H", f"api-key: {api_key}",
+                    "-H", "Content-Type: application/json",
+                    "-H", "Accept: application/json",
+                    "--data-binary", "@-",
+                ],
+                input=data,
+                capture_output=True,
+                timeout=REQUEST_TIMEOUT,
+            )
+        except subprocess.TimeoutExpired:
+            return 0, "timeout"
+        body, _, code = result.stdout.decode("utf-8", "replace").rpartition("\n")
+        return (int(code) if code.strip().isdigit() else 0), body
+
+    request = urllib.request.Request(API_URL, data=data, method="POST", headers={
+        "api-key": api_key,
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            return response.status, response.read().decode("utf-8", "replace")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8", "replace")
+    except Exception as e:
+        return 0, str(e)
+
+
+def build_payload(recipients, rendered):
+    """Brevo batch payload: one messageVersion per recipient."""
+    from brevo_mail import _get_sender
+
+    versions = []
+    for recipient, email in zip(recipients, rendered):
+        to = {"email": recipient["email"]}
+        if recipient.get("name"):
+            to["name"] = recipient["name"]
+        version = {"to": [to], "subject": email.subject, "htmlContent": email.html}
+        if email.text:
+            version["textContent"] = email.text
+        versions.append(version)
+    first = rendered[0]
+    return {
+        "sender": _get_sender(),
+        "subject": first.subject,
+        "htmlContent": first.html,
+        "messageVersions": versions,
+    }
+
+
+def _is_transient(status):
+    return status == 0 or status == 429 or status >= 500
+
+
+def deliver(recipients, rendered):
+    """Send one batch; returns [(email, error)] for recipients that could not be sent."""
+    status, body = 0, ""
+    for attempt in range(MAX_ATTEMPTS):
+        status, body = _post(build_payload(recipients, rendered))
+        if 200 <= status < 300:
+            return []
+        if not _is_transient(status):
+            break
+        time.sleep(BACKOFF_SECONDS * (2 ** attempt))
+
+    error = f"HTTP {status}: {body[:200]}" if status else f"No response: {body[:200]}"
+    if _is_transient(status) or len(recipients) == 1:
+        return [(r["email"], error) for r in recipients]
+    # Rejected batch: split to isolate the recipients Brevo refuses
+    mid = len(recipients) // 2
+    return deliver(recipients[:mid], rendered[:mid]) + deliver(recipients[mid:], rendered[mid:])
+
+
+def _mark_running(job_id):
+    BulkMailJob.query.filter(
+        BulkMailJob.job_id == job_id, BulkMailJob.status == "queued"
+    ).update({
+        BulkMailJob.status: "running",
+        BulkMailJob.started_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    db.session.commit()
+
+
+def _record_progress(job_id, sent, failed):
+    values = {
+        BulkMailJob.sent_count: BulkMailJob.sent_count + sent,
+        BulkMailJob.failed_count: BulkMailJob.failed_count + len(failed),
+        BulkMailJob.batches_done: BulkMailJob.batches_done + 1,
+    }
+    if failed:
+        addresses = "".join(f"{email}\n" for email, _ in failed)
+        values[BulkMailJob.failed_recipients] = db.func.coalesce(BulkMailJob.failed_recipients, "") + addresses
+        values[BulkMailJob.last_error] = failed[-1][1]
+    BulkMailJob.query.filter(BulkMailJob.job_id == job_id).update(values, synchronize_session=False)
+
+    # The batch that completes the job sets its final status
+    BulkMailJob.query.filter(
+        BulkMailJob.job_id == job_id,
+        BulkMailJob.batches_done >= BulkMailJob.batches_total,
+        BulkMailJob.finished_at.is_(None),
+    ).update({
+        BulkMailJob.status: db.case(
+            (BulkMailJob.failed_count == 0, "completed"),
+            (BulkMailJob.sent_count == 0, "failed"),
+            else_="partial",
+        ),
+        BulkMailJob.finished_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    db.session.commit()
+
+
+def _run_batch(app, job_id, template, recipients, shared):
+    with app.app_context():
+        try:
+            _mark_running(job_id)
+            contexts = [{"name": r.get("name"), "email": r["email"], **r.get("context", {})} for r in recipients]
+            rendered = email_templates.render_batch(template, contexts, **shared)
+            failed = deliver(recipients, rendered)
+        except Exception as e:
+            traceback.print_exc()
+            db.session.rollback()
+            failed = [(r["email"], str(e)) for r in recipients]
+        print(f"[BULK_MAIL] Job {job_id}: batch of {len(recipients)} done, {len(failed)} failed")
+        try:
+            _record_progress(job_id, len(recipients) - len(failed), failed)
+        except Exception:
+            traceback.print_exc()
+            db.session.rollback()
+    # Failures are recorded on the job row; nothing for mail_queue to retry
+    return True
+
+
+def start(template, recipients, shared=None, audience=None):
+    """Create a BulkMailJob and queue its batches.
+
+    recipients: [{"email": ..., "name": ..., "context": {...}}]; shared is
+    merged into every recipient's template context.
+    """
+    recipients = [r for r in recipients if r.get("email")]
+    batches = [recipients[i:i + BATCH_SIZE] for i in range(0, len(recipients), BATCH_SIZE)]
+    job = BulkMailJob(
+        template=template,
+        audience=audience,
+        status="queued" if batches else "completed",
+        total_recipients=len(recipients),
+        batches_total=len(batches),
+        finished_at=None if batches else datetime.utcnow(),
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    for number, batch in enumerate(batches, 1):
+        mail_queue.submit(
+            _run_batch, app, job.job_id, template, batch, shared or {},
+            priority=PRIORITY_BULK,
+            label=f"Bulk mail job {job.job_id} batch {number}/{len(batches)}",
+        )
+    print(f"[BULK_MAIL] Job {job.job_id}: {len(recipients)} recipients in {len(batches)} batches")
+    return job
+
@@ -0,0 +1,261 @@
+"""
+Response compression.
+
+An after_request hook negotiates br/gzip from Accept-Encoding and
+compresses text and JSON responses above MIN_SIZE bytes. Brotli is used
+when the `brotli` package (in requirements.txt) is installed; without it
+only gzip is offered.
+
+Catalog views (menu, categories, event types) are marked with
+@cache_compressed. Their responses are cached per request path and query
+string under the current catalog version: a hit returns the stored raw
+body, and compressed variants made on first use, without calling the view
+or touching the database. Menu and stock writes call invalidate() to bump
+the version. Entries also expire after CACHE_MAX_AGE_SECONDS, which bounds
+staleness for writes made by other workers or scripts. Static menu
+snapshots are pre-compressed on disk by menu_publisher (precompress_file)
+and served by send_precompressed.
+"""
+import gzip
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, request, make_response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Responses kept for @cache_compressed views (one per path + query string)
+CACHE_ENTRIES = 64
+
+# Cached responses are rebuilt at least this often even without invalidate()
+CACHE_MAX_AGE_SECONDS = 60
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "image/svg+xml",
+}
+
+# On-disk suffix for each pre-compressed variant
+FILE_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+_cache = OrderedDict()   # request key -> _CachedResponse
+_cache_lock = threading.Lock()
+_catalog_version = 0
+
+
+class _CachedResponse:
+    """A view's raw response plus the compressed variants made from it."""
+
+    __slots__ = ("version", "stored_at", "status", "mimetype", "body", "variants")
+
+    def __init__(self, version, response):
+        self.version = version
+        self.stored_at = time.monotonic()
+        self.status = response.status_code
+        self.mimetype = response.mimetype
+        self.body = response.get_data()
+        self.variants = {}   # encoding -> compressed bytes
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding):
+    """Pick the best supported encoding from an Accept-Encoding header, or None."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def invalidate():
+    """Drop cached catalog responses (call after any menu or stock change)."""
+    global _catalog_version
+    with _cache_lock:
+        _catalog_version += 1
+        _cache.clear()
+
+
+def _request_key():
+    return (request.path, tuple(sorted(request.args.items(multi=True))))
+
+
+def _lookup(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if entry.version != _catalog_version or time.monotonic() - entry.stored_at > CACHE_MAX_AGE_SECONDS:
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return entry
+
+
+def _store(key, entry):
+    with _cache_lock:
+        # Skip responses built from data an invalidate() has since replaced
+        if entry.version != _catalog_version:
+            return
+        _cache[key] = entry
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def _compressed_variant(entry, encoding):
+    body = entry.variants.get(encoding)
+    if body is None:
+        body = entry.variants[encoding] = compress(entry.body, encoding)
+    return body
+
+
+def cache_compressed(view):
+    """Serve a public catalog view from the per-version response cache."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = _request_key()
+        entry = _lookup(key)
+        if entry is None:
+            version = _catalog_version
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            entry = _CachedResponse(version, response)
+            _store(key, entry)
+        g.cached_response = entry
+        response = make_response(entry.body, entry.status)
+        response.mimetype = entry.mimetype
+        return response
+    return wrapper
+
+
+def _is_compressible(response):
+    mimetype = response.mimetype or ""
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def _add_vary(response):
+    vary = response.headers.get("Vary")
+    if not vary:
+        response.headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        response.headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+def compress_response(response):
+    """after_request hook: compress eligible responses in place."""
+    if (
+        request.method == "HEAD"
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or not _is_compressible(response)
+    ):
+        return response
+
+    _add_vary(response)
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+
+    entry = g.get("cached_response")
+    if entry is not None:
+        body = _compressed_variant(entry, encoding)
+    else:
+        body = compress(data, encoding)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.headers["Content-Length"] = str(len(body))
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        # The strong validator belongs to the uncompressed representation
+        response.headers["ETag"] = f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+    return response
+
+
+def precompress_file(path, data=None):
+    """Write .gz (and .br when available) siblings of a file; returns the written paths.
+
+    Pass data to compress content that is about to be written to path.
+    """
+    if data is None:
+        with open(path, "rb") as f:
+            data = f.read()
+    written = []
+    if len(data) < MIN_SIZE:
+        # Too small to be worth it; drop variants left from a larger previous version
+        for suffix in FILE_SUFFIXES.values():
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        return written
+    for encoding in available_encodings():
+        target = path + FILE_SUFFIXES[encoding]
+        tmp = target + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(compress(data, encoding))
+        os.replace(tmp, target)
+        written.append(target)
+    return written
+
+
+def send_precompressed(directory, filename):
+    """send_from_directory that serves a pre-compressed sibling when the client accepts it."""
+    from flask import send_from_directory
+    import mimetypes
+
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    if encoding:
+        variant = filename + FILE_SUFFIXES[encoding]
+        if os.path.isfile(os.path.join(directory, variant)):
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            response = send_from_directory(directory, variant, mimetype=mimetype)
+            response.headers["Content-Encoding"] = encoding
+            _add_vary(response)
+            return response
+    response = send_from_directory(directory, filename)
+    if any(os.path.isfile(os.path.join(directory, filename + s)) for s in FILE_SUFFIXES.values()):
+        _add_vary(response)
+    return response
+
+
+def init_app(app):
+    app.after_request(compress_response)
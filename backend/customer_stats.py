@@ -0,0 +1,110 @@
+"""
+Incrementally maintained customer aggregates.
+
+Customer.total_orders_count counts every order the customer placed and
+Customer.total_spent sums the totals of their non-cancelled orders. Both
+are adjusted with atomic UPDATE ... SET col = col + :delta statements in
+the same transaction as the order change, so concurrent checkouts never
+lose an increment and reads are a plain column lookup.
+
+refresh() recomputes selected customers from their orders (used when
+orders are reassigned), and reconcile() repairs any drift across the
+whole table.
+"""
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from extensions import db
+from models import Customer, Order
+from db_types import to_money
+
+CANCELLED = "Cancelled"
+
+
+def _apply(customer_id, orders_delta=0, spent_delta=Decimal("0.00")):
+    if not customer_id or (not orders_delta and not spent_delta):
+        return
+    Customer.query.filter(Customer.customer_id == customer_id).update({
+        Customer.total_orders_count: func.coalesce(Customer.total_orders_count, 0) + orders_delta,
+        Customer.total_spent: func.coalesce(Customer.total_spent, 0) + spent_delta,
+    }, synchronize_session=False)
+
+
+def record_order_created(customer_id, amount):
+    """Count a new order. Call before committing the order."""
+    _apply(customer_id, 1, to_money(amount) or Decimal("0.00"))
+
+
+def record_status_change(customer_id, amount, old_status, new_status):
+    """Adjust spend when an order moves into or out of Cancelled. Call before committing."""
+    was_cancelled = old_status == CANCELLED
+    is_cancelled = new_status == CANCELLED
+    if was_cancelled == is_cancelled:
+        return
+    amount = to_money(amount) or Decimal("0.00")
+    _apply(customer_id, 0, -amount if is_cancelled else amount)
+
+
+def _computed():
+    """Subquery of (customer_id, orders_count, total_spent) computed from orders."""
+    spent = func.coalesce(func.sum(
+        db.case((Order.status == CANCELLED, 0), else_=Order.total_amount)
+    ), 0)
+    return db.session.query(
+        Order.customer_id.label("customer_id"),
+        func.count(Order.order_id).label("orders_count"),
+        spent.label("total_spent"),
+    ).filter(Order.customer_id.isnot(None)).group_by(Order.customer_id).subquery()
+
+
+def find_drift(customer_ids=None):
+    """Return [(customer_id, stored_count, stored_spent, actual_count, actual_spent)] that disagree."""
+    computed = _computed()
+    actual_count = func.coalesce(computed.c.orders_count, 0)
+    actual_spent = func.coalesce(computed.c.total_spent, 0)
+    query = db.session.query(
+        Customer.customer_id,
+        Customer.total_orders_count,
+        Customer.total_spent,
+        actual_count,
+        actual_spent,
+    ).outerjoin(computed, computed.c.customer_id == Customer.customer_id).filter(
+        db.or_(
+            func.coalesce(Customer.total_orders_count, -1) != actual_count,
+            func.coalesce(Customer.total_spent, -1) != actual_spent,
+        )
+    )
+    if customer_ids is not None:
+        query = query.filter(Customer.customer_id.in_(list(customer_ids)))
+    return query.all()
+
+
+def refresh(customer_ids):
+    """Recompute the given customers from their orders and commit."""
+    ids = [c for c in set(customer_ids) if c]
+    if not ids:
+        return 0
+    return reconcile(customer_ids=ids)
+
+
+def reconcile(customer_ids=None, dry_run=False):
+    """Fix customers whose stored aggregates disagree with their orders.
+
+    Returns the number of customers that were (or, with dry_run, would be)
+    corrected.
+    """
+    drift = find_drift(customer_ids)
+    if dry_run or not drift:
+        return len(drift)
+    try:
+        for customer_id, _, _, actual_count, actual_spent in drift:
+            Customer.query.filter(Customer.customer_id == customer_id).update({
+                Customer.total_orders_count: int(actual_count),
+                Customer.total_spent: to_money(actual_spent),
+            }, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(drift)
@@ -0,0 +1,143 @@
+"""
+Custom column types shared by the models.
+
+EventDate/EventTime store real DATE/TIME columns (so they can be indexed,
+sorted and range-queried) while the Python side keeps the string API the
+frontend and emails already use ("2026-04-19", "14:00").
+
+Money stores rupee amounts as NUMERIC(12, 2) and hands back Decimals, so
+totals are exact and can be summed in SQL. to_paisa() converts an amount
+to the integer paisa Razorpay expects without float truncation.
+"""
+import re
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from sqlalchemy.types import Date, Numeric, Time, TypeDecorator
+
+_PAISA = Decimal("0.01")
+
+# Accepted input formats, tried in order
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d")
+TIME_FORMATS = ("%H:%M", "%H:%M:%S", "%I:%M %p", "%I:%M%p", "%I:%M:%S %p", "%I:%M:%S%p", "%I %p")
+
+# "a.m."/"p.m." markers and "." between hour, minute and second, as some locales write them
+_MERIDIEM_DOTS = re.compile(r"\b([AP])\.?M\.?(?=\s|$)")
+_DOT_SEPARATOR = re.compile(r"(?<=\d)\.(?=\d)")
+
+
+def parse_date(value):
+    """Parse a date string (or date/datetime) into a date. Returns None for blanks."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    # Accept ISO datetimes such as "2026-04-19T00:00:00.000Z"
+    if len(text) > 10 and text[10] in "T ":
+        text = text[:10]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {value!r}")
+
+
+def parse_time(value):
+    """Parse a time string (or time) into a time. Returns None for blanks.
+
+    Accepts 24-hour and 12-hour clock times as browsers format them in
+    common locales ("14:00", "2:00:45 PM", "2:00 p.m.", "14.00.45"),
+    including the non-breaking spaces some put before AM/PM.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, time):
+        return value
+    # str.split() also splits on non-breaking spaces (U+00A0, U+202F)
+    text = " ".join(str(value).strip().upper().split())
+    text = _DOT_SEPARATOR.sub(":", _MERIDIEM_DOTS.sub(r"\1M", text))
+    if text[:2] in ("AM", "PM"):
+        # Marker first, as in "PM 2:00"
+        text = f"{text[2:].strip()} {text[:2]}"
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid time: {value!r}")
+
+
+class EventDate(TypeDecorator):
+    """DATE column exposed as an ISO "YYYY-MM-DD" string."""
+
+    impl = Date
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return parse_date(value)
+
+    def process_result_value(self, value, dialect):
+        return value.isoformat() if value is not None else None
+
+
+class EventTime(TypeDecorator):
+    """TIME column exposed as an "HH:MM" string."""
+
+    impl = Time
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return parse_time(value)
+
+    def process_result_value(self, value, dialect):
+        return value.strftime("%H:%M") if value is not None else None
+
+
+def to_money(value):
+    """Convert a number or numeric string to a Decimal rounded to paisa. Returns None for blanks."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid amount: {value!r}")
+    try:
+        # str() first so 0.29 becomes Decimal("0.29"), not 0.28999999999999998
+        amount = value if isinstance(value, Decimal) else Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Invalid amount: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {value!r}")
+    try:
+        return amount.quantize(_PAISA, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        # Too many digits to round to paisa
+        raise ValueError(f"Invalid amount: {value!r}")
+
+
+def to_paisa(value):
+    """Convert a rupee amount to integer paisa (0.29 -> 29)."""
+    amount = to_money(value)
+    return int(amount * 100) if amount is not None else 0
+
+
+def from_paisa(paisa):
+    """Convert integer paisa back to a rupee Decimal."""
+    return (Decimal(int(paisa)) / 100).quantize(_PAISA)
+
+
+class Money(TypeDecorator):
+    """NUMERIC(12, 2) rupee amount; accepts floats/strings, returns Decimal."""
+
+    impl = Numeric(12, 2)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return to_money(value)
+
+    def process_result_value(self, value, dialect):
+        return to_money(value)
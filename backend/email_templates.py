@@ -0,0 +1,94 @@
+"""
+Precompiled email templates.
+
+Each email is a pair of Jinja2 templates under templates/email/ (NAME.html
+extending base.html, and NAME.txt) plus a subject template. All of them are
+compiled once when this module is imported. Jinja compiles the static
+chrome (styles, header, footer) into constant strings, so a send only
+evaluates the per-email fields. The compiled bytecode is cached on disk
+(EMAIL_TEMPLATE_CACHE_DIR), so restarts skip parsing too.
+
+render() builds one email. render_batch() builds many emails from the
+same template in one call for bulk notifications.
+"""
+import os
+import tempfile
+from collections import namedtuple
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+CACHE_DIR = os.environ.get(
+    "EMAIL_TEMPLATE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "email_template_cache")
+)
+
+# Hotel logo URL (served from the live website)
+LOGO_URL = "https://hotelshanmugabhavaan.com/images/ShanmugaBhavaan.png"
+
+# name -> subject template; bodies are templates/email/<name>.html and .txt
+SUBJECTS = {
+    "otp": "Your OTP for Password Reset - Hotel Shanmuga Bhavaan",
+    "registration_otp": "Verify Your Email - Hotel Shanmuga Bhavaan",
+    "admin_otp": "Admin Password Reset OTP - Hotel Shanmuga Bhavaan",
+    "order_confirmation": "Order Confirmation #{{ order.order_id }} - Hotel Shanmuga Bhavaan",
+    "order_cancellation": "Order #{{ order.order_id }} Cancelled - Hotel Shanmuga Bhavaan",
+    "announcement": "{{ title }} - Hotel Shanmuga Bhavaan",
+    "event_reminder": "Reminder: Your {{ order.event_type }} on {{ order.event_date }} - Hotel Shanmuga Bhavaan",
+}
+
+RenderedEmail = namedtuple("RenderedEmail", ["subject", "html", "text"])
+
+
+def _money(value):
+    return "%.2f" % (value or 0)
+
+
+def _bytecode_cache():
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(CACHE_DIR)
+    except OSError as e:
+        print(f"[EMAIL_TEMPLATES] Bytecode cache disabled: {e}")
+        return None
+
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    bytecode_cache=_bytecode_cache(),
+    auto_reload=False,
+    keep_trailing_newline=True,
+)
+env.filters["money"] = _money
+env.globals["LOGO_URL"] = LOGO_URL
+
+# name -> (subject, html, text) compiled templates
+_compiled = {
+    name: (
+        # Subjects are plain text; keep autoescape off for them
+        env.from_string("{% autoescape false %}" + subject + "{% endautoescape %}"),
+        env.get_template(f"email/{name}.html"),
+        env.get_template(f"email/{name}.txt"),
+    )
+    for name, subject in SUBJECTS.items()
+}
+
+
+def render(template, /, **context):
+    """Render one email; returns RenderedEmail(subject, html, text)."""
+    subject, html, text = _compiled[template]
+    return RenderedEmail(subject.render(context), html.render(context), text.render(context))
+
+
+def render_batch(template, contexts, /, **shared):
+    """Render one email per context dict, all from the same compiled templates.
+
+    Keyword arguments are merged into every context (per-context keys win).
+    """
+    subject, html, text = _compiled[template]
+    rendered = []
+    for context in contexts:
+        merged = {**shared, **context} if shared else context
+        rendered.append(RenderedEmail(subject.render(merged), html.render(merged), text.render(merged)))
+    return rendered
@@ -0,0 +1,276 @@
+"""
+Idempotency keys for write endpoints.
+
+Decorate a view with @idempotent("scope") and a retried request replays
+the first response instead of running the view again. The key is the
+client's Idempotency-Key header, or (when absent) a fingerprint of the
+caller's Authorization header and JSON body with a short window, which
+catches double submits from clients that send no key. Keys are scoped per
+caller (the signed-in customer or admin, else the email in the body), so
+two callers sending the same key never see each other's responses.
+
+While the first request is running its key is held as "in flight", so an
+identical concurrent request waits for it and replays its response rather
+than creating a second order. Only 2xx responses are stored; other outcomes
+release the key so the client can retry.
+
+Entries live in Redis when it is reachable (shared across workers and
+restarts) and otherwise in a bounded in-process store. Each in-process
+store has a single TTL, so insertion order is expiry order and expired
+entries are dropped from the front in O(1). In-flight claims are kept in
+their own store with IN_FLIGHT_TTL_SECONDS, so a crashed request frees its
+key as quickly as it does in Redis.
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request, jsonify, make_response
+
+HEADER = "Idempotency-Key"
+
+# How long a stored response is replayed for a client-supplied key
+KEY_TTL_SECONDS = 24 * 60 * 60
+
+# How long identical keyless requests are treated as duplicates
+FINGERPRINT_TTL_SECONDS = 60
+
+# How long a key stays locked while its first request runs
+IN_FLIGHT_TTL_SECONDS = 60
+
+# How long a duplicate waits for the in-flight request before giving up
+WAIT_SECONDS = 15
+
+MAX_KEY_LENGTH = 255
+MAX_ENTRIES = 10000
+
+_PENDING = "pending"
+
+
+class _TTLStore:
+    """In-process dict with one TTL; oldest entries expire (or are evicted) first."""
+
+    def __init__(self, ttl_seconds, max_entries=MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def _expire(self, now):
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def add(self, key, value):
+        """Insert if absent; returns False when the key already exists."""
+        now = time.monotonic()
+        self._expire(now)
+        if key in self._entries:
+            return False
+        self._entries[key] = (now + self.ttl_seconds, value)
+        return True
+
+    def replace(self, key, value):
+        now = time.monotonic()
+        self._entries.pop(key, None)
+        self._entries[key] = (now + self.ttl_seconds, value)
+        self._expire(now)
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+
+class IdempotencyStore:
+    """Claim / complete / release protocol over Redis with an in-memory fallback."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stores = {}   # ttl -> _TTLStore of completed responses
+        self._in_flight = _TTLStore(IN_FLIGHT_TTL_SECONDS)
+        self._events = {}   # key -> threading.Event set when the key is completed or released
+
+    def _redis(self):
+        try:
+            from api.users import redis_client
+            return redis_client
+        except Exception:
+            return None
+
+    def _store(self, ttl):
+        store = self._stores.get(ttl)
+        if store is None:
+            store = self._stores[ttl] = _TTLStore(ttl)
+        return store
+
+    def claim(self, key, fingerprint, ttl):
+        """Try to take ownership of key.
+
+        Returns ("claimed", None), ("pending", None) or ("done", record) where
+        record is the stored response dict.
+        """
+        client = self._redis()
+        if client:
+            try:
+                pending = json.dumps({"state": _PENDING, "fingerprint": fingerprint})
+                if client.set(f"idem:{key}", pending, nx=True, ex=IN_FLIGHT_TTL_SECONDS):
+                    return "claimed", None
+                raw = client.get(f"idem:{key}")
+                if raw is None:
+                    return self.claim(key, fingerprint, ttl)
+                record = json.loads(raw)
+                return ("pending", record) if record.get("state") == _PENDING else ("done", record)
+            except Exception as e:
+                print(f"[IDEMPOTENCY] Redis unavailable, using in-memory store: {e}")
+
+        with self._lock:
+            record = self._store(ttl).get(key)
+            if record is not None:
+                return "done", record
+            if self._in_flight.add(key, {"state": _PENDING, "fingerprint": fingerprint}):
+                self._events[key] = threading.Event()
+                return "claimed", None
+            return "pending", self._in_flight.get(key)
+
+    def complete(self, key, ttl, record):
+        """Store the finished response for replay."""
+        record = {**record, "state": "done"}
+        client = self._redis()
+        if client:
+            try:
+                client.set(f"idem:{key}", json.dumps(record), ex=ttl)
+                return
+            except Exception as e:
+                print(f"[IDEMPOTENCY] Redis unavailable, using in-memory store: {e}")
+        with self._lock:
+            self._store(ttl).replace(key, record)
+            self._in_flight.delete(key)
+            event = self._events.pop(key, None)
+        if event:
+            event.set()
+
+    def release(self, key, ttl):
+        """Forget an in-flight key so the request can be retried."""
+        client = self._redis()
+        if client:
+            try:
+                client.delete(f"idem:{key}")
+                return
+            except Exception as e:
+                print(f"[IDEMPOTENCY] Redis unavailable, using in-memory store: {e}")
+        with self._lock:
+            self._in_flight.delete(key)
+            event = self._events.pop(key, None)
+        if event:
+            event.set()
+
+    def wait(self, key, fingerprint, ttl, timeout=WAIT_SECONDS):
+        """Wait for an in-flight key to finish; returns claim() state afterwards."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                event = self._events.get(key)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return "pending", None
+            if event is not None:
+                event.wait(min(remaining, 0.5))
+            else:
+                time.sleep(min(remaining, 0.2))
+            state, record = self.claim(key, fingerprint, ttl)
+            if state != "pending":
+                return state, record
+
+
+store = IdempotencyStore()
+
+
+def request_fingerprint():
+    """Hash of the caller's credentials and canonical JSON body."""
+    body = request.get_json(silent=True)
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256()
+    digest.update(request.headers.get("Authorization", "").encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(canonical.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def caller_identity():
+    """Who is calling: the token's customer or admin, else the body's email, else anonymous."""
+    import auth
+
+    principal = auth.current_principal()
+    if principal is not None:
+        if principal.is_admin:
+            return f"admin:{principal.admin_id or principal.email}"
+        if principal.customer_id is not None:
+            return f"customer:{principal.customer_id}"
+    body = request.get_json(silent=True)
+    email = body.get("email") if isinstance(body, dict) else None
+    if isinstance(email, str) and email.strip():
+        return f"email:{email.strip().lower()}"
+    return "anonymous"
+
+
+def _replay(record):
+    response = make_response(record["body"], record["status"])
+    response.headers["Content-Type"] = record.get("content_type") or "application/json"
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(scope):
+    """Make a view replay its first successful response for repeated requests."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            fingerprint = request_fingerprint()
+            client_key = request.headers.get(HEADER, "").strip()
+            caller = hashlib.sha256(caller_identity().encode("utf-8")).hexdigest()[:32]
+            if client_key:
+                if len(client_key) > MAX_KEY_LENGTH:
+                    return jsonify({"error": f"{HEADER} is too long"}), 400
+                key = f"{scope}:{caller}:key:{hashlib.sha256(client_key.encode('utf-8')).hexdigest()}"
+                ttl = KEY_TTL_SECONDS
+            else:
+                key = f"{scope}:{caller}:fp:{fingerprint}"
+                ttl = FINGERPRINT_TTL_SECONDS
+
+            state, record = store.claim(key, fingerprint, ttl)
+            if state == "pending":
+                state, record = store.wait(key, fingerprint, ttl)
+            if state == "pending":
+                return jsonify({"error": "A request with this idempotency key is still in progress"}), 409
+            if state == "done":
+                if record.get("fingerprint") != fingerprint:
+                    return jsonify({"error": f"{HEADER} was already used for a different request"}), 422
+                print(f"[IDEMPOTENCY] Replaying stored response for {scope}")
+                return _replay(record)
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                store.release(key, ttl)
+                raise
+            if 200 <= response.status_code < 300:
+                store.complete(key, ttl, {
+                    "fingerprint": fingerprint,
+                    "status": response.status_code,
+                    "body": response.get_data(as_text=True),
+                    "content_type": response.headers.get("Content-Type"),
+                })
+            else:
+                store.release(key, ttl)
+            return response
+        return wrapper
+    return decorator
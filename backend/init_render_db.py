@@ -14,9 +14,26 @@ def init_db():
     
     with app.app_context():
         try:
+            # Trigram indexes (customer search) need pg_trgm
+            if db.engine.dialect.name == "postgresql":
+                try:
+                    with db.engine.begin() as conn:
+                        conn.execute(db.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                except Exception as e:
+                    print(f"✗ Could not enable pg_trgm: {e}")
+
             # Create all tables defined in models
             db.create_all()
             print("✓ Database tables created successfully!")
+
+            # create_all skips indexes on tables that already exist
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    try:
+                        index.create(bind=db.engine, checkfirst=True)
+                    except Exception as e:
+                        print(f"✗ Could not create index {index.name}: {e}")
+            print("✓ Database indexes ensured")
             return True
         except Exception as e:
             print(f"✗ Error creating database tables: {e}")
@@ -0,0 +1,170 @@
+"""
+Background email dispatch.
+
+Brevo sends go through a curl subprocess that takes 0.3-3 s, so request
+handlers enqueue them here and return straight away. There are two lanes:
+the fast lane (OTP and other transactional mail) and the bulk lane. Each
+lane has its own worker threads, so a large bulk send can never delay an
+OTP. Within the fast lane, lower priority numbers go first.
+
+submit() returns a ticket whose status ("queued", "sending", "sent" or
+"failed") can be polled with status(). Statuses live in Redis when it is
+reachable, so any worker can answer the poll. Otherwise they are kept in
+memory for STATUS_TTL_SECONDS. A job whose send keeps failing after
+MAX_ATTEMPTS calls its on_failure callback.
+"""
+import itertools
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+import traceback
+
+PRIORITY_OTP = 0
+PRIORITY_TRANSACTIONAL = 5
+PRIORITY_BULK = 10
+
+FAST_WORKERS = int(os.environ.get("MAIL_FAST_WORKERS", "2"))
+BULK_WORKERS = int(os.environ.get("MAIL_BULK_WORKERS", "2"))
+
+MAX_ATTEMPTS = 2
+RETRY_DELAY_SECONDS = 2
+
+# How long a ticket's status can be polled
+STATUS_TTL_SECONDS = 15 * 60
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class _Job:
+    __slots__ = ("ticket", "label", "fn", "args", "kwargs", "on_failure")
+
+    def __init__(self, ticket, label, fn, args, kwargs, on_failure):
+        self.ticket = ticket
+        self.label = label
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_failure = on_failure
+
+
+class MailQueue:
+    def __init__(self):
+        self._fast = queue.PriorityQueue()
+        self._bulk = queue.Queue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._started = False
+        self._statuses = {}   # ticket -> (expires_at, record); fallback when Redis is down
+
+    # ── Status store ──────────────────────────────────────────────────────
+
+    def _redis(self):
+        try:
+            from api.users import redis_client
+            return redis_client
+        except Exception:
+            return None
+
+    def _set_status(self, ticket, state, error=None):
+        record = {"status": state, "updated_at": time.time()}
+        if error:
+            record["error"] = error
+        client = self._redis()
+        if client:
+            try:
+                client.setex(f"mailticket:{ticket}", STATUS_TTL_SECONDS, json.dumps(record))
+                return
+            except Exception as e:
+                print(f"[MAIL_QUEUE] Redis unavailable, keeping status in memory: {e}")
+        now = time.monotonic()
+        with self._lock:
+            self._statuses[ticket] = (now + STATUS_TTL_SECONDS, record)
+            for key in [k for k, (expires_at, _) in self._statuses.items() if expires_at <= now]:
+                del self._statuses[key]
+
+    def status(self, ticket):
+        """The ticket's status record, or None if it is unknown or expired."""
+        client = self._redis()
+        if client:
+            try:
+                raw = client.get(f"mailticket:{ticket}")
+                if raw is not None:
+                    return json.loads(raw)
+            except Exception as e:
+                print(f"[MAIL_QUEUE] Redis unavailable, reading status from memory: {e}")
+        with self._lock:
+            entry = self._statuses.get(ticket)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    # ── Workers ───────────────────────────────────────────────────────────
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(FAST_WORKERS):
+            threading.Thread(target=self._work, args=(self._fast, True), name=f"mail-fast-{i}", daemon=True).start()
+        for i in range(BULK_WORKERS):
+            threading.Thread(target=self._work, args=(self._bulk, False), name=f"mail-bulk-{i}", daemon=True).start()
+
+    def _work(self, lane, prioritized):
+        while True:
+            item = lane.get()
+            job = item[2] if prioritized else item
+            try:
+                self._run(job)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                lane.task_done()
+
+    def _run(self, job):
+        self._set_status(job.ticket, SENDING)
+        error = None
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                if job.fn(*job.args, **job.kwargs):
+                    self._set_status(job.ticket, SENT)
+                    print(f"[MAIL_QUEUE] {job.label} sent (ticket {job.ticket})")
+                    return
+                error = "Email provider rejected the message"
+            except Exception as e:
+                error = str(e)
+            print(f"[MAIL_QUEUE] {job.label} attempt {attempt} failed: {error}")
+            if attempt < MAX_ATTEMPTS:
+                time.sleep(RETRY_DELAY_SECONDS * attempt)
+        self._set_status(job.ticket, FAILED, error)
+        if job.on_failure:
+            try:
+                job.on_failure(job.ticket, error)
+            except Exception:
+                traceback.print_exc()
+
+    # ── Public API ────────────────────────────────────────────────────────
+
+    def submit(self, fn, *args, priority=PRIORITY_TRANSACTIONAL, label=None, on_failure=None, **kwargs):
+        """Queue fn(*args, **kwargs), a send function returning truthy on success; returns a ticket."""
+        self._start()
+        ticket = secrets.token_urlsafe(12)
+        job = _Job(ticket, label or fn.__name__, fn, args, kwargs, on_failure)
+        self._set_status(ticket, QUEUED)
+        if priority >= PRIORITY_BULK:
+            self._bulk.put(job)
+        else:
+            self._fast.put((priority, next(self._seq), job))
+        return ticket
+
+    def pending(self):
+        return {"fast": self._fast.qsize(), "bulk": self._bulk.qsize()}
+
+
+mail_queue = MailQueue()
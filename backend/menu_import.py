@@ -0,0 +1,169 @@
+"""
+Bulk menu import: parse CSV/JSON rows and upsert them in one transaction.
+
+Rows are keyed on lower(item_name). Existing items are loaded with a single
+query, categories are resolved in one pass, and everything is committed
+together, so importing hundreds of items costs a handful of statements
+instead of a duplicate check + commit + broadcast per item.
+"""
+import csv
+import io
+from decimal import Decimal
+
+from extensions import db
+from models import MenuItem, MenuCategory
+from db_types import to_money
+
+# Maximum rows accepted in one import
+MAX_ROWS = 2000
+
+# Largest price that fits price_per_plate (NUMERIC(12, 2))
+MAX_PRICE = Decimal("9999999999.99")
+
+# Separators accepted inside a CSV `categories` cell
+_CATEGORY_SEPARATORS = ("|", ";")
+
+_TRUE_VALUES = ("1", "true", "yes", "y", "veg")
+_FALSE_VALUES = ("0", "false", "no", "n", "non-veg", "nonveg")
+
+
+class MenuImportError(ValueError):
+    """Raised when an import payload is invalid; `errors` lists per-row problems."""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def _parse_bool(value, default=None):
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE_VALUES:
+        return True
+    if text in _FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid boolean {value!r}")
+
+
+def _split_categories(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    text = str(value)
+    for sep in _CATEGORY_SEPARATORS:
+        if sep in text:
+            return [part.strip() for part in text.split(sep)]
+    return [text.strip()]
+
+
+def parse_csv(text):
+    """Parse CSV text with a header row into a list of row dicts."""
+    reader = csv.DictReader(io.StringIO(text))
+    return [{(k or "").strip(): v for k, v in row.items()} for row in reader]
+
+
+def normalize_rows(rows):
+    """Validate raw rows and merge rows that share a name.
+
+    Accepts the same field names as POST /api/menu (item_name, price,
+    categories/category, veg, image, description) plus is_available and
+    stock_quantity. Rows repeating a name are merged: later fields win and
+    categories are combined. Raises MenuImportError listing every invalid row.
+    """
+    if not isinstance(rows, list) or not rows:
+        raise MenuImportError("No items to import")
+    if len(rows) > MAX_ROWS:
+        raise MenuImportError(f"Too many items (max {MAX_ROWS})")
+
+    merged = {}
+    errors = []
+    for index, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": index, "error": "Row must be an object"})
+            continue
+        name = (row.get("item_name") or row.get("name") or "").strip()
+        if not name:
+            errors.append({"row": index, "error": "item_name is required"})
+            continue
+        try:
+            price = row.get("price", row.get("price_per_plate"))
+            if price is None or price == "":
+                raise ValueError("price is required")
+            fields = {"item_name": name, "price_per_plate": to_money(price)}
+            if fields["price_per_plate"] < 0:
+                raise ValueError("price must not be negative")
+            if fields["price_per_plate"] > MAX_PRICE:
+                raise ValueError(f"price must not exceed {MAX_PRICE}")
+
+            veg = _parse_bool(row.get("veg", row.get("is_vegetarian")))
+            if veg is not None:
+                fields["is_vegetarian"] = veg
+            available = _parse_bool(row.get("is_available"))
+            if available is not None:
+                fields["is_available"] = available
+            stock = row.get("stock_quantity")
+            if stock not in (None, ""):
+                fields["stock_quantity"] = int(stock)
+            image = row.get("image", row.get("image_url"))
+            if image:
+                fields["image_url"] = image
+            description = row.get("description")
+            if description not in (None, ""):
+                fields["description"] = description
+        except (TypeError, ValueError) as e:
+            errors.append({"row": index, "item_name": name, "error": str(e)})
+            continue
+
+        categories = _split_categories(row.get("categories", row.get("category")))
+        key = name.lower()
+        if key in merged:
+            previous = merged[key]
+            previous["fields"].update(fields)
+            previous["categories"].extend(categories)
+        else:
+            merged[key] = {"fields": fields, "categories": categories}
+
+    if errors:
+        raise MenuImportError("Invalid rows in import", errors)
+    return merged
+
+
+def upsert_menu_items(rows):
+    """Insert or update menu items keyed on lower(item_name) in one transaction.
+
+    Returns (created_items, updated_items). The caller is responsible for
+    post-commit work (search index, snapshots, socket broadcast).
+    """
+    merged = normalize_rows(rows)
+
+    created, updated = [], []
+    try:
+        existing = {
+            m.item_name.strip().lower(): m
+            for m in MenuItem.query.filter(db.func.lower(MenuItem.item_name).in_(list(merged))).all()
+        }
+
+        all_names = [name for entry in merged.values() for name in entry["categories"] if name and name.strip()]
+        category_map = {c.slug: c for c in MenuCategory.get_or_create_many(all_names)}
+
+        for key, entry in merged.items():
+            item = existing.get(key)
+            if item is None:
+                item = MenuItem(is_vegetarian=True, is_available=True, stock_quantity=100)
+                db.session.add(item)
+                created.append(item)
+            else:
+                updated.append(item)
+            for field, value in entry["fields"].items():
+                setattr(item, field, value)
+            if entry["categories"] or item.category is None:
+                item.set_categories(entry["categories"], category_map)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return created, updated
@@ -0,0 +1,252 @@
+"""
+Publishes precomputed menu snapshots as static, versioned JSON.
+
+On every menu change the current catalog is materialized into:
+
+    menu/<version>/all.json                  every available item
+    menu/<version>/category/<slug>.json      one file per category
+    menu/<version>/event_types.json          active event types
+    menu/<version>/event_type/<slug>.json    one file per active event type
+    menu/index.json                          points at the current version
+
+<version> is a content hash, so versioned files never change and can be
+cached forever; only index.json is short-lived. Every event type offers the
+full available menu (menu items are not linked to event types), so each
+event type file carries the event type and that menu grouped by category,
+letting the bulk menu page load with one request. Stock counts are left out
+of the snapshot (clients get live stock from the API and socket events), so
+orders only produce a new version when an item's availability flips. Files
+are written under
+backend/static (served by /static or any web server in front of it) and,
+when MENU_SNAPSHOT_S3 is enabled, uploaded to the S3 bucket so the CDN can
+serve anonymous menu traffic without reaching Flask or Postgres.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+
+import compression
+import serializers
+
+SNAPSHOT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "menu")
+S3_PREFIX = "menu-snapshots/"
+
+# Publish to S3 as well as local disk
+PUBLISH_TO_S3 = os.environ.get("MENU_SNAPSHOT_S3", "").lower() in ("1", "true", "yes")
+
+# Number of old versions kept on disk for clients still holding an old index
+KEEP_VERSIONS = 5
+
+# Coalesce bursts of menu writes into one publish
+DEBOUNCE_SECONDS = 2.0
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+INDEX_CACHE_CONTROL = "public, max-age=30, must-revalidate"
+
+_publish_lock = threading.Lock()
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def category_slug(name):
+    """File-safe slug for a category name ("Lunch Menu - Variety Rice" -> "lunch-menu-variety-rice")."""
+    return re.sub(r"[^a-z0-9]+", "-", (name or "").lower()).strip("-") or "uncategorized"
+
+
+def _dumps(payload):
+    return serializers.dumps(payload, sort_keys=True)
+
+
+def build_snapshot():
+    """Materialize the snapshot documents. Must be called inside an app context.
+
+    Returns {relative_path: payload}.
+    """
+    from models import MenuItem, EventType
+
+    items = MenuItem.query.filter_by(is_available=True).order_by(MenuItem.item_name).all()
+    all_items = [serializers.menu_item(m) for m in items]
+    for item in all_items:
+        # Stock changes with every order; keep it out of the versioned files
+        item.pop("stock_quantity", None)
+
+    by_category = {}
+    for item in all_items:
+        categories = item["category"] if isinstance(item["category"], list) else [item["category"]]
+        for name in categories:
+            if not name:
+                continue
+            entry = by_category.setdefault(category_slug(name), {"name": name, "items": []})
+            entry["items"].append(item)
+
+    event_types = [
+        serializers.event_type(e)
+        for e in EventType.query.filter(EventType.is_active.isnot(False)).order_by(EventType.event_type_id).all()
+    ]
+
+    documents = {"all.json": all_items, "event_types.json": event_types}
+    for slug, entry in by_category.items():
+        documents[f"category/{slug}.json"] = entry
+    categories = [by_category[slug] for slug in sorted(by_category)]
+    for event in event_types:
+        slug = category_slug(event["event_name"])
+        documents.setdefault(f"event_type/{slug}.json", {"event_type": event, "categories": categories})
+    return documents
+
+
+def _version_for(files):
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        digest.update(path.encode("utf-8"))
+        digest.update(files[path])
+    return digest.hexdigest()[:16]
+
+
+def _index_document(version, documents):
+    categories = {}
+    event_types = {}
+    for path, payload in documents.items():
+        if path.startswith("category/"):
+            slug = path[len("category/"):-len(".json")]
+            categories[slug] = {"name": payload["name"], "path": f"{version}/{path}", "count": len(payload["items"])}
+        elif path.startswith("event_type/"):
+            slug = path[len("event_type/"):-len(".json")]
+            event_types[slug] = {"name": payload["event_type"]["event_name"], "path": f"{version}/{path}"}
+    return {
+        "version": version,
+        "published_at": datetime.utcnow().isoformat() + "Z",
+        "all": f"{version}/all.json",
+        "event_types": f"{version}/event_types.json",
+        "categories": categories,
+        "event_type_menus": event_types,
+    }
+
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _write_local(version, files, index_bytes):
+    version_dir = os.path.join(SNAPSHOT_ROOT, version)
+    if not os.path.isdir(version_dir):
+        for path, data in files.items():
+            target = os.path.join(version_dir, path)
+            _atomic_write(target, data)
+            compression.precompress_file(target, data)
+    # index.json goes last so it never points at a partially written version;
+    # the plain file is written before its .gz/.br variants
+    index_path = os.path.join(SNAPSHOT_ROOT, "index.json")
+    _atomic_write(index_path, index_bytes)
+    compression.precompress_file(index_path, index_bytes)
+    _prune_local(version)
+
+
+def _prune_local(current_version):
+    try:
+        versions = [
+            d for d in os.listdir(SNAPSHOT_ROOT)
+            if os.path.isdir(os.path.join(SNAPSHOT_ROOT, d)) and d != current_version
+        ]
+    except FileNotFoundError:
+        return
+    versions.sort(key=lambda d: os.path.getmtime(os.path.join(SNAPSHOT_ROOT, d)), reverse=True)
+    for old in versions[KEEP_VERSIONS - 1:]:
+        shutil.rmtree(os.path.join(SNAPSHOT_ROOT, old), ignore_errors=True)
+
+
+def _upload_s3(version, files, index_bytes):
+    from api.uploads import get_s3_client
+    from config import Config
+
+    s3_client = get_s3_client()
+    if not s3_client:
+        print("[MENU_PUBLISH] S3 client not available, skipping upload")
+        return
+    bucket = Config.AWS_S3_BUCKET_NAME
+    for path, data in files.items():
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=f"{S3_PREFIX}{version}/{path}",
+            Body=data,
+            ContentType="application/json",
+            CacheControl=IMMUTABLE_CACHE_CONTROL,
+        )
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=f"{S3_PREFIX}index.json",
+        Body=index_bytes,
+        ContentType="application/json",
+        CacheControl=INDEX_CACHE_CONTROL,
+    )
+
+
+def current_version():
+    """Return the version recorded in the local index.json, or None."""
+    try:
+        with open(os.path.join(SNAPSHOT_ROOT, "index.json"), "rb") as f:
+            return json.loads(f.read()).get("version")
+    except (OSError, ValueError):
+        return None
+
+
+def publish():
+    """Build and publish the snapshot. Must be called inside an app context.
+
+    Returns the published version. Publishing an unchanged catalog is a no-op.
+    """
+    with _publish_lock:
+        documents = build_snapshot()
+        files = {path: _dumps(payload) for path, payload in documents.items()}
+        version = _version_for(files)
+        if version == current_version():
+            return version
+
+        index_bytes = _dumps(_index_document(version, documents))
+        _write_local(version, files, index_bytes)
+        if PUBLISH_TO_S3:
+            try:
+                _upload_s3(version, files, index_bytes)
+            except Exception as e:
+                print(f"[MENU_PUBLISH] S3 upload failed: {e}")
+        print(f"[MENU_PUBLISH] Published menu snapshot {version} ({len(files)} files)")
+        return version
+
+
+def schedule_publish(app=None):
+    """Publish in the background after a short debounce (call after menu writes)."""
+    global _timer
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+
+    def _run():
+        with app.app_context():
+            try:
+                publish()
+            except Exception as e:
+                print(f"[MENU_PUBLISH] Publish failed: {e}")
+
+    with _timer_lock:
+        if _timer is not None:
+            _timer.cancel()
+        _timer = threading.Timer(DEBOUNCE_SECONDS, _run)
+        _timer.daemon = True
+        _timer.start()
+
+
+def cache_control_for(filename):
+    """Cache-Control header for a file under /static/menu/, or None for other paths."""
+    if not filename.startswith("menu/"):
+        return None
+    if filename == "menu/index.json":
+        return INDEX_CACHE_CONTROL
+    return IMMUTABLE_CACHE_CONTROL
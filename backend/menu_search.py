@@ -0,0 +1,215 @@
+"""
+In-memory menu search index.
+
+Builds an inverted index over item_name, description and category with a
+trigram index over the vocabulary, so lookups support exact, prefix and
+typo-tolerant matches without touching the database. The index is updated
+incrementally by the menu write endpoints and fully rebuilt when stale.
+"""
+import bisect
+import re
+import threading
+import time
+
+# Relative weight of a match in each field
+FIELD_WEIGHTS = {"item_name": 3.0, "category": 2.0, "description": 1.0}
+
+# Score multipliers per match kind
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+FUZZY_SCORE = 0.5
+
+# Minimum trigram similarity for a fuzzy term match
+FUZZY_THRESHOLD = 0.4
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase and split text into alphanumeric tokens."""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def trigrams(term):
+    """Return the set of padded trigrams for a term ("dosa" -> " do", "dos", ...)."""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _category_text(category):
+    if isinstance(category, (list, tuple)):
+        return " ".join(str(c) for c in category if c)
+    return category or ""
+
+
+class MenuSearchIndex:
+    """Inverted + trigram index over menu item dicts keyed by item_id."""
+
+    def __init__(self, max_age_seconds=300):
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.RLock()
+        self._reset()
+        self.built_at = None
+
+    def _reset(self):
+        self._docs = {}          # item_id -> item dict
+        self._doc_terms = {}     # item_id -> {term: weight}
+        self._postings = {}      # term -> {item_id: weight}
+        self._trigrams = {}      # trigram -> set(term)
+        self._sorted_terms = []  # sorted vocabulary for prefix lookups
+
+    @property
+    def is_stale(self):
+        return self.built_at is None or (time.monotonic() - self.built_at) > self.max_age_seconds
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ── Index maintenance ────────────────────────────────────────────────
+
+    def rebuild(self, items):
+        """Replace the whole index with the given item dicts."""
+        with self._lock:
+            self._reset()
+            for item in items:
+                self._add(item)
+            self.built_at = time.monotonic()
+
+    def upsert(self, item):
+        """Add or replace a single item."""
+        with self._lock:
+            self._remove(item["item_id"])
+            self._add(item)
+
+    def remove(self, item_id):
+        with self._lock:
+            self._remove(item_id)
+
+    def update_fields(self, item_id, **fields):
+        """Patch non-text fields (stock, availability) of an indexed item in place."""
+        with self._lock:
+            item = self._docs.get(item_id)
+            if item is not None:
+                self._docs[item_id] = {**item, **fields}
+
+    def _add(self, item):
+        item_id = item["item_id"]
+        terms = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            value = item.get(field)
+            if field == "category":
+                value = _category_text(value)
+            for term in tokenize(value):
+                terms[term] = max(terms.get(term, 0.0), weight)
+
+        self._docs[item_id] = item
+        self._doc_terms[item_id] = terms
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._sorted_terms, term)
+                for gram in trigrams(term):
+                    self._trigrams.setdefault(gram, set()).add(term)
+            postings[item_id] = weight
+
+    def _remove(self, item_id):
+        terms = self._doc_terms.pop(item_id, None)
+        self._docs.pop(item_id, None)
+        if not terms:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(item_id, None)
+            if not postings:
+                del self._postings[term]
+                pos = bisect.bisect_left(self._sorted_terms, term)
+                if pos < len(self._sorted_terms) and self._sorted_terms[pos] == term:
+                    self._sorted_terms.pop(pos)
+                for gram in trigrams(term):
+                    bucket = self._trigrams.get(gram)
+                    if bucket:
+                        bucket.discard(term)
+                        if not bucket:
+                            del self._trigrams[gram]
+
+    # ── Querying ─────────────────────────────────────────────────────────
+
+    def _expand(self, token):
+        """Map a query token to {term: match score} across exact/prefix/fuzzy matches."""
+        matches = {}
+        if token in self._postings:
+            matches[token] = EXACT_SCORE
+
+        pos = bisect.bisect_left(self._sorted_terms, token)
+        while pos < len(self._sorted_terms) and self._sorted_terms[pos].startswith(token):
+            term = self._sorted_terms[pos]
+            matches.setdefault(term, PREFIX_SCORE)
+            pos += 1
+
+        if len(token) >= 3:
+            query_grams = trigrams(token)
+            shared = {}
+            for gram in query_grams:
+                for term in self._trigrams.get(gram, ()):
+                    shared[term] = shared.get(term, 0) + 1
+            for term, count in shared.items():
+                if term in matches:
+                    continue
+                similarity = count / (len(query_grams) + len(trigrams(term)) - count)
+                if similarity >= FUZZY_THRESHOLD:
+                    matches[term] = FUZZY_SCORE * similarity
+        return matches
+
+    def search(self, query, vegetarian=None, available=None, min_price=None, max_price=None, limit=20):
+        """Return matching item dicts ranked by relevance.
+
+        Every query token must match (exactly, by prefix or fuzzily) for an
+        item to be returned. An empty query returns all items that pass the
+        filters, ordered by name.
+        """
+        tokens = tokenize(query)
+        with self._lock:
+            if tokens:
+                scores = None
+                for token in tokens:
+                    token_scores = {}
+                    for term, match_score in self._expand(token).items():
+                        for item_id, weight in self._postings[term].items():
+                            score = match_score * weight
+                            if score > token_scores.get(item_id, 0.0):
+                                token_scores[item_id] = score
+                    if scores is None:
+                        scores = token_scores
+                    else:
+                        scores = {i: s + token_scores[i] for i, s in scores.items() if i in token_scores}
+                    if not scores:
+                        return []
+                ranked = sorted(scores.items(), key=lambda pair: (-pair[1], self._docs[pair[0]]["item_name"]))
+                candidates = [self._docs[item_id] for item_id, _ in ranked]
+            else:
+                candidates = sorted(self._docs.values(), key=lambda item: item["item_name"])
+
+            results = []
+            for item in candidates:
+                if vegetarian is not None and bool(item.get("is_vegetarian")) != vegetarian:
+                    continue
+                if available is not None and bool(item.get("is_available")) != available:
+                    continue
+                price = item.get("price_per_plate") or 0
+                if min_price is not None and price < min_price:
+                    continue
+                if max_price is not None and price > max_price:
+                    continue
+                results.append(item)
+                if limit and len(results) >= limit:
+                    break
+            return results
+
+
+# Process-wide index used by the menu blueprint
+search_index = MenuSearchIndex()
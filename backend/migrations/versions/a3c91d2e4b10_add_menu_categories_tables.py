@@ -0,0 +1,94 @@
+"""Add normalized menu_categories and menu_item_categories tables
+
+Revision ID: a3c91d2e4b10
+Revises: fec2bca9c10b
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c91d2e4b10'
+down_revision = 'fec2bca9c10b'
+branch_labels = None
+depends_on = None
+
+
+def _to_list(value):
+    """Parse a stored menu_items.category value (JSON list, JSON string or plain text)."""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        stripped = value.strip()
+        try:
+            loaded = json.loads(stripped)
+        except ValueError:
+            return [stripped] if stripped else []
+        if isinstance(loaded, list):
+            return loaded
+        if isinstance(loaded, str):
+            return [loaded]
+    return []
+
+
+def upgrade():
+    op.create_table(
+        'menu_categories',
+        sa.Column('category_id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('slug', sa.String(length=100), nullable=False),
+    )
+    op.create_index('ix_menu_categories_slug', 'menu_categories', ['slug'], unique=True)
+
+    op.create_table(
+        'menu_item_categories',
+        sa.Column('item_id', sa.Integer(), sa.ForeignKey('menu_items.item_id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('category_id', sa.Integer(), sa.ForeignKey('menu_categories.category_id', ondelete='CASCADE'), primary_key=True),
+    )
+    op.create_index('ix_menu_item_categories_category_id', 'menu_item_categories', ['category_id'])
+
+    # Backfill from the JSON category arrays
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT item_id, category FROM menu_items")).fetchall()
+
+    slugs = {}
+    links = []
+    for item_id, raw in rows:
+        for name in _to_list(raw):
+            if not isinstance(name, str) or not name.strip():
+                continue
+            slug = " ".join(name.lower().split())
+            slugs.setdefault(slug, name.strip())
+            links.append((item_id, slug))
+
+    categories = sa.table(
+        'menu_categories',
+        sa.column('category_id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('slug', sa.String),
+    )
+    if slugs:
+        op.bulk_insert(categories, [{'name': name, 'slug': slug} for slug, name in slugs.items()])
+
+    ids = dict(bind.execute(sa.text("SELECT slug, category_id FROM menu_categories")).fetchall())
+    item_categories = sa.table(
+        'menu_item_categories',
+        sa.column('item_id', sa.Integer),
+        sa.column('category_id', sa.Integer),
+    )
+    unique_links = {(item_id, ids[slug]) for item_id, slug in links}
+    if unique_links:
+        op.bulk_insert(item_categories, [{'item_id': i, 'category_id': c} for i, c in sorted(unique_links)])
+
+
+def downgrade():
+    op.drop_index('ix_menu_item_categories_category_id', table_name='menu_item_categories')
+    op.drop_table('menu_item_categories')
+    op.drop_index('ix_menu_categories_slug', table_name='menu_categories')
+    op.drop_table('menu_categories')
@@ -0,0 +1,53 @@
+"""Indexes for the paginated, searchable admin customer list
+
+Composite (sort column, customer_id) indexes back keyset pagination; on
+PostgreSQL, pg_trgm GIN indexes back ILIKE '%q%' search on name, email and
+phone. NULL sort keys are backfilled so keyset comparisons see every row.
+
+Revision ID: a8c2e4f6b1d3
+Revises: f1b3d5a7c9e2
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8c2e4f6b1d3'
+down_revision = 'f1b3d5a7c9e2'
+branch_labels = None
+depends_on = None
+
+KEYSET_INDEXES = [
+    ('idx_customers_created_at_id', 'created_at'),
+    ('idx_customers_total_spent_id', 'total_spent'),
+    ('idx_customers_total_orders_id', 'total_orders_count'),
+]
+
+TRIGRAM_INDEXES = [
+    ('idx_customers_full_name_trgm', 'full_name'),
+    ('idx_customers_email_trgm', 'email'),
+    ('idx_customers_phone_trgm', 'phone_number'),
+]
+
+
+def upgrade():
+    op.execute("UPDATE customers SET total_orders_count = 0 WHERE total_orders_count IS NULL")
+    op.execute("UPDATE customers SET total_spent = 0 WHERE total_spent IS NULL")
+    op.execute("UPDATE customers SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+    for name, column in KEYSET_INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON customers ({column}, customer_id)")
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name, column in TRIGRAM_INDEXES:
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON customers USING gin ({column} gin_trgm_ops)")
+    else:
+        for name, column in TRIGRAM_INDEXES:
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON customers ({column})")
+
+
+def downgrade():
+    for name, _column in TRIGRAM_INDEXES + KEYSET_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,40 @@
+"""Add bulk_mail_jobs table for broadcast email progress
+
+Revision ID: b6d1e3f5a7c8
+Revises: a8c2e4f6b1d3
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d1e3f5a7c8'
+down_revision = 'a8c2e4f6b1d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'bulk_mail_jobs',
+        sa.Column('job_id', sa.Integer(), primary_key=True),
+        sa.Column('template', sa.String(length=50), nullable=False),
+        sa.Column('audience', sa.String(length=30), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('total_recipients', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sent_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('failed_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('batches_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('batches_done', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('failed_recipients', sa.Text(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('bulk_mail_jobs')
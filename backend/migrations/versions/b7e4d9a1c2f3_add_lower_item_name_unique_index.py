@@ -0,0 +1,61 @@
+"""Add unique functional index on lower(menu_items.item_name)
+
+Existing case-insensitive duplicates are merged before the index is created,
+keeping the oldest row (lowest item_id) like remove_duplicates.py: order lines
+and category links are re-pointed to it and the other rows are deleted.
+
+Revision ID: b7e4d9a1c2f3
+Revises: a3c91d2e4b10
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e4d9a1c2f3'
+down_revision = 'a3c91d2e4b10'
+branch_labels = None
+depends_on = None
+
+
+def _merge_duplicate_menu_items(bind):
+    duplicates = bind.execute(sa.text(
+        "SELECT lower(item_name) FROM menu_items "
+        "GROUP BY lower(item_name) HAVING COUNT(*) > 1"
+    )).fetchall()
+    for (name,) in duplicates:
+        rows = bind.execute(sa.text(
+            "SELECT item_id FROM menu_items WHERE lower(item_name) = :name ORDER BY item_id"
+        ), {"name": name}).fetchall()
+        keep_id = rows[0].item_id
+        drop_ids = [r.item_id for r in rows[1:]]
+        for drop_id in drop_ids:
+            bind.execute(sa.text(
+                "UPDATE order_menu_items SET menu_item_id = :keep WHERE menu_item_id = :drop"
+            ), {"keep": keep_id, "drop": drop_id})
+            # Move the category links the kept row does not already have
+            bind.execute(sa.text(
+                "INSERT INTO menu_item_categories (item_id, category_id) "
+                "SELECT :keep, category_id FROM menu_item_categories WHERE item_id = :drop "
+                "AND category_id NOT IN "
+                "(SELECT category_id FROM menu_item_categories WHERE item_id = :keep)"
+            ), {"keep": keep_id, "drop": drop_id})
+            bind.execute(sa.text("DELETE FROM menu_item_categories WHERE item_id = :drop"), {"drop": drop_id})
+            bind.execute(sa.text("DELETE FROM menu_items WHERE item_id = :drop"), {"drop": drop_id})
+        print(f"Merged {len(drop_ids)} duplicate menu items named '{name}' into {keep_id}")
+
+
+def upgrade():
+    _merge_duplicate_menu_items(op.get_bind())
+    op.create_index(
+        'uq_menu_items_lower_item_name',
+        'menu_items',
+        [sa.text('lower(item_name)')],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index('uq_menu_items_lower_item_name', table_name='menu_items')
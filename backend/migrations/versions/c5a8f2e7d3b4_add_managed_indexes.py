@@ -0,0 +1,81 @@
+"""Manage query indexes in Alembic (replaces database_optimize.py)
+
+Creates the indexes previously added by hand with database_optimize.py plus
+the missing ones used on hot paths:
+  - orders.razorpay_order_id (payment verification lookup)
+  - orders.email (linking guest orders on signup)
+  - order_menu_items.menu_item_id
+  - unique customers.email (replaces the plain idx_customers_email)
+
+Existing duplicate customer emails (compared case-insensitively) are merged
+before the unique index is created: orders are re-pointed to the surviving row (registered account
+first, then lowest id) and the other rows are deleted.
+
+Revision ID: c5a8f2e7d3b4
+Revises: b7e4d9a1c2f3
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a8f2e7d3b4'
+down_revision = 'b7e4d9a1c2f3'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('idx_orders_customer_id', 'orders', 'customer_id'),
+    ('idx_orders_status', 'orders', 'status'),
+    ('idx_orders_created_at', 'orders', 'created_at'),
+    ('idx_orders_email', 'orders', 'email'),
+    ('idx_orders_razorpay_order_id', 'orders', 'razorpay_order_id'),
+    ('idx_order_menu_items_order_id', 'order_menu_items', 'order_id'),
+    ('idx_order_menu_items_menu_item_id', 'order_menu_items', 'menu_item_id'),
+]
+
+
+def _merge_duplicate_customers(bind):
+    duplicates = bind.execute(sa.text(
+        "SELECT lower(email) FROM customers WHERE email IS NOT NULL "
+        "GROUP BY lower(email) HAVING COUNT(*) > 1"
+    )).fetchall()
+    for (email,) in duplicates:
+        rows = bind.execute(sa.text(
+            "SELECT customer_id, password_hash FROM customers WHERE lower(email) = :email ORDER BY customer_id"
+        ), {"email": email}).fetchall()
+        registered = [r for r in rows if r.password_hash]
+        keep_id = (registered[0] if registered else rows[0]).customer_id
+        drop_ids = [r.customer_id for r in rows if r.customer_id != keep_id]
+        for drop_id in drop_ids:
+            bind.execute(sa.text(
+                "UPDATE orders SET customer_id = :keep WHERE customer_id = :drop"
+            ), {"keep": keep_id, "drop": drop_id})
+            bind.execute(sa.text("DELETE FROM customers WHERE customer_id = :drop"), {"drop": drop_id})
+        bind.execute(sa.text(
+            "UPDATE customers SET total_orders_count = "
+            "(SELECT COUNT(*) FROM orders WHERE orders.customer_id = :keep) WHERE customer_id = :keep"
+        ), {"keep": keep_id})
+        print(f"Merged {len(drop_ids)} duplicate customer rows for {email} into {keep_id}")
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # IF NOT EXISTS: databases optimized with database_optimize.py already have some of these
+    for name, table, column in INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})")
+
+    _merge_duplicate_customers(bind)
+    op.execute("DROP INDEX IF EXISTS idx_customers_email")
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_customers_email ON customers (email)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS uq_customers_email")
+    op.execute("CREATE INDEX IF NOT EXISTS idx_customers_email ON customers (email)")
+    for name, _table, _column in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,34 @@
+"""Add scheduler_state table for the event reminder scheduler
+
+Holds the leader lease and the scan high-water mark, so only one worker
+runs the scheduler and a restart resumes where the last scan stopped.
+
+Revision ID: c9e2a4b6d8f1
+Revises: b6d1e3f5a7c8
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e2a4b6d8f1'
+down_revision = 'b6d1e3f5a7c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'scheduler_state',
+        sa.Column('name', sa.String(length=50), primary_key=True),
+        sa.Column('owner', sa.String(length=64), nullable=True),
+        sa.Column('lease_until', sa.DateTime(), nullable=True),
+        sa.Column('state', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('scheduler_state')
@@ -0,0 +1,69 @@
+"""Convert orders.event_date/event_time from strings to DATE/TIME
+
+Existing values are parsed with the same formats the app accepts
+(db_types.parse_date / parse_time). Values that cannot be parsed are set to
+NULL and logged so they can be fixed by hand. Adds a composite index on
+(event_date, status) for calendar queries.
+
+Revision ID: d2f6b8c4e1a9
+Revises: c5a8f2e7d3b4
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from db_types import parse_date, parse_time
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6b8c4e1a9'
+down_revision = 'c5a8f2e7d3b4'
+branch_labels = None
+depends_on = None
+
+
+def _safe(parser, value, order_id, column):
+    try:
+        return parser(value)
+    except ValueError:
+        print(f"[MIGRATION] order {order_id}: could not parse {column}={value!r}, setting NULL")
+        return None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('event_date_new', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('event_time_new', sa.Time(), nullable=True))
+
+    rows = bind.execute(sa.text(
+        "SELECT order_id, event_date, event_time FROM orders "
+        "WHERE event_date IS NOT NULL OR event_time IS NOT NULL"
+    )).fetchall()
+    for order_id, event_date, event_time in rows:
+        bind.execute(sa.text(
+            "UPDATE orders SET event_date_new = :d, event_time_new = :t WHERE order_id = :id"
+        ), {
+            "d": _safe(parse_date, event_date, order_id, "event_date"),
+            "t": _safe(parse_time, event_time, order_id, "event_time"),
+            "id": order_id,
+        })
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_column('event_date')
+        batch_op.drop_column('event_time')
+        batch_op.alter_column('event_date_new', new_column_name='event_date')
+        batch_op.alter_column('event_time_new', new_column_name='event_time')
+
+    op.create_index('idx_orders_event_date_status', 'orders', ['event_date', 'status'])
+
+
+def downgrade():
+    op.drop_index('idx_orders_event_date_status', table_name='orders')
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.alter_column('event_date', type_=sa.String(length=20),
+                              postgresql_using='event_date::text')
+        batch_op.alter_column('event_time', type_=sa.String(length=20),
+                              postgresql_using="to_char(event_time, 'HH24:MI')")
@@ -0,0 +1,47 @@
+"""Store money columns as NUMERIC(12, 2) instead of float
+
+Existing values are rounded to paisa on conversion.
+
+Revision ID: e4a7c1d9b5f2
+Revises: d2f6b8c4e1a9
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c1d9b5f2'
+down_revision = 'd2f6b8c4e1a9'
+branch_labels = None
+depends_on = None
+
+MONEY_COLUMNS = [
+    ('orders', 'total_amount'),
+    ('menu_items', 'price_per_plate'),
+    ('order_menu_items', 'price_at_order_time'),
+    ('monthly_statistics', 'total_revenue'),
+]
+
+
+def upgrade():
+    for table, column in MONEY_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(
+                column,
+                existing_type=sa.Float(),
+                type_=sa.Numeric(12, 2),
+                postgresql_using=f'round({column}::numeric, 2)',
+            )
+
+
+def downgrade():
+    for table, column in MONEY_COLUMNS:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(
+                column,
+                existing_type=sa.Numeric(12, 2),
+                type_=sa.Float(),
+                postgresql_using=f'{column}::double precision',
+            )
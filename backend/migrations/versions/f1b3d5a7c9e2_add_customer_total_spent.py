@@ -0,0 +1,37 @@
+"""Add customers.total_spent and backfill customer aggregates
+
+total_orders_count counts all of a customer's orders and total_spent sums
+their non-cancelled order totals; both are maintained incrementally by
+customer_stats from here on.
+
+Revision ID: f1b3d5a7c9e2
+Revises: e4a7c1d9b5f2
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b3d5a7c9e2'
+down_revision = 'e4a7c1d9b5f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_spent', sa.Numeric(12, 2), nullable=True, server_default='0'))
+
+    op.execute(
+        "UPDATE customers SET "
+        "total_orders_count = (SELECT COUNT(*) FROM orders o WHERE o.customer_id = customers.customer_id), "
+        "total_spent = (SELECT COALESCE(SUM(CASE WHEN o.status = 'Cancelled' THEN 0 ELSE o.total_amount END), 0) "
+        "FROM orders o WHERE o.customer_id = customers.customer_id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.drop_column('total_spent')
@@ -1,5 +1,6 @@
 from datetime import datetime
 from extensions import db
+from db_types import EventDate, EventTime, Money
 
 
 class UploadedImage(db.Model):
@@ -22,6 +23,23 @@ class Customer(db.Model):
     password_hash = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     total_orders_count = db.Column(db.Integer, default=0)
+    # Sum of non-cancelled order totals, maintained by customer_stats
+    total_spent = db.Column(Money, default=0)
+
+    __table_args__ = (
+        db.Index("uq_customers_email", "email", unique=True),
+        # Keyset pagination of the admin customer list
+        db.Index("idx_customers_created_at_id", "created_at", "customer_id"),
+        db.Index("idx_customers_total_spent_id", "total_spent", "customer_id"),
+        db.Index("idx_customers_total_orders_id", "total_orders_count", "customer_id"),
+        # Substring search (ILIKE '%q%'); trigram GIN on PostgreSQL, needs pg_trgm
+        db.Index("idx_customers_full_name_trgm", "full_name",
+                 postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"}),
+        db.Index("idx_customers_email_trgm", "email",
+                 postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        db.Index("idx_customers_phone_trgm", "phone_number",
+                 postgresql_using="gin", postgresql_ops={"phone_number": "gin_trgm_ops"}),
+    )
 
     orders = db.relationship("Order", backref="customer", lazy=True)
 
@@ -38,22 +56,40 @@ class Order(db.Model):
 
     event_type = db.Column(db.String(50))
     number_of_guests = db.Column(db.Integer)
-    event_date = db.Column(db.String(20))
-    event_time = db.Column(db.String(20))
+    event_date = db.Column(EventDate)  # DATE column, read/written as "YYYY-MM-DD"
+    event_time = db.Column(EventTime)  # TIME column, read/written as "HH:MM"
     venue_address = db.Column(db.Text)
     special_requirements = db.Column(db.Text)
 
     status = db.Column(db.String(20), default="Pending")
-    total_amount = db.Column(db.Float, default=0.0)
+    total_amount = db.Column(Money, default=0)
     razorpay_order_id = db.Column(db.String(100))
     payment_method = db.Column(db.String(20), default="online")  # 'online' or 'cod'
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("idx_orders_customer_id", "customer_id"),
+        db.Index("idx_orders_status", "status"),
+        db.Index("idx_orders_created_at", "created_at"),
+        db.Index("idx_orders_email", "email"),
+        db.Index("idx_orders_razorpay_order_id", "razorpay_order_id"),
+        db.Index("idx_orders_event_date_status", "event_date", "status"),
+    )
+
     menu_items = db.relationship("OrderMenuItem", backref="order", lazy=True)
 
 
+# 3a. MENU_ITEM_CATEGORIES (Many-to-Many association, mirrors MenuItem.category)
+menu_item_categories = db.Table(
+    "menu_item_categories",
+    db.Column("item_id", db.Integer, db.ForeignKey("menu_items.item_id", ondelete="CASCADE"), primary_key=True),
+    db.Column("category_id", db.Integer, db.ForeignKey("menu_categories.category_id", ondelete="CASCADE"), primary_key=True),
+    db.Index("ix_menu_item_categories_category_id", "category_id"),
+)
+
+
 # 3. MENU_ITEMS TABLE
 class MenuItem(db.Model):
     __tablename__ = "menu_items"
@@ -61,7 +97,7 @@ class MenuItem(db.Model):
     item_id = db.Column(db.Integer, primary_key=True)
     item_name = db.Column(db.String(100), nullable=False, unique=True)
     category = db.Column(db.JSON)  # Changed to JSON to support multiple categories
-    price_per_plate = db.Column(db.Float)
+    price_per_plate = db.Column(Money)
     is_vegetarian = db.Column(db.Boolean, default=True)
     image_url = db.Column(db.Text)  # Text for long S3 URLs
     description = db.Column(db.String(255))
@@ -70,7 +106,63 @@ class MenuItem(db.Model):
     stock_quantity = db.Column(db.Integer, default=100)  # Track available stock
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Case-insensitive name uniqueness; also serves lower(item_name) lookups
+    __table_args__ = (
+        db.Index("uq_menu_items_lower_item_name", db.func.lower(item_name), unique=True),
+    )
+
     items = db.relationship("OrderMenuItem", backref="menu_item", lazy=True)
+    categories = db.relationship(
+        "MenuCategory", secondary=menu_item_categories, backref="menu_items", lazy="selectin"
+    )
+
+    def set_categories(self, names, category_map=None):
+        """Set the JSON category list and keep the normalized association in sync.
+
+        `category_map` (slug -> MenuCategory) lets bulk callers resolve all
+        categories up front instead of querying once per item.
+        """
+        if isinstance(names, str):
+            names = [names]
+        names = [n.strip() for n in (names or []) if n and n.strip()]
+        names = list(dict.fromkeys(names))
+        self.category = names
+        if category_map is not None:
+            self.categories = [category_map[MenuCategory.slugify(n)] for n in names]
+        else:
+            self.categories = MenuCategory.get_or_create_many(names)
+
+
+# 3b. MENU_CATEGORIES TABLE
+class MenuCategory(db.Model):
+    __tablename__ = "menu_categories"
+
+    category_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(100), nullable=False, unique=True, index=True)
+
+    @staticmethod
+    def slugify(name):
+        return " ".join((name or "").lower().split())
+
+    @classmethod
+    def get_or_create_many(cls, names):
+        """Return MenuCategory rows for the given names, creating missing ones."""
+        by_slug = {}
+        for name in names:
+            by_slug.setdefault(cls.slugify(name), name)
+        if not by_slug:
+            return []
+
+        existing = {c.slug: c for c in cls.query.filter(cls.slug.in_(list(by_slug))).all()}
+        result = []
+        for slug, name in by_slug.items():
+            category = existing.get(slug)
+            if category is None:
+                category = cls(name=name, slug=slug)
+                db.session.add(category)
+            result.append(category)
+        return result
 
 
 # 4. ORDER_MENU_ITEMS TABLE (Many-to-Many)
@@ -82,7 +174,12 @@ class OrderMenuItem(db.Model):
     menu_item_id = db.Column(db.Integer, db.ForeignKey("menu_items.item_id"))
 
     quantity = db.Column(db.Integer, default=1)
-    price_at_order_time = db.Column(db.Float)
+    price_at_order_time = db.Column(Money)
+
+    __table_args__ = (
+        db.Index("idx_order_menu_items_order_id", "order_id"),
+        db.Index("idx_order_menu_items_menu_item_id", "menu_item_id"),
+    )
 
 
 # 5. EVENT_TYPES TABLE
@@ -106,7 +203,7 @@ class MonthlyStat(db.Model):
     year = db.Column(db.Integer)
     month = db.Column(db.Integer)
     total_orders = db.Column(db.Integer)
-    total_revenue = db.Column(db.Float)
+    total_revenue = db.Column(Money)
     confirmed_orders = db.Column(db.Integer)
     pending_orders = db.Column(db.Integer)
     completed_orders = db.Column(db.Integer)
@@ -138,3 +235,40 @@ class AdminSettings(db.Model):
     
     def __repr__(self):
         return f'<AdminSettings admin_id={self.admin_id}>'
+
+
+# 9. BULK MAIL JOBS - progress of batched broadcast emails
+class BulkMailJob(db.Model):
+    __tablename__ = "bulk_mail_jobs"
+
+    job_id = db.Column(db.Integer, primary_key=True)
+    template = db.Column(db.String(50), nullable=False)
+    audience = db.Column(db.String(30))
+    status = db.Column(db.String(20), default="queued", nullable=False)  # queued, running, completed, partial, failed
+    total_recipients = db.Column(db.Integer, default=0, nullable=False)
+    sent_count = db.Column(db.Integer, default=0, nullable=False)
+    failed_count = db.Column(db.Integer, default=0, nullable=False)
+    batches_total = db.Column(db.Integer, default=0, nullable=False)
+    batches_done = db.Column(db.Integer, default=0, nullable=False)
+    failed_recipients = db.Column(db.Text)  # newline-separated addresses
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<BulkMailJob {self.job_id} {self.status} {self.sent_count}/{self.total_recipients}>'
+
+
+# 10. SCHEDULER STATE - leader lease and cursor for in-process schedulers
+class SchedulerState(db.Model):
+    __tablename__ = "scheduler_state"
+
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(64))  # worker currently holding the lease
+    lease_until = db.Column(db.DateTime)
+    state = db.Column(db.Text)  # JSON, e.g. the scan high-water mark
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SchedulerState {self.name} owner={self.owner}>'
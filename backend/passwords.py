@@ -0,0 +1,62 @@
+"""
+Password hashing off the eventlet hub.
+
+PBKDF2 is CPU-bound and takes tens of milliseconds per call; run inline
+under eventlet it blocks the only hub thread, stalling every request and
+socket until it finishes. These wrappers run werkzeug's hash/check in
+eventlet's native thread pool (tpool), with a semaphore bounding how many
+hashes run at once so a login storm queues cooperatively instead of
+starving the hub. Without eventlet they run inline.
+
+The hash method is configurable (PASSWORD_HASH_METHOD, written out in full
+as werkzeug stores it, e.g. "pbkdf2:sha256:600000" or "scrypt:32768:8:1");
+needs_rehash() reports hashes made with other parameters so logins can
+upgrade them transparently.
+"""
+import os
+import threading
+
+from werkzeug.security import (
+    generate_password_hash as _generate,
+    check_password_hash as _check,
+)
+
+try:
+    from eventlet import patcher, tpool
+except ImportError:  # pragma: no cover - eventlet is a hard dependency in production
+    patcher = tpool = None
+
+HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+SALT_LENGTH = int(os.environ.get("PASSWORD_SALT_LENGTH", "16"))
+
+# Hashes allowed to run at the same time
+MAX_CONCURRENT = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Green semaphore once threading is monkey-patched, so waiters yield to the hub
+_slots = threading.BoundedSemaphore(MAX_CONCURRENT)
+
+
+def _offload(fn, *args):
+    with _slots:
+        if tpool is not None and patcher.is_monkey_patched("thread"):
+            return tpool.execute(fn, *args)
+        return fn(*args)
+
+
+def generate_password_hash(password):
+    """Hash a password with the configured method, off the hub."""
+    return _offload(_generate, password, HASH_METHOD, SALT_LENGTH)
+
+
+def check_password_hash(pwhash, password):
+    """Verify a password against a stored hash, off the hub."""
+    if not pwhash:
+        return False
+    return _offload(_check, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """True when a stored hash was made with different parameters than HASH_METHOD."""
+    if not pwhash or "$" not in pwhash:
+        return True
+    return pwhash.split("$", 1)[0] != HASH_METHOD
@@ -0,0 +1,157 @@
+"""
+Server-side order pricing.
+
+Keeps every menu item's price in memory so create_order can compute the
+authoritative total without trusting the client or querying the database
+per item. Menu writes call price_table.invalidate(), which bumps a version
+number; the next lookup reloads the table with a single query. A short
+max age also bounds staleness for writes made by other processes (scripts,
+other workers).
+"""
+import threading
+import time
+from decimal import Decimal
+
+from db_types import to_money
+
+# Reload the table at least this often even without an invalidation
+MAX_AGE_SECONDS = 60
+
+# Client totals may differ from the server total by at most this much
+# (the cart rounds with toFixed(2) after summing floats)
+TOLERANCE = Decimal("0.01")
+
+
+class PricingError(ValueError):
+    """Raised when an order's items or totals cannot be priced; `details` is returned to the client."""
+
+    def __init__(self, message, details=None, status=400):
+        super().__init__(message)
+        self.details = details or {}
+        self.status = status
+
+
+def _item_id(value):
+    """Menu item id from a cart line as an int ("12" and 12 both work); raises PricingError otherwise."""
+    if isinstance(value, bool):
+        raise PricingError(f"Invalid menu item id {value!r}")
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    try:
+        item_id = int(value.strip() if isinstance(value, str) else value)
+    except (TypeError, ValueError):
+        raise PricingError(f"Invalid menu item id {value!r}")
+    if isinstance(value, float) or item_id < 1:
+        raise PricingError(f"Invalid menu item id {value!r}")
+    return item_id
+
+
+class PriceTable:
+    """Version-invalidated in-memory map of item_id -> (price, item_name)."""
+
+    def __init__(self, max_age_seconds=MAX_AGE_SECONDS):
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._prices = {}
+        self._version = 0
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+
+    @property
+    def version(self):
+        return self._version
+
+    def invalidate(self):
+        """Mark the table stale (call after any menu price change)."""
+        with self._lock:
+            self._version += 1
+
+    def _load(self):
+        from extensions import db
+        from models import MenuItem
+
+        rows = db.session.query(MenuItem.item_id, MenuItem.price_per_plate, MenuItem.item_name).all()
+        return {item_id: (price if price is not None else Decimal("0.00"), name) for item_id, price, name in rows}
+
+    def prices(self):
+        """Return the current {item_id: (price, item_name)} map, reloading if stale."""
+        with self._lock:
+            fresh = (
+                self._loaded_version == self._version
+                and time.monotonic() - self._loaded_at < self.max_age_seconds
+            )
+            if fresh:
+                return self._prices
+            version = self._version
+        prices = self._load()
+        with self._lock:
+            # Only install if no invalidation happened while loading
+            if self._version == version:
+                self._prices = prices
+                self._loaded_version = version
+                self._loaded_at = time.monotonic()
+        return prices
+
+    def quote(self, menu_items, client_total=None):
+        """Price order lines and check them against what the client sent.
+
+        menu_items is the create_order payload list ({"id", "qty", "price"}).
+        Returns (total, lines) where lines are (item_id, qty, unit_price).
+        Raises PricingError for bad item ids, unknown items, bad quantities, or client
+        prices/totals that do not match the server's.
+        """
+        if not isinstance(menu_items, list):
+            raise PricingError("menu_items must be a list")
+        prices = self.prices()
+        lines = []
+        unknown = []
+        mismatched = []
+        total = Decimal("0.00")
+        for item in menu_items:
+            if not isinstance(item, dict):
+                raise PricingError("Invalid order item")
+            item_id = _item_id(item.get("id"))
+            try:
+                qty = int(item.get("qty", 1))
+            except (TypeError, ValueError):
+                raise PricingError(f"Invalid quantity for item {item_id}")
+            if qty < 1:
+                raise PricingError(f"Invalid quantity for item {item_id}")
+            if item_id not in prices:
+                unknown.append(item_id)
+                continue
+            unit_price, name = prices[item_id]
+            client_price = item.get("price")
+            if client_price is not None:
+                try:
+                    if abs(to_money(client_price) - unit_price) > TOLERANCE:
+                        mismatched.append({"id": item_id, "item_name": name, "price": float(unit_price)})
+                except ValueError:
+                    raise PricingError(f"Invalid price for item {item_id}")
+            lines.append((item_id, qty, unit_price))
+            total += unit_price * qty
+
+        if unknown:
+            raise PricingError("Unknown menu items", {"unknown_items": unknown})
+        if mismatched:
+            raise PricingError(
+                "Menu prices have changed, please review your cart",
+                {"items": mismatched, "total_amount": float(total)},
+                status=409,
+            )
+        if client_total not in (None, ""):
+            try:
+                client_amount = to_money(client_total)
+            except ValueError:
+                raise PricingError("Invalid total_amount")
+            if abs(client_amount - total) > TOLERANCE:
+                raise PricingError(
+                    "Order total does not match menu prices",
+                    {"total_amount": float(total)},
+                    status=409,
+                )
+        return total, lines
+
+
+# Process-wide price table used by the order endpoints
+price_table = PriceTable()
@@ -0,0 +1,240 @@
+"""
+Kitchen production plan: total quantity per dish for each event date.
+
+Quantities are summed as stored on OrderMenuItem. Every order path already
+stores the quantity the order is billed for (the bulk cart sends one plate
+per guest as the line quantity), so the sum is already scaled by guest
+count and is not multiplied by number_of_guests again.
+
+Days are materialized on first request with one grouped query (orders
+joined to order_menu_items, cancelled orders excluded) and kept in memory.
+The order endpoints call record_order() after each commit so cached days
+are updated incrementally instead of being recomputed. Updates are keyed by
+order_id and replace the order's previous contribution, so recording the
+same order twice is harmless.
+"""
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import func
+
+from extensions import db
+from models import Order, OrderMenuItem, MenuItem
+
+# Cached days older than this are reloaded from the database
+MAX_AGE_SECONDS = 600
+
+# Upper bound on cached days (least recently loaded are evicted first)
+MAX_DAYS = 400
+
+# Recorded updates kept for replay into days that were loading concurrently
+_REPLAY_SECONDS = 120
+
+_lock = threading.Lock()
+_days = {}          # "YYYY-MM-DD" -> _Day
+_order_day = {}     # order_id -> "YYYY-MM-DD" for orders in cached days
+_recent = deque()   # (monotonic time, snapshot) of recent record_order calls
+
+
+class _Day:
+    """Per-order contributions and per-dish totals for one event date."""
+
+    def __init__(self):
+        self.orders = {}   # order_id -> (guests, {menu_item_id: quantity})
+        self.totals = {}   # menu_item_id -> [quantity, orders, guests]
+        self.loaded_at = time.monotonic()
+
+    def add(self, order_id, guests, items):
+        self.remove(order_id)
+        self.orders[order_id] = (guests, items)
+        for menu_item_id, quantity in items.items():
+            total = self.totals.setdefault(menu_item_id, [0, 0, 0])
+            total[0] += quantity
+            total[1] += 1
+            total[2] += guests
+
+    def remove(self, order_id):
+        entry = self.orders.pop(order_id, None)
+        if entry is None:
+            return
+        guests, items = entry
+        for menu_item_id, quantity in items.items():
+            total = self.totals[menu_item_id]
+            total[0] -= quantity
+            total[1] -= 1
+            total[2] -= guests
+            if total[1] <= 0:
+                del self.totals[menu_item_id]
+
+
+def order_snapshot(order):
+    """Capture what the plan needs from a committed Order."""
+    items = {}
+    for om in order.menu_items:
+        items[om.menu_item_id] = items.get(om.menu_item_id, 0) + (om.quantity or 0)
+    return {
+        "order_id": order.order_id,
+        "event_date": order.event_date,
+        "cancelled": order.status == "Cancelled",
+        "guests": order.number_of_guests or 0,
+        "items": items,
+    }
+
+
+def _apply(snapshot):
+    order_id = snapshot["order_id"]
+    previous = _order_day.pop(order_id, None)
+    if previous in _days:
+        _days[previous].remove(order_id)
+
+    day = _days.get(snapshot["event_date"])
+    if day is None or snapshot["cancelled"] or not snapshot["items"]:
+        return
+    day.add(order_id, snapshot["guests"], snapshot["items"])
+    _order_day[order_id] = snapshot["event_date"]
+
+
+def record_order(order):
+    """Apply a committed order (new, changed or cancelled) to cached days."""
+    snapshot = order_snapshot(order)
+    now = time.monotonic()
+    with _lock:
+        _apply(snapshot)
+        _recent.append((now, snapshot))
+        while _recent and now - _recent[0][0] > _REPLAY_SECONDS:
+            _recent.popleft()
+
+
+def invalidate():
+    """Drop every cached day."""
+    with _lock:
+        _days.clear()
+        _order_day.clear()
+
+
+def _load_days(dates):
+    """Materialize the given dates with one grouped query and install them."""
+    started = time.monotonic()
+    rows = db.session.query(
+        Order.event_date,
+        Order.order_id,
+        Order.number_of_guests,
+        OrderMenuItem.menu_item_id,
+        func.sum(OrderMenuItem.quantity)
+    ).join(
+        OrderMenuItem, OrderMenuItem.order_id == Order.order_id
+    ).filter(
+        Order.event_date.in_(dates),
+        Order.status != "Cancelled"
+    ).group_by(
+        Order.event_date, Order.order_id, Order.number_of_guests, OrderMenuItem.menu_item_id
+    ).all()
+
+    grouped = {d: {} for d in dates}
+    for event_date, order_id, guests, menu_item_id, quantity in rows:
+        guests_items = grouped[event_date].setdefault(order_id, [guests or 0, {}])
+        guests_items[1][menu_item_id] = int(quantity or 0)
+
+    with _lock:
+        for event_date, orders in grouped.items():
+            old = _days.pop(event_date, None)
+            if old is not None:
+                for order_id in old.orders:
+                    _order_day.pop(order_id, None)
+            day = _Day()
+            day.loaded_at = started
+            for order_id, (guests, items) in orders.items():
+                day.add(order_id, guests, items)
+                _order_day[order_id] = event_date
+            _days[event_date] = day
+
+        # Orders committed while the query ran may be missing from its results
+        for recorded_at, snapshot in _recent:
+            if recorded_at >= started and snapshot["event_date"] in grouped:
+                _apply(snapshot)
+
+        while len(_days) > MAX_DAYS:
+            oldest = min(_days, key=lambda d: _days[d].loaded_at)
+            for order_id in _days.pop(oldest).orders:
+                _order_day.pop(order_id, None)
+
+
+def _item_names(menu_item_ids):
+    if not menu_item_ids:
+        return {}
+    rows = db.session.query(MenuItem.item_id, MenuItem.item_name).filter(
+        MenuItem.item_id.in_(list(menu_item_ids))
+    ).all()
+    return dict(rows)
+
+
+def get_plan(dates):
+    """Return the production plan for a list of "YYYY-MM-DD" dates (cached)."""
+    now = time.monotonic()
+    with _lock:
+        missing = [d for d in dates if d not in _days or now - _days[d].loaded_at > MAX_AGE_SECONDS]
+    if missing:
+        _load_days(missing)
+
+    with _lock:
+        snapshot = {}
+        for d in dates:
+            day = _days.get(d)
+            if day is None:
+                continue
+            guests = sum(g for g, _ in day.orders.values())
+            snapshot[d] = (len(day.orders), guests, {k: list(v) for k, v in day.totals.items()})
+
+    return _format(dates, snapshot)
+
+
+def get_plan_uncached(dates):
+    """Aggregate directly in SQL, bypassing the cache (for verification)."""
+    rows = db.session.query(
+        Order.event_date,
+        OrderMenuItem.menu_item_id,
+        func.sum(OrderMenuItem.quantity),
+        func.count(func.distinct(Order.order_id)),
+        func.sum(Order.number_of_guests)
+    ).join(
+        OrderMenuItem, OrderMenuItem.order_id == Order.order_id
+    ).filter(
+        Order.event_date.in_(dates),
+        Order.status != "Cancelled"
+    ).group_by(Order.event_date, OrderMenuItem.menu_item_id).all()
+
+    order_rows = db.session.query(
+        Order.event_date, func.count(Order.order_id), func.sum(Order.number_of_guests)
+    ).filter(
+        Order.event_date.in_(dates),
+        Order.status != "Cancelled",
+        Order.order_id.in_(db.session.query(OrderMenuItem.order_id))
+    ).group_by(Order.event_date).all()
+
+    snapshot = {d: (int(n), int(g or 0), {}) for d, n, g in order_rows}
+    for event_date, menu_item_id, quantity, orders, guests in rows:
+        day = snapshot.setdefault(event_date, (0, 0, {}))
+        day[2][menu_item_id] = [int(quantity or 0), int(orders), int(guests or 0)]
+    return _format(dates, snapshot)
+
+
+def _format(dates, snapshot):
+    names = _item_names({i for _, _, totals in snapshot.values() for i in totals})
+    days = []
+    for d in dates:
+        if d not in snapshot:
+            continue
+        order_count, guests, totals = snapshot[d]
+        if not totals:
+            continue
+        items = [{
+            "menu_item_id": menu_item_id,
+            "item_name": names.get(menu_item_id, "Unknown"),
+            "quantity": quantity,
+            "orders": orders,
+            "guests": item_guests,
+        } for menu_item_id, (quantity, orders, item_guests) in totals.items()]
+        items.sort(key=lambda i: (-i["quantity"], i["item_name"]))
+        days.append({"date": d, "orders": order_count, "guests": guests, "items": items})
+    return days
@@ -0,0 +1,233 @@
+"""
+Request throttling for abuse-prone endpoints.
+
+Decorate a view with @rate_limit("policy") to cap how often one client IP
+and one email address (taken from the JSON body) can call it. Each policy
+sets a (limit, window_seconds) pair per key kind; the first exhausted key
+rejects the request with 429 and a Retry-After header before the view
+runs, so throttled requests never reach the database or Brevo. Rejected
+requests are not counted, so a client that keeps retrying is let through
+again as soon as its window allows.
+
+By default the client IP is the socket peer (request.remote_addr), since
+X-Forwarded-For can be forged by anyone who reaches the app directly.
+Deployments behind reverse proxies must set RATE_LIMIT_PROXY_HOPS to the
+number of proxies in front of Flask (e.g. 1 for the Vercel rewrite in
+frontend/vercel.json), otherwise every customer shares the proxy's IP.
+
+Counts use a sliding-window counter: the current fixed window's count plus
+the previous window's count weighted by how much of it still overlaps the
+sliding window. Counters live in Redis when reachable (shared across
+workers) and otherwise in a bounded in-process dict. After a Redis error
+the in-process store is used for REDIS_RETRY_SECONDS so a dead Redis does
+not add a connect timeout to every request.
+
+Policies can be overridden per key kind with environment variables, e.g.
+RATE_LIMIT_OTP_SEND_EMAIL=3/600 (3 requests per 600 seconds). Set
+RATE_LIMIT_ENABLED=0 to turn throttling off.
+"""
+import functools
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request, jsonify
+
+ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") != "0"
+
+# Reverse proxies in front of the app whose X-Forwarded-For entry is trusted
+# (0 = use remote_addr; set explicitly when deployed behind proxies)
+PROXY_HOPS = int(os.environ.get("RATE_LIMIT_PROXY_HOPS", "0"))
+
+# Skip Redis for this long after it fails
+REDIS_RETRY_SECONDS = 30
+
+MAX_ENTRIES = 20000
+
+# policy -> {key kind: (limit, window_seconds)}
+DEFAULT_POLICIES = {
+    # Endpoints that email a one-time code
+    "otp_send": {"ip": (10, 600), "email": (3, 600)},
+    # Endpoints that check a one-time code (6 digits, so cap guesses per email)
+    "otp_verify": {"ip": (30, 600), "email": (10, 600)},
+    "login": {"ip": (30, 300), "email": (10, 300)},
+    # Per buyer email, with a looser per-IP cap for shared networks
+    "create_order": {"ip": (60, 600), "email": (10, 600)},
+}
+
+
+def _load_policies():
+    policies = {}
+    for name, kinds in DEFAULT_POLICIES.items():
+        policies[name] = {}
+        for kind, default in kinds.items():
+            raw = os.environ.get(f"RATE_LIMIT_{name.upper()}_{kind.upper()}")
+            if raw:
+                try:
+                    limit, window = raw.split("/", 1)
+                    policies[name][kind] = (int(limit), int(window))
+                    continue
+                except ValueError:
+                    print(f"[RATE_LIMIT] Ignoring malformed RATE_LIMIT_{name.upper()}_{kind.upper()}={raw!r}")
+            policies[name][kind] = default
+    return policies
+
+
+POLICIES = _load_policies()
+
+
+class RateLimiter:
+    """Sliding-window counters over Redis with an in-memory fallback."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._windows = OrderedDict()  # key -> [window_index, current_count, previous_count]
+        self._redis_down_until = 0.0
+
+    def _redis(self):
+        if time.monotonic() < self._redis_down_until:
+            return None
+        try:
+            from api.users import redis_client
+            return redis_client
+        except Exception:
+            return None
+
+    def _hit_redis(self, client, key, index, window):
+        pipe = client.pipeline()
+        pipe.incr(f"rl:{key}:{index}")
+        pipe.expire(f"rl:{key}:{index}", window * 2)
+        pipe.get(f"rl:{key}:{index - 1}")
+        current, _, previous = pipe.execute()
+        return int(current), int(previous or 0)
+
+    def _hit_memory(self, key, index):
+        with self._lock:
+            entry = self._windows.get(key)
+            if entry is None:
+                entry = self._windows[key] = [index, 0, 0]
+            elif entry[0] != index:
+                entry[2] = entry[1] if entry[0] == index - 1 else 0
+                entry[0], entry[1] = index, 0
+            entry[1] += 1
+            self._windows.move_to_end(key)
+            while len(self._windows) > MAX_ENTRIES:
+                self._windows.popitem(last=False)
+            return entry[1], entry[2]
+
+    def _undo(self, key, index):
+        client = self._redis()
+        if client:
+            try:
+                client.decr(f"rl:{key}:{index}")
+                return
+            except Exception as e:
+                print(f"[RATE_LIMIT] Redis unavailable, using in-memory counters: {e}")
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        with self._lock:
+            entry = self._windows.get(key)
+            if entry is not None and entry[0] == index and entry[1] > 0:
+                entry[1] -= 1
+
+    def hit(self, key, limit, window):
+        """Count one request against key; returns seconds to wait, or 0 if allowed.
+
+        A rejected request is not counted.
+        """
+        now = time.time()
+        index = int(now // window)
+        elapsed = now - index * window
+
+        current = previous = None
+        client = self._redis()
+        if client:
+            try:
+                current, previous = self._hit_redis(client, key, index, window)
+            except Exception as e:
+                print(f"[RATE_LIMIT] Redis unavailable, using in-memory counters: {e}")
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        if current is None:
+            current, previous = self._hit_memory(key, index)
+
+        weight = 1 - elapsed / window
+        if previous * weight + current <= limit:
+            return 0
+        self._undo(key, index)
+        current -= 1
+        if current >= limit:
+            # Over the limit within this window alone
+            return max(1, math.ceil(window - elapsed))
+        # Wait until the previous window's weight decays enough
+        needed = window * (1 - (limit - current - 1) / previous)
+        return max(1, math.ceil(needed - elapsed))
+
+    def release(self, key, window):
+        """Uncount a request allowed by hit() that was then rejected by another key."""
+        self._undo(key, int(time.time() // window))
+
+    def reset(self):
+        with self._lock:
+            self._windows.clear()
+
+
+limiter = RateLimiter()
+
+
+def client_ip():
+    """Caller IP, trusting PROXY_HOPS entries of X-Forwarded-For."""
+    forwarded = request.headers.get("X-Forwarded-For")
+    if PROXY_HOPS and forwarded:
+        hops = [part.strip() for part in forwarded.split(",") if part.strip()]
+        if hops:
+            return hops[-PROXY_HOPS] if len(hops) >= PROXY_HOPS else hops[0]
+    return request.remote_addr or "unknown"
+
+
+def _request_email():
+    data = request.get_json(force=True, silent=True)
+    if isinstance(data, dict):
+        email = data.get("email")
+        if isinstance(email, str) and email.strip():
+            return email.strip().lower()
+    return None
+
+
+def _digest(value):
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+
+def rate_limit(policy):
+    """Reject calls over the policy's per-IP / per-email limits with 429."""
+    rules = POLICIES[policy]
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not ENABLED or request.method == "OPTIONS":
+                return view(*args, **kwargs)
+            counted = []
+            for kind, (limit, window) in rules.items():
+                value = client_ip() if kind == "ip" else _request_email()
+                if value is None:
+                    continue
+                key = f"{policy}:{kind}:{_digest(value)}"
+                retry_after = limiter.hit(key, limit, window)
+                if not retry_after:
+                    counted.append((key, window))
+                else:
+                    for counted_key, counted_window in counted:
+                        limiter.release(counted_key, counted_window)
+                    print(f"[RATE_LIMIT] {policy} throttled by {kind} for {retry_after}s")
+                    response = jsonify({
+                        "error": "Too many requests. Please try again later.",
+                        "retry_after": retry_after,
+                    })
+                    response.status_code = 429
+                    response.headers["Retry-After"] = str(retry_after)
+                    return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,245 @@
+"""
+Event-day reminder scheduler.
+
+Every REMINDER_SCAN_INTERVAL seconds one worker finds orders whose event
+falls between today and REMINDER_DAYS_AHEAD days ahead. It queues reminder
+emails for them through the bulk mail pipeline and sends admins a batched
+`upcoming_event` socket event.
+
+Leadership is a lease on a scheduler_state row. A conditional UPDATE
+renews the lease for its owner or takes it over once it lapses, so only
+one worker scans even with several workers or hosts.
+
+Scans are incremental. The same row stores a high-water mark with two
+cursors, so no scan rereads orders it has already handled:
+
+- date cursor (event_date, order_id): walks idx_orders_event_date_status
+  forward as event dates enter the window;
+- new-order cursor (max_order_id): walks the primary key over newly
+  created orders, to catch orders booked for dates the date cursor has
+  already passed (e.g. an event booked today for tomorrow).
+
+The two cursors cover disjoint orders, so each order is reminded once. A
+scan saves the cursor before queueing emails. A crash can drop a
+reminder, but never sends one twice.
+
+Only confirmed or paid orders, and cash-on-delivery orders, are reminded.
+An online order still Pending is waiting for Razorpay. A cursor stops in
+front of one for up to REMINDER_PAYMENT_GRACE_MINUTES after it was created,
+so a payment that lands in that time still gets its reminder. After that
+the order counts as abandoned and is passed over.
+
+The scheduler thread runs only in the serving process
+(app.start_background_services).
+"""
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db, socketio, emit_with_namespace
+from models import Order, SchedulerState
+import bulk_mail
+import serializers
+
+SCHEDULER_NAME = "event_reminders"
+
+# Seconds between scans (0 disables the scheduler)
+SCAN_INTERVAL_SECONDS = int(os.environ.get("REMINDER_SCAN_INTERVAL", "60"))
+
+# Remind for events from today up to this many days ahead
+DAYS_AHEAD = int(os.environ.get("REMINDER_DAYS_AHEAD", "1"))
+
+# Orders read per cursor per scan; the rest wait for the next scan
+BATCH_SIZE = 200
+
+# A leader that stops renewing loses the lease after this long
+LEASE_SECONDS = max(SCAN_INTERVAL_SECONDS * 3, 60)
+
+REMIND_STATUSES = ("Confirmed", "Paid")
+
+# How long a cursor waits for an online Pending order to be paid
+PAYMENT_GRACE = timedelta(minutes=int(os.environ.get("REMINDER_PAYMENT_GRACE_MINUTES", "30")))
+
+# Identifies this process as a lease owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_thread = None
+_thread_lock = threading.Lock()
+
+stats = {"scans": 0, "reminded": 0, "is_leader": False, "last_scan_at": None}
+
+
+def _acquire_lease():
+    """Take or renew the scheduler lease; returns True if this worker is the leader."""
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=LEASE_SECONDS)
+    updated = SchedulerState.query.filter(
+        SchedulerState.name == SCHEDULER_NAME,
+        or_(
+            SchedulerState.owner == WORKER_ID,
+            SchedulerState.lease_until.is_(None),
+            SchedulerState.lease_until < now,
+        ),
+    ).update({
+        SchedulerState.owner: WORKER_ID,
+        SchedulerState.lease_until: lease_until,
+    }, synchronize_session=False)
+    db.session.commit()
+    if updated:
+        return True
+    if db.session.get(SchedulerState, SCHEDULER_NAME) is not None:
+        return False
+    try:
+        db.session.add(SchedulerState(name=SCHEDULER_NAME, owner=WORKER_ID, lease_until=lease_until))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        # Another worker created the row first
+        db.session.rollback()
+        return False
+
+
+def _load_cursor(row, today):
+    cursor = json.loads(row.state) if row.state else {}
+    if "max_order_id" not in cursor:
+        # First run: orders already in the table are reached by the date cursor
+        cursor["max_order_id"] = db.session.query(db.func.max(Order.order_id)).scalar() or 0
+    if cursor.get("date", "") < today:
+        # Past dates are never reminded; restart the date cursor at today
+        cursor["date"], cursor["order_id"] = today, 0
+    return cursor
+
+
+def _should_remind(order):
+    if order.status in REMIND_STATUSES:
+        return True
+    # Cash on delivery orders stay Pending until the event
+    return order.payment_method == "cod" and order.status in (None, "Pending")
+
+
+def _awaiting_payment(order, now):
+    return (
+        order.status in (None, "Pending") and order.payment_method != "cod"
+        and order.created_at is not None and order.created_at > now - PAYMENT_GRACE
+    )
+
+
+def _settled(orders, now):
+    """The leading orders a cursor may move past: up to the first one still awaiting payment."""
+    for i, order in enumerate(orders):
+        if _awaiting_payment(order, now):
+            return orders[:i]
+    return orders
+
+
+def _scan(cursor, today, horizon):
+    """Orders due a reminder since the last scan, and the advanced cursor."""
+    mark = (cursor["date"], cursor["order_id"])
+    advanced = dict(cursor)
+    now = datetime.utcnow()
+
+    # New orders for dates the date cursor has already passed
+    created = Order.query.filter(
+        Order.order_id > cursor["max_order_id"]
+    ).order_by(Order.order_id).limit(BATCH_SIZE).all()
+    created = _settled(created, now)
+    if created:
+        advanced["max_order_id"] = created[-1].order_id
+    due = [
+        o for o in created
+        if o.event_date and o.event_date >= today and (o.event_date, o.order_id) <= mark
+        and _should_remind(o)
+    ]
+
+    # Orders whose event date has entered the window, in index order
+    entering = Order.query.filter(
+        Order.event_date <= horizon,
+        or_(
+            Order.event_date > mark[0],
+            and_(Order.event_date == mark[0], Order.order_id > mark[1]),
+        ),
+    ).order_by(Order.event_date, Order.order_id).limit(BATCH_SIZE).all()
+    entering = _settled(entering, now)
+    if entering:
+        advanced["date"], advanced["order_id"] = entering[-1].event_date, entering[-1].order_id
+    due.extend(o for o in entering if _should_remind(o))
+    return due, advanced
+
+
+def _notify(orders):
+    """Queue reminder emails and one admin socket event for a batch of orders."""
+    events = [serializers.order(o) for o in orders]
+    recipients = [
+        {"email": o.email, "name": o.customer_name, "context": {"order": event}}
+        for o, event in zip(orders, events) if o.email
+    ]
+    if recipients:
+        bulk_mail.start("event_reminder", recipients, audience="event_reminder")
+    try:
+        socketio.start_background_task(emit_with_namespace,
+            'upcoming_event',
+            {'count': len(events), 'events': events},
+            room='admins'
+        )
+    except Exception as e:
+        print(f"[REMINDERS] Socket emit error: {e}")
+
+
+def run_once():
+    """One scheduler tick; returns the number of orders reminded (0 when not leader)."""
+    stats["is_leader"] = _acquire_lease()
+    if not stats["is_leader"]:
+        return 0
+
+    today = date.today()
+    horizon = (today + timedelta(days=DAYS_AHEAD)).isoformat()
+    row = db.session.get(SchedulerState, SCHEDULER_NAME)
+    cursor = _load_cursor(row, today.isoformat())
+    due, advanced = _scan(cursor, today.isoformat(), horizon)
+
+    if advanced != cursor or row.state is None:
+        row.state = json.dumps(advanced)
+        db.session.commit()
+    if due:
+        print(f"[REMINDERS] {len(due)} upcoming events through {horizon}")
+        _notify(due)
+
+    stats["scans"] += 1
+    stats["reminded"] += len(due)
+    stats["last_scan_at"] = datetime.utcnow().isoformat()
+    return len(due)
+
+
+def start_scheduler(app, interval=SCAN_INTERVAL_SECONDS):
+    """Start the reminder scan loop in a daemon thread (idempotent).
+
+    Only the serving process should call this (see app.start_background_services).
+    """
+    global _thread
+    if interval <= 0:
+        return None
+    with _thread_lock:
+        if _thread is not None and _thread.is_alive():
+            return _thread
+
+        def _loop():
+            while True:
+                time.sleep(interval)
+                with app.app_context():
+                    try:
+                        run_once()
+                    except Exception:
+                        traceback.print_exc()
+                        db.session.rollback()
+
+        _thread = threading.Thread(target=_loop, name="event-reminders", daemon=True)
+        _thread.start()
+    return _thread
@@ -0,0 +1,82 @@
+"""
+Local stand-in for Brevo's /v3/smtp/email endpoint, for testing bulk mail.
+
+Accepts single and batch (messageVersions) sends, returns Brevo-shaped
+responses and prints a running total. Batches containing an address with
+"invalid" in it are rejected with 400, like Brevo does for a bad recipient,
+and --fail-rate makes a share of requests return 503 to exercise retries.
+
+Usage:
+    python scripts/brevo_stub.py [--port 8025] [--fail-rate 0.1] [--latency 0.2]
+    BREVO_API_URL=http://127.0.0.1:8025/v3/smtp/email python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+stats = {"requests": 0, "messages": 0, "rejected": 0, "errors": 0}
+stats_lock = threading.Lock()
+
+
+def make_handler(fail_rate, latency):
+    class BrevoStub(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path != "/v3/smtp/email":
+                return self._reply(404, {"code": "not_found"})
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            time.sleep(latency)
+
+            versions = payload.get("messageVersions") or [{"to": payload.get("to", [])}]
+            addresses = [to["email"] for v in versions for to in v.get("to", [])]
+            with stats_lock:
+                stats["requests"] += 1
+                if random.random() < fail_rate:
+                    stats["errors"] += 1
+                    status, body = 503, {"code": "service_unavailable"}
+                elif any("invalid" in a for a in addresses):
+                    stats["rejected"] += 1
+                    status, body = 400, {"code": "invalid_parameter", "message": "email is not valid"}
+                else:
+                    stats["messages"] += len(addresses)
+                    status = 201
+                    body = ({"messageIds": [f"<{uuid.uuid4()}@stub>" for _ in addresses]}
+                            if payload.get("messageVersions") else {"messageId": f"<{uuid.uuid4()}@stub>"})
+                print(f"[STUB] {status} for {len(addresses)} recipients | totals {stats}")
+            self._reply(status, body)
+
+        def log_message(self, *args):
+            pass
+
+    return BrevoStub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.fail_rate, args.latency))
+    print(f"Brevo stub listening on http://127.0.0.1:{args.port}/v3/smtp/email")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
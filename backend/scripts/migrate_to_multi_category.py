@@ -102,7 +102,8 @@ def migrate_items():
             for item_id, categories in items_to_update:
                 item = MenuItem.query.get(item_id)
                 if item:
-                    item.category = categories
+                    # Keeps the normalized menu_item_categories rows in sync
+                    item.set_categories(categories)
                     db.session.add(item)
             db.session.commit()
             print(f"✓ Updated {len(items_to_update)} items")
@@ -0,0 +1,21 @@
+"""
+Publish static menu snapshots (per-category and event-type JSON).
+
+Usage:
+    python scripts/publish_menu.py
+"""
+import os
+import sys
+
+# Add parent directory to path so we can import app and models
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+import menu_publisher
+
+
+if __name__ == "__main__":
+    app = create_app()
+    with app.app_context():
+        version = menu_publisher.publish()
+        print(f"Current menu snapshot version: {version}")
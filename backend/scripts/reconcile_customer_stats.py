@@ -0,0 +1,31 @@
+"""
+Recompute customer order counts and lifetime spend where they have drifted.
+
+Usage:
+    python scripts/reconcile_customer_stats.py            # fix drifted customers
+    python scripts/reconcile_customer_stats.py --dry-run  # only list them
+"""
+import os
+import sys
+
+# Add parent directory to path so we can import app and models
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+import customer_stats
+
+
+def main():
+    dry_run = "--dry-run" in sys.argv
+    app = create_app()
+    with app.app_context():
+        drift = customer_stats.find_drift()
+        for customer_id, count, spent, actual_count, actual_spent in drift:
+            print(f"  customer {customer_id}: orders {count} -> {actual_count}, spent {spent} -> {actual_spent}")
+        if not dry_run:
+            customer_stats.reconcile()
+        print(f"{len(drift)} customers {'drifted' if dry_run else 'corrected'}")
+
+
+if __name__ == "__main__":
+    main()
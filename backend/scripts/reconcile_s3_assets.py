@@ -0,0 +1,29 @@
+"""
+Find and delete S3 menu images that no menu item references.
+
+Usage:
+    python scripts/reconcile_s3_assets.py            # delete orphans
+    python scripts/reconcile_s3_assets.py --dry-run  # only list them
+"""
+import os
+import sys
+
+# Add parent directory to path so we can import app and models
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+import asset_gc
+
+
+def main():
+    dry_run = "--dry-run" in sys.argv
+    app = create_app()
+    with app.app_context():
+        orphans = asset_gc.reconcile(dry_run=dry_run)
+        for key in orphans:
+            print(f"  {'would delete' if dry_run else 'deleted'}: {key}")
+        print(f"{len(orphans)} orphaned objects {'found' if dry_run else 'processed'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app, db
 from models import MenuItem
+import asset_gc
+from menu_import import upsert_menu_items
+import menu_publisher
 
 # New menu dataset derived from provided image menus
 MENU_DATA = [
@@ -73,24 +76,32 @@ def reset_menu():
         db.session.commit()
         print(f"Deleted {deleted_order_items} order-menu item references")
 
+        # Remember stored images so they can be removed from S3 in bulk
+        old_image_urls = [url for (url,) in db.session.query(MenuItem.image_url).all() if url]
+
         # Then delete all menu items
         deleted = MenuItem.query.delete()
         db.session.commit()
         print(f"Deleted {deleted} existing menu items")
 
-        # Insert new items
-        for entry in MENU_DATA:
-            item = MenuItem(
-                item_name=entry["name"],
-                category=entry["category"],
-                price_per_plate=entry["price"],
-                is_vegetarian=True,
-                description=entry.get("description", ""),
-                is_available=True,
-            )
-            db.session.add(item)
-        db.session.commit()
-        print(f"Inserted {len(MENU_DATA)} menu items")
+        # Batched DeleteObjects calls instead of one request per image
+        removed = asset_gc.delete_urls_now(old_image_urls)
+        print(f"Deleted {removed} orphaned S3 images")
+
+        # Insert new items in one transaction; repeated names are merged
+        # into a single item carrying every category it appears under
+        created, updated = upsert_menu_items([{
+            "item_name": entry["name"],
+            "price": entry["price"],
+            "category": entry["category"],
+            "veg": True,
+            "description": entry.get("description", ""),
+            "is_available": True,
+        } for entry in MENU_DATA])
+        print(f"Inserted {len(created)} menu items from {len(MENU_DATA)} entries")
+
+        version = menu_publisher.publish()
+        print(f"Published menu snapshot {version}")
 
 
 if __name__ == "__main__":
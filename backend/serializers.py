@@ -0,0 +1,180 @@
+"""
+Shared JSON serialization.
+
+Per-model serializers build the public dict for each model once, leaving
+datetimes and Decimals as-is; the encoder converts them (datetime/date ->
+ISO 8601, Decimal -> number). orjson is used when installed and the stdlib
+encoder otherwise. The same encoder backs Flask's JSON provider (jsonify,
+request.json), Socket.IO packets and the static menu snapshots, so every
+output path formats values identically.
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj, sort_keys=False):
+        """Serialize to UTF-8 JSON bytes."""
+        option = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTIONS
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def loads(data):
+        return orjson.loads(data)
+else:
+    def dumps(obj, sort_keys=False):
+        """Serialize to UTF-8 JSON bytes."""
+        return json.dumps(
+            obj, default=_default, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False
+        ).encode("utf-8")
+
+    def loads(data):
+        return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by serializers.dumps/loads."""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, sort_keys=kwargs.get("sort_keys", False)).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+class SocketJSON:
+    """json-module lookalike for python-socketio's `json` option."""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return dumps(obj).decode("utf-8")
+
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return loads(s)
+
+
+# ── Model serializers ────────────────────────────────────────────────────
+
+
+def menu_item(m):
+    """Public representation of a menu item (API responses, socket payloads, snapshots)."""
+    return {
+        "item_id": m.item_id,
+        "item_name": m.item_name,
+        "price_per_plate": m.price_per_plate if m.price_per_plate is not None else 0,
+        "category": m.category,
+        "is_vegetarian": m.is_vegetarian,
+        "image_url": m.image_url,
+        "description": m.description,
+        "is_available": m.is_available,
+        "stock_quantity": m.stock_quantity if m.stock_quantity is not None else 100,
+    }
+
+
+def event_type(e):
+    return {
+        "event_type_id": e.event_type_id,
+        "event_name": e.event_name,
+        "minimum_guests": e.minimum_guests,
+        "description": e.description,
+        "image_url": e.image_url,
+    }
+
+
+def customer(c):
+    return {
+        "customer_id": c.customer_id,
+        "full_name": c.full_name,
+        "phone_number": c.phone_number,
+        "email": c.email,
+        "total_orders_count": c.total_orders_count or 0,
+        "total_spent": c.total_spent or 0,
+        "created_at": c.created_at,
+        "is_registered": bool(c.password_hash),
+    }
+
+
+def order_item(om, item_name=None):
+    """An order line. Pass item_name when the menu item is already at hand."""
+    if item_name is None:
+        item_name = om.menu_item.item_name if om.menu_item else "Unknown"
+    return {
+        "menu_item_id": om.menu_item_id,
+        "quantity": om.quantity,
+        "price_at_order_time": om.price_at_order_time if om.price_at_order_time is not None else 0,
+        "item_name": item_name,
+    }
+
+
+def order(o, items=False, detail=False):
+    """An order; items=True adds its lines, detail=True adds payment/update fields."""
+    data = {
+        "order_id": o.order_id,
+        "customer_name": o.customer_name,
+        "phone_number": o.phone_number,
+        "email": o.email,
+        "event_type": o.event_type,
+        "number_of_guests": o.number_of_guests,
+        "event_date": o.event_date,
+        "event_time": o.event_time,
+        "venue_address": o.venue_address,
+        "special_requirements": o.special_requirements,
+        "status": o.status,
+        "total_amount": o.total_amount if o.total_amount is not None else 0,
+        "payment_method": o.payment_method,
+        "created_at": o.created_at,
+    }
+    if detail:
+        data["razorpay_order_id"] = o.razorpay_order_id
+        data["updated_at"] = o.updated_at
+    if items:
+        data["items"] = [order_item(om) for om in o.menu_items]
+    return data
+
+
+def bulk_mail_job(j, include_failed=False):
+    """Progress of a broadcast; include_failed=True adds the failed addresses."""
+    data = {
+        "job_id": j.job_id,
+        "template": j.template,
+        "audience": j.audience,
+        "status": j.status,
+        "total_recipients": j.total_recipients,
+        "sent_count": j.sent_count,
+        "failed_count": j.failed_count,
+        "batches_total": j.batches_total,
+        "batches_done": j.batches_done,
+        "last_error": j.last_error,
+        "created_at": j.created_at,
+        "started_at": j.started_at,
+        "finished_at": j.finished_at,
+    }
+    if include_failed:
+        data["failed_recipients"] = (j.failed_recipients or "").split()
+    return data
@@ -2,9 +2,10 @@
 WSGI entry point for production deployment.
 Used by Gunicorn and other WSGI servers.
 """
-from app import create_app, socketio
+from app import create_app, socketio, start_background_services
 
 app = create_app()
+start_background_services(app)
 
 # Expose the Flask app object for WSGI servers (gunicorn/uwsgi)
 app_for_gunicorn = app
@@ -87,7 +87,7 @@ export default function BulkCartPage({
       event_type: "Bulk Order",
       guests: guestCount,
       event_date: new Date().toISOString().split("T")[0],
-      event_time: new Date().toLocaleTimeString(),
+      event_time: new Date().toTimeString().slice(0, 5), // "HH:MM", independent of the browser locale
       venue: address,
       special: null,
       total_amount: parseFloat(total.toFixed(2)),
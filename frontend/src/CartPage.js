@@ -75,7 +75,7 @@ export default function CartPage({ goBack, cart, updateQty, clearCart, initiateP
       event_type: "Delivery",
       guests: 1,
       event_date: new Date().toISOString().split('T')[0],
-      event_time: new Date().toLocaleTimeString(),
+      event_time: new Date().toTimeString().slice(0, 5), // "HH:MM", independent of the browser locale
       venue: formData.address,
       special: null,
       total_amount: parseFloat(total.toFixed(2)),
@@ -221,7 +221,7 @@ export default function OrderHistory({ goBack, user }) {
                   <ul>
                     {order.items.map((item, idx) => (
                       <li key={idx}>
-                        {item.item_name} x {item.quantity} - ₹{item.price}
+                        {item.item_name} x {item.quantity} - ₹{item.price_at_order_time}
                       </li>
                     ))}
                   </ul>
@@ -1,5 +1,6 @@
 import React, { useState } from "react";
 import axios from "axios";
+import { waitForOtpDelivery } from "./services/otpDelivery";
 import "./home.css";
 
 export default function UserAccount({ user, onLogout, goToOrderHistory, goToMenu, goToHome }) {
@@ -21,10 +22,11 @@ export default function UserAccount({ user, onLogout, goToOrderHistory, goToMenu
       const response = await axios.post('/api/users/forgot-password', {
         email: user.email
       });
-      setSuccess(response.data.message || 'OTP sent to your email!');
+      await waitForOtpDelivery(response);
+      setSuccess('OTP sent to your email!');
       setOtpSent(true);
     } catch (err) {
-      setError(err.response?.data?.error || 'Failed to send OTP');
+      setError(err.response?.data?.error || err.message || 'Failed to send OTP');
     } finally {
       setLoading(false);
     }
@@ -2,6 +2,7 @@ import React, { useState } from "react";
 import axios from "axios";
 import { GoogleLogin } from '@react-oauth/google';
 import { jwtDecode } from "jwt-decode";
+import { waitForOtpDelivery } from "./services/otpDelivery";
 import './home.css';
 
 export default function UserSignIn({ goToSignUp, goBack, onSignInSuccess, goToHome, onAdminLogin }) {
@@ -130,7 +131,8 @@ export default function UserSignIn({ goToSignUp, goBack, onSignInSuccess, goToHo
 
     try {
       // Try admin forgot password first
-      await axios.post('/api/users/admin/forgot-password', { email: forgotEmail });
+      const adminRes = await axios.post('/api/users/admin/forgot-password', { email: forgotEmail });
+      await waitForOtpDelivery(adminRes);
       setIsAdminReset(true);
       setResetSuccess('OTP sent to your admin email!');
       setShowOtpVerification(true);
@@ -138,7 +140,8 @@ export default function UserSignIn({ goToSignUp, goBack, onSignInSuccess, goToHo
       // If admin endpoint fails (not an admin email), try user endpoint
       if (adminErr.response?.status === 404) {
         try {
-          await axios.post('/api/users/forgot-password', { email: forgotEmail });
+          const userRes = await axios.post('/api/users/forgot-password', { email: forgotEmail });
+          await waitForOtpDelivery(userRes);
           setIsAdminReset(false);
           setResetSuccess('OTP sent to your email!');
           setShowOtpVerification(true);
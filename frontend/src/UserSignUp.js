@@ -2,6 +2,7 @@ import React, { useState } from "react";
 import axios from "axios";
 import { GoogleLogin } from '@react-oauth/google';
 import { jwtDecode } from "jwt-decode";
+import { waitForOtpDelivery } from "./services/otpDelivery";
 import './home.css';
 
 export default function UserSignUp({ goToSignIn, goBack, onSignUpSuccess, goToHome }) {
@@ -24,10 +25,11 @@ export default function UserSignUp({ goToSignIn, goBack, onSignUpSuccess, goToHo
 
     try {
       const res = await axios.post('/api/users/send-registration-otp', { email: form.email });
+      await waitForOtpDelivery(res);
       setStep(1);
-      setSuccess(res.data?.message || 'Verification code sent to your email!');
+      setSuccess('Verification code sent to your email!');
     } catch (err) {
-      const msg = err.response?.data?.error || 'Failed to send verification code.';
+      const msg = err.response?.data?.error || err.message || 'Failed to send verification code.';
       setError(msg);
       // If we already reached step 1, stay there so user can resend
       if (step === 0) setStep(0);
@@ -0,0 +1,38 @@
+import axios from 'axios';
+
+// OTP emails are sent in the background: the send endpoints answer 202 with a
+// ticket, and delivery is confirmed (or fails) a few seconds later.
+const POLL_INTERVAL_MS = 1000;
+const MAX_WAIT_MS = 30000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Wait until the OTP email behind a send response has gone out.
+ * Resolves once it is sent (or if its status can no longer be checked);
+ * rejects with the server's message when delivery failed.
+ * @param {object} response - axios response from an OTP send endpoint
+ */
+export const waitForOtpDelivery = async (response) => {
+  const statusUrl = response?.data?.status_url;
+  if (response?.status !== 202 || !statusUrl) return;
+
+  const deadline = Date.now() + MAX_WAIT_MS;
+  while (Date.now() < deadline) {
+    await sleep(POLL_INTERVAL_MS);
+    let data;
+    try {
+      ({ data } = await axios.get(statusUrl));
+    } catch (err) {
+      // Unknown or expired ticket: nothing more to learn
+      if (err.response?.status === 404) return;
+      continue; // network hiccup or server error, keep polling
+    }
+    if (data.status === 'sent') return;
+    if (data.status === 'failed') {
+      throw new Error(data.error || 'Failed to send verification email. Please try again.');
+    }
+  }
+};
+
+export default waitForOtpDelivery;